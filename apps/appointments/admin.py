@@ -1,7 +1,7 @@
 # en apps/appointments/admin.py
 
 from django.contrib import admin
-from .models import Appointment, PsychologistAvailability
+from .models import Appointment, PsychologistAvailability, Review
 
 class AppointmentAdmin(admin.ModelAdmin):
     list_display = ('patient', 'psychologist', 'appointment_date', 'start_time', 'status', 'is_paid')
@@ -17,5 +17,11 @@ class PsychologistAvailabilityAdmin(admin.ModelAdmin):
         return obj.get_weekday_display()
     get_weekday_display.short_description = 'Día de la Semana'
 
+class ReviewAdmin(admin.ModelAdmin):
+    list_display = ('appointment', 'patient', 'psychologist', 'rating', 'created_at')
+    list_filter = ('rating', 'psychologist')
+    raw_id_fields = ('appointment', 'patient', 'psychologist')
+
 admin.site.register(Appointment, AppointmentAdmin)
-admin.site.register(PsychologistAvailability, PsychologistAvailabilityAdmin)
\ No newline at end of file
+admin.site.register(PsychologistAvailability, PsychologistAvailabilityAdmin)
+admin.site.register(Review, ReviewAdmin)
\ No newline at end of file
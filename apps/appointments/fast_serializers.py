@@ -0,0 +1,107 @@
+# apps/appointments/fast_serializers.py
+
+import functools
+from .models import Appointment, PsychologistAvailability
+from .serializers import AppointmentSerializer
+
+# Serialización de listados grandes desde filas de values_list(): sin instancias
+# de modelo ni recorrido de campos de DRF por fila, y con los nombres por JOIN
+# (AppointmentSerializer hace una consulta por paciente/psicólogo).
+# La salida es la misma que la de los serializers originales byte a byte
+# (ver el comando compare_serializers); los decimales y fechas con zona horaria
+# se formatean con los mismos campos de DRF.
+
+STATUS_LABELS = dict(Appointment.STATUS_CHOICES)
+APPOINTMENT_TYPE_LABELS = dict(Appointment.APPOINTMENT_TYPE)
+WEEKDAY_LABELS = dict(PsychologistAvailability.WEEKDAYS)
+
+APPOINTMENT_COLUMNS = (
+    'id', 'patient_id', 'patient__first_name', 'patient__last_name',
+    'psychologist_id', 'psychologist__first_name', 'psychologist__last_name',
+    'appointment_date', 'start_time', 'end_time', 'appointment_type', 'status',
+    'reason_for_visit', 'notes', 'consultation_fee', 'is_paid', 'meeting_link',
+    'created_at', 'updated_at',
+)
+
+AVAILABILITY_COLUMNS = (
+    'id', 'psychologist_id', 'psychologist__first_name', 'psychologist__last_name',
+    'weekday', 'start_time', 'end_time', 'is_active', 'blocked_dates',
+)
+
+
+@functools.cache
+def _appointment_fields():
+    fields = AppointmentSerializer().fields
+    return fields['consultation_fee'].to_representation, fields['created_at'].to_representation
+
+
+def _full_name(first_name, last_name):
+    """Igual que CustomUser.get_full_name()"""
+    return f"{first_name} {last_name}".strip()
+
+
+def appointment_rows(queryset):
+    """Filas para serialize_appointments (se puede paginar como un queryset)"""
+    return queryset.values_list(*APPOINTMENT_COLUMNS)
+
+
+def serialize_appointments(rows):
+    """Misma salida que AppointmentSerializer(many=True).data"""
+    decimal, datetime = _appointment_fields()
+    return [
+        {
+            'id': pk,
+            'patient': patient_id,
+            'patient_name': _full_name(patient_first, patient_last),
+            'psychologist': psychologist_id,
+            'psychologist_name': _full_name(psychologist_first, psychologist_last),
+            'appointment_date': appointment_date.isoformat(),
+            'start_time': start_time.isoformat(),
+            'end_time': end_time.isoformat(),
+            'appointment_type': appointment_type,
+            'appointment_type_display': APPOINTMENT_TYPE_LABELS.get(appointment_type, appointment_type),
+            'status': status,
+            'status_display': STATUS_LABELS.get(status, status),
+            'reason_for_visit': reason_for_visit,
+            'notes': notes,
+            'consultation_fee': None if fee is None else decimal(fee),
+            'is_paid': is_paid,
+            'meeting_link': meeting_link,
+            'created_at': datetime(created_at),
+            'updated_at': datetime(updated_at),
+        }
+        for (
+            pk, patient_id, patient_first, patient_last,
+            psychologist_id, psychologist_first, psychologist_last,
+            appointment_date, start_time, end_time, appointment_type, status,
+            reason_for_visit, notes, fee, is_paid, meeting_link,
+            created_at, updated_at,
+        ) in rows
+    ]
+
+
+def availability_rows(queryset):
+    """Filas para serialize_availabilities (se puede paginar como un queryset)"""
+    return queryset.values_list(*AVAILABILITY_COLUMNS)
+
+
+def serialize_availabilities(rows):
+    """Misma salida que PsychologistAvailabilitySerializer(many=True).data"""
+    return [
+        {
+            'id': pk,
+            'psychologist': psychologist_id,
+            'psychologist_name': _full_name(first_name, last_name),
+            'weekday': weekday,
+            'weekday_display': WEEKDAY_LABELS.get(weekday, weekday),
+            'start_time': start_time.isoformat(),
+            'end_time': end_time.isoformat(),
+            'is_active': is_active,
+            'blocked_dates': blocked_dates,
+        }
+        for (
+            pk, psychologist_id, first_name, last_name,
+            weekday, start_time, end_time, is_active, blocked_dates,
+        ) in rows
+    ]
+
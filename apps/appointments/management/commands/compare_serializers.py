@@ -0,0 +1,135 @@
+# apps/appointments/management/commands/compare_serializers.py
+
+import statistics
+import time
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework.renderers import JSONRenderer
+from apps.appointments.fast_serializers import (
+    appointment_rows,
+    availability_rows,
+    serialize_appointments,
+    serialize_availabilities,
+)
+from apps.appointments.models import Appointment, PsychologistAvailability
+from apps.appointments.schedule import get_templates
+from apps.appointments.serializers import AppointmentSerializer, PsychologistAvailabilitySerializer
+from apps.professionals.fast_serializers import serialize_directory
+from apps.professionals.models import ProfessionalProfile
+from apps.professionals.serializers import ProfessionalPublicSerializer
+from config.renderers import FastJSONRenderer
+
+
+def drf_appointments(queryset):
+    return AppointmentSerializer(queryset, many=True).data
+
+
+def fast_appointments(queryset):
+    return serialize_appointments(appointment_rows(queryset))
+
+
+def drf_availabilities(queryset):
+    return PsychologistAvailabilitySerializer(queryset, many=True).data
+
+
+def fast_availabilities(queryset):
+    return serialize_availabilities(availability_rows(queryset))
+
+
+def drf_directory(queryset):
+    # Igual que list_professionals antes de fast_serializers.py
+    profiles = list(queryset.select_related('user').prefetch_related('specializations'))
+    return ProfessionalPublicSerializer(
+        profiles,
+        many=True,
+        context={'schedule_templates': get_templates(profile.user_id for profile in profiles)}
+    ).data
+
+
+# nombre -> (queryset, serializer original, serializer rápido)
+CHECKS = {
+    'appointments': (
+        lambda limit: Appointment.objects.order_by('-appointment_date', '-start_time')[:limit],
+        drf_appointments,
+        fast_appointments,
+    ),
+    'availabilities': (
+        lambda limit: PsychologistAvailability.objects.filter(is_active=True)[:limit],
+        drf_availabilities,
+        fast_availabilities,
+    ),
+    'directory': (
+        lambda limit: ProfessionalProfile.objects.filter(is_active=True, profile_completed=True)[:limit],
+        drf_directory,
+        serialize_directory,
+    ),
+}
+
+
+class Command(BaseCommand):
+    help = (
+        'Verifica que los serializers rápidos (fast_serializers.py) y FastJSONRenderer '
+        'producen el mismo JSON byte a byte que los serializers de DRF sobre los datos '
+        'actuales, y compara su rendimiento (consulta + serialización + render).'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--limit', type=int, default=1000, help='Filas por listado')
+        parser.add_argument('--iterations', type=int, default=10, help='Repeticiones medidas de cada lado')
+        parser.add_argument('--only', help='Listados a comparar, separados por coma')
+
+    def handle(self, *args, **options):
+        names = list(CHECKS)
+        if options['only']:
+            names = [name.strip() for name in options['only'].split(',')]
+            unknown = set(names) - set(CHECKS)
+            if unknown:
+                raise CommandError(f'Listados desconocidos: {", ".join(sorted(unknown))}')
+
+        drf_renderer = JSONRenderer()
+        fast_renderer = FastJSONRenderer()
+        mismatches = []
+        for name in names:
+            queryset, drf, fast = CHECKS[name]
+
+            def reference():
+                return drf_renderer.render(drf(queryset(options['limit'])))
+
+            def candidate():
+                return fast_renderer.render(fast(queryset(options['limit'])))
+
+            expected, actual = reference(), candidate()
+            if expected != actual:
+                mismatches.append(name)
+                self.report_mismatch(name, expected, actual)
+                continue
+
+            drf_ms = self.measure(reference, options['iterations'])
+            fast_ms = self.measure(candidate, options['iterations'])
+            rows = len(fast(queryset(options['limit'])))
+            self.stdout.write(
+                f'{name:16} {rows:>6} filas, {len(expected):>9} bytes idénticos | '
+                f'DRF {drf_ms:8.1f}ms  rápido {fast_ms:8.1f}ms  ({drf_ms / fast_ms:.1f}x)'
+            )
+
+        if mismatches:
+            raise CommandError(f'Salida distinta en: {", ".join(mismatches)}')
+        self.stdout.write(self.style.SUCCESS('✅ Salida idéntica en todos los listados'))
+
+    def measure(self, render, iterations):
+        """Mediana en ms"""
+        timings = []
+        for _ in range(iterations):
+            start = time.perf_counter()
+            render()
+            timings.append((time.perf_counter() - start) * 1000)
+        return statistics.median(timings)
+
+    def report_mismatch(self, name, expected, actual):
+        index = next(
+            (i for i, (a, b) in enumerate(zip(expected, actual)) if a != b),
+            min(len(expected), len(actual))
+        )
+        start = max(0, index - 80)
+        self.stdout.write(self.style.ERROR(f'{name}: primera diferencia en el byte {index}'))
+        self.stdout.write(f'  DRF:    {expected[start:index + 80]!r}')
+        self.stdout.write(f'  rápido: {actual[start:index + 80]!r}')
@@ -0,0 +1,82 @@
+# apps/appointments/management/commands/reconcile_ratings.py
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count, Sum
+from apps.appointments.models import Review
+from apps.professionals.models import ProfessionalProfile
+from decimal import Decimal, ROUND_HALF_UP
+
+
+class Command(BaseCommand):
+    help = 'Recalcula rating_sum/total_reviews/average_rating desde las reseñas y corrige desvíos'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Solo mostrar los perfiles con desvío, sin corregirlos'
+        )
+
+    def handle(self, *args, **options):
+        dry_run = options['dry_run']
+
+        # Un solo GROUP BY sobre las reseñas
+        totals = {
+            row['psychologist_id']: (row['rating_sum'], row['total'])
+            for row in Review.objects.values('psychologist_id').annotate(
+                rating_sum=Sum('rating'),
+                total=Count('id')
+            )
+        }
+
+        fixed = 0
+        profiles = ProfessionalProfile.objects.only(
+            'id', 'user_id', 'rating_sum', 'total_reviews', 'average_rating'
+        )
+        for profile in profiles.iterator():
+            rating_sum, total = totals.get(profile.user_id, (0, 0))
+            average = self.average(rating_sum, total)
+
+            if (profile.rating_sum == rating_sum and
+                    profile.total_reviews == total and
+                    profile.average_rating == average):
+                continue
+
+            self.stdout.write(
+                f'Desvío en perfil {profile.id}: '
+                f'suma {profile.rating_sum}->{rating_sum}, '
+                f'total {profile.total_reviews}->{total}, '
+                f'promedio {profile.average_rating}->{average}'
+            )
+            fixed += 1
+
+            if not dry_run:
+                self.fix_profile(profile)
+
+        if dry_run:
+            self.stdout.write(self.style.WARNING(f'{fixed} perfiles con desvío (dry-run)'))
+        else:
+            self.stdout.write(self.style.SUCCESS(f'✅ {fixed} perfiles corregidos'))
+
+    def average(self, rating_sum, total):
+        if not total:
+            return Decimal('0.00')
+        return (Decimal(rating_sum) / total).quantize(
+            Decimal('0.01'), rounding=ROUND_HALF_UP
+        )
+
+    def fix_profile(self, profile):
+        """Recalcula bajo bloqueo de fila para no pisar reseñas concurrentes"""
+        with transaction.atomic():
+            ProfessionalProfile.objects.select_for_update().filter(pk=profile.pk).first()
+            aggregate = Review.objects.filter(
+                psychologist_id=profile.user_id
+            ).aggregate(rating_sum=Sum('rating'), total=Count('id'))
+            rating_sum = aggregate['rating_sum'] or 0
+            total = aggregate['total']
+            ProfessionalProfile.objects.filter(pk=profile.pk).update(
+                rating_sum=rating_sum,
+                total_reviews=total,
+                average_rating=self.average(rating_sum, total)
+            )
@@ -0,0 +1,25 @@
+# Generated by Django 5.2.6 on 2026-10-19 02:48
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('appointments', '0002_alter_appointment_psychologist_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ScheduleVersion',
+            fields=[
+                ('psychologist_id', models.PositiveBigIntegerField(primary_key=True, serialize=False)),
+                ('version', models.BigIntegerField(default=0)),
+            ],
+            options={
+                'verbose_name': 'Versión de horario',
+                'verbose_name_plural': 'Versiones de horarios',
+                'db_table': 'schedule_versions',
+            },
+        ),
+    ]
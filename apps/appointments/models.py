@@ -1,8 +1,11 @@
 # apps/appointments/models.py
 
-from django.db import models
+import time
+from django.db import models, transaction
+from django.db.models import F
 from django.conf import settings
 from django.core.exceptions import ValidationError
+from django.core.validators import MinValueValidator, MaxValueValidator
 from django.utils import timezone
 from datetime import datetime, timedelta
 
@@ -48,6 +51,38 @@ class PsychologistAvailability(models.Model):
         return f"{self.psychologist.get_full_name()} - {self.get_weekday_display()} {self.start_time}-{self.end_time}"
 
 
+class ScheduleVersion(models.Model):
+    """
+    Versión de la plantilla semanal compilada de cada psicólogo (ver schedule.py).
+    Vive en la BD, como CatalogVersion: todos los workers comparan su plantilla
+    cacheada contra la misma fila y una evicción de la caché no la reinicia.
+    Sin FK al usuario: las señales de un borrado en cascada pueden subir la
+    versión mientras el usuario se está borrando.
+    """
+    psychologist_id = models.PositiveBigIntegerField(primary_key=True)
+    version = models.BigIntegerField(default=0)
+    
+    class Meta:
+        db_table = 'schedule_versions'
+        verbose_name = 'Versión de horario'
+        verbose_name_plural = 'Versiones de horarios'
+    
+    def __str__(self):
+        return f"Horario {self.psychologist_id} v{self.version}"
+    
+    @classmethod
+    def bump(cls, user_id):
+        updated = cls.objects.filter(psychologist_id=user_id).update(version=F('version') + 1)
+        if not updated:
+            # La primera versión no coincide con ninguna plantilla compilada sin fila (versión 0)
+            _, created = cls.objects.get_or_create(
+                psychologist_id=user_id,
+                defaults={'version': time.time_ns()}
+            )
+            if not created:
+                cls.objects.filter(psychologist_id=user_id).update(version=F('version') + 1)
+
+
 class Appointment(models.Model):
     """
     Modelo para las citas entre pacientes y psicólogos
@@ -141,22 +176,22 @@ class Appointment(models.Model):
     
     def is_within_availability(self):
         """Verifica si la cita está dentro del horario disponible del psicólogo"""
-        weekday = self.appointment_date.weekday()
+        from .schedule import booking_template, seconds_of_day
         
-        # Verificar si la fecha está bloqueada
-        availabilities = self.psychologist.availabilities.filter(
-            weekday=weekday,
-            is_active=True
-        )
+        template = booking_template(self.psychologist_id)
+        date_str = str(self.appointment_date)
+        start = seconds_of_day(self.start_time)
+        end = seconds_of_day(self.end_time)
         
-        for availability in availabilities:
+        for available_start, available_end, blocked_dates in template.intervals(
+            self.appointment_date.weekday()
+        ):
             # Verificar si la fecha específica está bloqueada
-            if str(self.appointment_date) in availability.blocked_dates:
+            if date_str in blocked_dates:
                 return False
             
             # Verificar si el horario está dentro del rango disponible
-            if (availability.start_time <= self.start_time and 
-                self.end_time <= availability.end_time):
+            if available_start <= start and end <= available_end:
                 return True
         
         return False
@@ -209,4 +244,52 @@ class TimeSlot(models.Model):
         ordering = ['date', 'start_time']
     
     def __str__(self):
-        return f"{self.psychologist.get_full_name()} - {self.date} {self.start_time}-{self.end_time}"
\ No newline at end of file
+        return f"{self.psychologist.get_full_name()} - {self.date} {self.start_time}-{self.end_time}"
+
+
+class Review(models.Model):
+    """
+    Reseña de un paciente sobre una cita completada.
+    average_rating/total_reviews del perfil profesional se mantienen de forma
+    incremental desde señales (signals.py), así también los borrados en cascada
+    y QuerySet.delete() descuentan la reseña.
+    """
+    appointment = models.OneToOneField(
+        Appointment,
+        on_delete=models.CASCADE,
+        related_name='review',
+        limit_choices_to={'status': 'completed'}
+    )
+    patient = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name='reviews_written'
+    )
+    psychologist = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name='reviews_received'
+    )
+    rating = models.PositiveSmallIntegerField(
+        validators=[MinValueValidator(1), MaxValueValidator(5)]
+    )
+    comment = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['-created_at']
+        verbose_name = 'Reseña'
+        verbose_name_plural = 'Reseñas'
+
+    def clean(self):
+        if self.appointment.status != 'completed':
+            raise ValidationError('Solo se pueden reseñar citas completadas')
+
+    def save(self, *args, **kwargs):
+        # La reseña y el agregado del perfil (señales pre_save/post_save en
+        # signals.py) se escriben en la misma transacción
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+
+    def __str__(self):
+        return f"{self.rating}★ - {self.appointment}"
@@ -0,0 +1,300 @@
+# apps/appointments/schedule.py
+
+from array import array
+from datetime import datetime, time, timedelta
+from django.core.cache import cache
+from apps.professionals.models import ProfessionalProfile, WorkingHours
+from config.caches import shared_cache
+from config.replicas import primary_reads
+from .models import Appointment, PsychologistAvailability, ScheduleVersion
+
+# Plantilla semanal compilada por psicólogo.
+# Une WorkingHours (directorio) y PsychologistAvailability (reservas) en una
+# estructura inmutable y compacta: por cada día de la semana, un array de
+# segundos del día [inicio0, fin0, inicio1, fin1, ...] ordenado por inicio.
+# Se guarda en caché junto con su versión (fila de ScheduleVersion, que se
+# incrementa en la misma transacción que cambia cualquiera de sus fuentes, ver
+# signals.py); una plantilla cacheada solo se usa si su versión es la de la BD,
+# así la copia de cualquier worker deja de usarse apenas confirma el cambio.
+TEMPLATE_KEY = 'schedule:template:{}'
+TEMPLATE_TIMEOUT = 60 * 60 * 24
+DEFAULT_SESSION_DURATION = 60
+
+WEEKDAY_NAMES = dict(WorkingHours.DAYS_OF_WEEK)
+
+
+def seconds_of_day(value):
+    return value.hour * 3600 + value.minute * 60 + value.second
+
+
+def time_of_day(seconds):
+    return time(seconds // 3600, seconds // 60 % 60, seconds % 60)
+
+
+class WeeklyTemplate:
+    """Horario semanal compilado e inmutable de un psicólogo"""
+
+    __slots__ = ('user_id', 'version', 'session_duration', 'availability',
+                 'blocked_dates', 'working_hours')
+
+    def __init__(self, user_id, version, session_duration, availability,
+                 blocked_dates, working_hours):
+        self.user_id = user_id
+        self.version = version
+        self.session_duration = session_duration
+        self.availability = availability      # 7 x array('I') de pares inicio/fin
+        self.blocked_dates = blocked_dates    # 7 x tupla de frozenset por intervalo
+        self.working_hours = working_hours    # tupla de (id, día, inicio, fin, activo)
+
+    def __getstate__(self):
+        return tuple(getattr(self, name) for name in self.__slots__)
+
+    def __setstate__(self, state):
+        for name, value in zip(self.__slots__, state):
+            setattr(self, name, value)
+
+    def intervals(self, weekday):
+        """[(inicio, fin, fechas_bloqueadas)] de disponibilidad para un día de la semana"""
+        packed = self.availability[weekday]
+        blocked = self.blocked_dates[weekday]
+        return [
+            (packed[i], packed[i + 1], blocked[i // 2])
+            for i in range(0, len(packed), 2)
+        ]
+
+    def has_availability(self, weekday):
+        return len(self.availability[weekday]) > 0
+
+    def is_available_on(self, date):
+        """Tiene al menos un bloque de disponibilidad no bloqueado en la fecha"""
+        date_str = str(date)
+        return any(
+            date_str not in blocked
+            for _, _, blocked in self.intervals(date.weekday())
+        )
+
+    def find_interval(self, weekday, start_time, end_time):
+        """
+        Primer bloque (por hora de inicio) que contiene [start_time, end_time].
+        Devuelve (inicio, fin, fechas_bloqueadas) o None.
+        """
+        start = seconds_of_day(start_time)
+        end = seconds_of_day(end_time)
+        for interval in self.intervals(weekday):
+            if interval[0] <= start and end <= interval[1]:
+                return interval
+        return None
+
+    def day_slots(self, date):
+        """
+        Slots de duración de sesión para una fecha.
+        Devuelve (slots, hay_bloqueo) con slots = [(time_inicio, time_fin)].
+        """
+        date_str = str(date)
+        step = self.session_duration * 60
+        slots = []
+        blocked_day = False
+
+        for start, end, blocked in self.intervals(date.weekday()):
+            if date_str in blocked:
+                blocked_day = True
+                continue
+
+            current = start
+            while current + step <= end:
+                slots.append((time_of_day(current), time_of_day(current + step)))
+                current += step
+
+        return slots, blocked_day
+
+    def working_hours_data(self):
+        """Misma salida que WorkingHoursSerializer(many=True)"""
+        return [
+            {
+                'id': pk,
+                'day_of_week': day,
+                'day_name': WEEKDAY_NAMES.get(day, day),
+                'start_time': time_of_day(start).isoformat(),
+                'end_time': time_of_day(end).isoformat(),
+                'is_active': is_active,
+            }
+            for pk, day, start, end, is_active in self.working_hours
+        ]
+
+
+COMPILE_BATCH_SIZE = 1000
+
+
+def compile_templates(versions):
+    """
+    Construye plantillas desde la BD para {user_id: versión}.
+    Usa 3 consultas por lote de usuarios, no por psicólogo.
+    """
+    templates = {}
+    user_ids = list(versions)
+    # Siempre desde la primaria: la plantilla queda en caché bajo la versión actual
+    with primary_reads():
+        for offset in range(0, len(user_ids), COMPILE_BATCH_SIZE):
+            batch = user_ids[offset:offset + COMPILE_BATCH_SIZE]
+            templates.update(_compile_batch(batch, versions))
+    return templates
+
+
+def _compile_batch(user_ids, versions):
+    profiles = {
+        user_id: (profile_id, session_duration)
+        for profile_id, user_id, session_duration in ProfessionalProfile.objects.filter(
+            user_id__in=user_ids
+        ).values_list('id', 'user_id', 'session_duration')
+    }
+
+    availability = {user_id: [array('I') for _ in range(7)] for user_id in user_ids}
+    blocked_dates = {user_id: [[] for _ in range(7)] for user_id in user_ids}
+    rows = PsychologistAvailability.objects.filter(
+        psychologist_id__in=user_ids,
+        is_active=True
+    ).order_by('psychologist_id', 'weekday', 'start_time').values_list(
+        'psychologist_id', 'weekday', 'start_time', 'end_time', 'blocked_dates'
+    )
+    for user_id, weekday, start_time, end_time, blocked in rows:
+        availability[user_id][weekday].extend(
+            (seconds_of_day(start_time), seconds_of_day(end_time))
+        )
+        blocked_dates[user_id][weekday].append(frozenset(blocked or ()))
+
+    user_by_profile = {profile_id: user_id for user_id, (profile_id, _) in profiles.items()}
+    working_hours = {user_id: [] for user_id in user_ids}
+    for pk, profile_id, day, start_time, end_time, is_active in WorkingHours.objects.filter(
+        professional_id__in=user_by_profile
+    ).order_by('id').values_list(
+        'id', 'professional_id', 'day_of_week', 'start_time', 'end_time', 'is_active'
+    ):
+        working_hours[user_by_profile[profile_id]].append(
+            (pk, day, seconds_of_day(start_time), seconds_of_day(end_time), is_active)
+        )
+
+    return {
+        user_id: WeeklyTemplate(
+            user_id=user_id,
+            version=versions[user_id],
+            session_duration=(
+                profiles[user_id][1] if user_id in profiles else DEFAULT_SESSION_DURATION
+            ),
+            availability=tuple(availability[user_id]),
+            blocked_dates=tuple(tuple(day) for day in blocked_dates[user_id]),
+            working_hours=tuple(working_hours[user_id]),
+        )
+        for user_id in user_ids
+    }
+
+
+def compile_template(user_id, version=0):
+    """Construye la plantilla de un psicólogo desde la BD (3 consultas)"""
+    return compile_templates({user_id: version})[user_id]
+
+
+def template_versions(user_ids):
+    """{user_id: versión} desde la BD; sin fila, versión 0"""
+    user_ids = list(user_ids)
+    versions = {}
+    # Desde la primaria: una versión atrasada haría recompilar en cada lectura
+    with primary_reads():
+        for offset in range(0, len(user_ids), COMPILE_BATCH_SIZE):
+            versions.update(ScheduleVersion.objects.filter(
+                psychologist_id__in=user_ids[offset:offset + COMPILE_BATCH_SIZE]
+            ).values_list('psychologist_id', 'version'))
+    return versions
+
+
+def get_templates(user_ids):
+    """
+    Plantillas de varios psicólogos: {user_id: plantilla}.
+    Una consulta de versiones y una lectura de caché; solo se compilan las que cambiaron.
+    """
+    user_ids = set(user_ids)
+    versions = template_versions(user_ids)
+    cached = cache.get_many([TEMPLATE_KEY.format(user_id) for user_id in user_ids])
+
+    templates = {}
+    missing = {}
+    for user_id in user_ids:
+        version = versions.get(user_id, 0)
+        template = cached.get(TEMPLATE_KEY.format(user_id))
+        if template is None or template.version != version:
+            missing[user_id] = version
+        else:
+            templates[user_id] = template
+
+    if missing:
+        compiled = compile_templates(missing)
+        cache.set_many(
+            {TEMPLATE_KEY.format(user_id): template for user_id, template in compiled.items()},
+            TEMPLATE_TIMEOUT
+        )
+        templates.update(compiled)
+    return templates
+
+
+def get_template(user_id):
+    return get_templates([user_id])[user_id]
+
+
+def booking_template(user_id):
+    """
+    Plantilla para validar una reserva. Con una caché compartida (Redis) se
+    usa la versionada; con una caché local al proceso se compila desde la BD
+    (3 consultas), así la validación no depende del estado de este worker.
+    """
+    if shared_cache():
+        return get_template(user_id)
+    return compile_template(user_id)
+
+
+def invalidate_template(user_id):
+    """Sube la versión dentro de la transacción actual (se ve al confirmar)"""
+    ScheduleVersion.bump(user_id)
+
+
+def next_free_slots(user_ids, now, horizon_days=14):
+    """
+    Primer slot libre (datetime local, sin tz) de cada psicólogo a partir de `now`
+    dentro de `horizon_days`: {user_id: datetime | None}.
+    Las citas ocupadas se leen en una consulta por lote de psicólogos.
+    """
+    user_ids = list(user_ids)
+    templates = get_templates(user_ids)
+    today = now.date()
+    last_day = today + timedelta(days=horizon_days)
+
+    booked = {}
+    for offset in range(0, len(user_ids), COMPILE_BATCH_SIZE):
+        rows = Appointment.objects.filter(
+            psychologist_id__in=user_ids[offset:offset + COMPILE_BATCH_SIZE],
+            appointment_date__range=(today, last_day),
+            status__in=['pending', 'confirmed']
+        ).values_list('psychologist_id', 'appointment_date', 'start_time', 'end_time')
+        for user_id, appointment_date, start_time, end_time in rows:
+            booked.setdefault((user_id, appointment_date), []).append((start_time, end_time))
+
+    result = {}
+    for user_id in user_ids:
+        template = templates[user_id]
+        result[user_id] = None
+        for day in range(horizon_days + 1):
+            current_date = today + timedelta(days=day)
+            if not template.has_availability(current_date.weekday()):
+                continue
+
+            day_booked = booked.get((user_id, current_date), ())
+            slots, _ = template.day_slots(current_date)
+            for slot_start, slot_end in slots:
+                if day == 0 and slot_start <= now.time():
+                    continue
+                if not any(b_start < slot_end and b_end > slot_start for b_start, b_end in day_booked):
+                    result[user_id] = datetime.combine(current_date, slot_start)
+                    break
+
+            if result[user_id] is not None:
+                break
+
+    return result
@@ -2,8 +2,11 @@
 
 from rest_framework import serializers
 from django.contrib.auth import get_user_model
-from .models import Appointment, PsychologistAvailability, TimeSlot
+from django.db import IntegrityError, transaction
+from config import metrics
+from .models import Appointment, PsychologistAvailability, TimeSlot, Review
 from apps.professionals.serializers import ProfessionalProfileSerializer
+from .schedule import booking_template, get_template
 from datetime import datetime, timedelta
 
 User = get_user_model()
@@ -92,15 +95,11 @@ class AppointmentSerializer(serializers.ModelSerializer):
                 # Si no se pudo calcular la hora de fin, detenemos la validación
                 raise serializers.ValidationError("No se pudo determinar la duración de la sesión.")
             
-            # Verificar disponibilidad
+            # Verificar disponibilidad (plantilla semanal compilada)
             weekday = appointment_date.weekday()
-            availability = PsychologistAvailability.objects.filter(
-                psychologist=psychologist,
-                weekday=weekday,
-                is_active=True,
-                start_time__lte=start_time,
-                end_time__gte=calculated_end_time # <-- Usamos la variable calculada
-            ).first()
+            availability = booking_template(psychologist.id).find_interval(
+                weekday, start_time, calculated_end_time # <-- Usamos la variable calculada
+            )
             
             if not availability:
                 raise serializers.ValidationError(
@@ -108,7 +107,8 @@ class AppointmentSerializer(serializers.ModelSerializer):
                 )
             
             # Verificar si la fecha está bloqueada
-            if str(appointment_date) in availability.blocked_dates:
+            _, _, blocked_dates = availability
+            if str(appointment_date) in blocked_dates:
                 raise serializers.ValidationError(
                     "El psicólogo no está disponible en esta fecha"
                 )
@@ -148,6 +148,14 @@ class AppointmentCreateSerializer(serializers.ModelSerializer):
             'appointment_type', 'reason_for_visit', 'notes'
         ]
 
+    def run_validators(self, value):
+        # El único validador de nivel serializer es el unique_together de la cita
+        try:
+            super().run_validators(value)
+        except serializers.ValidationError:
+            metrics.inc('appointment_bookings_total', result='conflict')
+            raise
+
     # --- ARREGLO 2: LÓGICA DE VALIDACIÓN (La que te di antes) ---
     def validate(self, data):
         psychologist = data.get('psychologist')
@@ -177,22 +185,19 @@ class AppointmentCreateSerializer(serializers.ModelSerializer):
         calculated_end_time = end_datetime.time()
         data['end_time'] = calculated_end_time # Añadir la hora de fin a los datos validados
 
-        # Validar disponibilidad
+        # Validar disponibilidad (plantilla semanal compilada)
         weekday = appointment_date.weekday()
-        availability = PsychologistAvailability.objects.filter(
-            psychologist=psychologist,
-            weekday=weekday,
-            is_active=True,
-            start_time__lte=start_time,
-            end_time__gte=calculated_end_time
-        ).first()
+        availability = booking_template(psychologist.id).find_interval(
+            weekday, start_time, calculated_end_time
+        )
         
         if not availability:
             raise serializers.ValidationError(
                 "El psicólogo no está disponible en este horario"
             )
         
-        if str(appointment_date) in availability.blocked_dates:
+        _, _, blocked_dates = availability
+        if str(appointment_date) in blocked_dates:
             raise serializers.ValidationError(
                 "El psicólogo no está disponible en esta fecha"
             )
@@ -208,6 +213,7 @@ class AppointmentCreateSerializer(serializers.ModelSerializer):
         )
         
         if conflicting_appointments.exists():
+            metrics.inc('appointment_bookings_total', result='conflict')
             raise serializers.ValidationError(
                 "Ya existe una cita en este horario"
             )
@@ -233,7 +239,15 @@ class AppointmentCreateSerializer(serializers.ModelSerializer):
             if 'consultation_fee' not in validated_data:
                  validated_data['consultation_fee'] = psychologist.professional_profile.consultation_fee
         
-        return super().create(validated_data)
+        try:
+            with transaction.atomic():
+                appointment = super().create(validated_data)
+        except IntegrityError:
+            # Otra reserva del mismo horario ganó la carrera (unique psicólogo/fecha/hora)
+            metrics.inc('appointment_bookings_total', result='conflict')
+            raise serializers.ValidationError("Ya existe una cita en este horario")
+        metrics.inc('appointment_bookings_total', result='created')
+        return appointment
 
 class AvailablePsychologistSerializer(serializers.ModelSerializer):
     """Serializer para mostrar psicólogos disponibles con sus slots de tiempo"""
@@ -262,49 +276,33 @@ class AvailablePsychologistSerializer(serializers.ModelSerializer):
         except ValueError:
             return []
         
-        # Obtener disponibilidad del día
-        weekday = search_date.weekday()
-        availabilities = obj.availabilities.filter(
-            weekday=weekday,
-            is_active=True
-        )
+        # Slots desde la plantilla semanal compilada
+        template = self.context.get('schedule_templates', {}).get(obj.id)
+        if template is None:
+            template = get_template(obj.id)
+        day_slots, _ = template.day_slots(search_date)
+        
+        # Citas ocupadas del día en una sola consulta
+        booked = list(Appointment.objects.filter(
+            psychologist=obj,
+            appointment_date=search_date,
+            status__in=['pending', 'confirmed']
+        ).values_list('start_time', 'end_time'))
         
         slots = []
-        for availability in availabilities:
-            # Verificar si la fecha está bloqueada
-            if str(search_date) in availability.blocked_dates:
-                continue
-            
-            # Generar slots de tiempo disponibles
-            current_time = datetime.combine(search_date, availability.start_time)
-            end_time = datetime.combine(search_date, availability.end_time)
-            
-            # Duración de sesión
-            duration = 60  # Default
-            if hasattr(obj, 'professional_profile'):
-                duration = obj.professional_profile.session_duration
+        for slot_start, slot_end in day_slots:
+            # Verificar si el slot está ocupado
+            is_booked = any(
+                booked_start < slot_end and booked_end > slot_start
+                for booked_start, booked_end in booked
+            )
             
-            while current_time + timedelta(minutes=duration) <= end_time:
-                slot_start = current_time.time()
-                slot_end = (current_time + timedelta(minutes=duration)).time()
-                
-                # Verificar si el slot está ocupado
-                is_booked = Appointment.objects.filter(
-                    psychologist=obj,
-                    appointment_date=search_date,
-                    start_time__lt=slot_end,
-                    end_time__gt=slot_start,
-                    status__in=['pending', 'confirmed']
-                ).exists()
-                
-                if not is_booked:
-                    slots.append({
-                        'start_time': slot_start.strftime('%H:%M'),
-                        'end_time': slot_end.strftime('%H:%M'),
-                        'is_available': True
-                    })
-                
-                current_time += timedelta(minutes=duration)
+            if not is_booked:
+                slots.append({
+                    'start_time': slot_start.strftime('%H:%M'),
+                    'end_time': slot_end.strftime('%H:%M'),
+                    'is_available': True
+                })
         
         return slots
 
@@ -333,4 +331,14 @@ class AppointmentUpdateSerializer(serializers.ModelSerializer):
                     f"No se puede cambiar de {current_status} a {value}"
                 )
         
-        return value
\ No newline at end of file
+        return value
+
+
+class ReviewSerializer(serializers.ModelSerializer):
+    """Serializer para reseñas de citas completadas"""
+    patient_name = serializers.CharField(source='patient.get_full_name', read_only=True)
+
+    class Meta:
+        model = Review
+        fields = ['id', 'appointment', 'patient_name', 'rating', 'comment', 'created_at']
+        read_only_fields = ['id', 'appointment', 'patient_name', 'created_at']
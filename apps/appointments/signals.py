@@ -0,0 +1,96 @@
+# apps/appointments/signals.py
+
+from django.contrib.auth import get_user_model
+from django.db.models.signals import pre_save, post_save, post_delete
+from django.dispatch import receiver
+from apps.professionals.models import ProfessionalProfile, WorkingHours
+from config.cache_tags import bump_tags_on_commit
+from .models import Appointment, PsychologistAvailability, Review
+from .schedule import invalidate_template
+
+User = get_user_model()
+
+
+def profile_tags(user_id):
+    """Las URLs de horario y reseñas usan el id del perfil, no el del usuario"""
+    return [
+        f'profile:{profile_id}'
+        for profile_id in ProfessionalProfile.objects.filter(user_id=user_id).values_list('id', flat=True)
+    ]
+
+
+@receiver(pre_save, sender=Review)
+def review_rating_before_save(sender, instance, raw=False, **kwargs):
+    # Calificación anterior bloqueada: dos ediciones simultáneas no pierden la diferencia
+    instance._previous_rating = None
+    if not raw and not instance._state.adding:
+        instance._previous_rating = Review.objects.select_for_update().filter(
+            pk=instance.pk
+        ).values_list('rating', flat=True).first()
+
+
+@receiver(post_save, sender=Review)
+def review_rating_saved(sender, instance, created, raw=False, **kwargs):
+    # raw (loaddata): los agregados vienen en el propio fixture
+    if raw:
+        return
+    if created:
+        ProfessionalProfile.apply_rating(instance.psychologist_id, instance.rating)
+    elif instance._previous_rating is not None and instance._previous_rating != instance.rating:
+        ProfessionalProfile.apply_rating(
+            instance.psychologist_id, instance.rating - instance._previous_rating, count_delta=0
+        )
+
+
+@receiver(post_delete, sender=Review)
+def review_rating_deleted(sender, instance, **kwargs):
+    # También en cascada (cita o usuario borrados) y con QuerySet.delete()
+    ProfessionalProfile.apply_rating(instance.psychologist_id, -instance.rating, count_delta=-1)
+
+
+@receiver(post_save, sender=PsychologistAvailability)
+@receiver(post_delete, sender=PsychologistAvailability)
+def availability_changed(sender, instance, **kwargs):
+    invalidate_template(instance.psychologist_id)
+    bump_tags_on_commit(*profile_tags(instance.psychologist_id))
+
+
+@receiver(post_save, sender=Appointment)
+@receiver(post_delete, sender=Appointment)
+def appointment_changed(sender, instance, **kwargs):
+    # Horario del psicólogo e historial de ambos participantes
+    bump_tags_on_commit(
+        *profile_tags(instance.psychologist_id),
+        f'appointments:user:{instance.patient_id}',
+        f'appointments:user:{instance.psychologist_id}',
+    )
+
+
+@receiver(post_save, sender=Review)
+@receiver(post_delete, sender=Review)
+def review_changed(sender, instance, **kwargs):
+    # apply_rating actualiza el promedio del perfil con update(), sin señales
+    bump_tags_on_commit(*profile_tags(instance.psychologist_id), 'professionals')
+
+
+@receiver(post_save, sender=WorkingHours)
+@receiver(post_delete, sender=WorkingHours)
+def working_hours_changed(sender, instance, **kwargs):
+    user_id = ProfessionalProfile.objects.filter(
+        pk=instance.professional_id
+    ).values_list('user_id', flat=True).first()
+    if user_id:
+        invalidate_template(user_id)
+
+
+@receiver(post_save, sender=ProfessionalProfile)
+def profile_changed(sender, instance, **kwargs):
+    # La plantilla incluye session_duration
+    invalidate_template(instance.user_id)
+
+
+@receiver(post_delete, sender=User)
+def professional_deleted(sender, instance, **kwargs):
+    # Si el ID se reutiliza (SQLite), la plantilla cacheada del anterior no coincide
+    if instance.user_type == 'professional':
+        invalidate_template(instance.id)
@@ -1,3 +1,240 @@
+# apps/appointments/tests.py
+
+import io
+from datetime import date, time, timedelta
+from decimal import Decimal
+from unittest import mock
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db.models.query import QuerySet
 from django.test import TestCase
+from rest_framework.test import APIClient
+from rest_framework.renderers import JSONRenderer
+from apps.professionals.models import ProfessionalProfile, Specialization
+from config.renderers import FastJSONRenderer
+from . import schedule
+from .management.commands.compare_serializers import CHECKS
+from .models import Appointment, PsychologistAvailability, Review, ScheduleVersion
+
+User = get_user_model()
+
+
+def create_professional(email='psico@example.com', **profile_fields):
+    user = User.objects.create_user(
+        email=email, first_name='Ana', last_name='Paz', user_type='professional'
+    )
+    fields = {
+        'license_number': f'LIC-{user.pk}',
+        'bio': 'Bio',
+        'education': 'Psicología',
+        'experience_years': 5,
+        'consultation_fee': Decimal('150.00'),
+        'profile_completed': True,
+    }
+    fields.update(profile_fields)
+    profile = ProfessionalProfile.objects.create(user=user, **fields)
+    return user, profile
+
+
+def create_patient(email='paciente@example.com'):
+    return User.objects.create_user(
+        email=email, first_name='Luis', last_name='Rojas', user_type='patient'
+    )
+
+
+def create_appointment(patient, psychologist, days=7, start=time(10, 0), **fields):
+    return Appointment.objects.create(
+        patient=patient,
+        psychologist=psychologist,
+        appointment_date=date.today() + timedelta(days=days),
+        start_time=start,
+        end_time=time(start.hour + 1, start.minute),
+        **fields
+    )
+
+
+class ReviewRatingAggregateTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.psychologist, self.profile = create_professional()
+        self.patient = create_patient()
+
+    def review(self, rating, days=-7, start=time(10, 0)):
+        appointment = create_appointment(
+            self.patient, self.psychologist, days=days, start=start, status='completed'
+        )
+        return Review.objects.create(
+            appointment=appointment,
+            patient=self.patient,
+            psychologist=self.psychologist,
+            rating=rating
+        )
+
+    def assert_aggregates(self, rating_sum, total, average):
+        self.profile.refresh_from_db()
+        self.assertEqual(
+            (self.profile.rating_sum, self.profile.total_reviews, self.profile.average_rating),
+            (rating_sum, total, Decimal(average))
+        )
+
+    def test_create_edit_and_delete_update_aggregates(self):
+        review = self.review(4)
+        self.review(5, start=time(12, 0))
+        self.assert_aggregates(9, 2, '4.50')
+
+        review.rating = 2
+        review.save()
+        self.assert_aggregates(7, 2, '3.50')
+
+        review.delete()
+        self.assert_aggregates(5, 1, '5.00')
+
+    def test_cascade_delete_of_appointment_discounts_review(self):
+        review = self.review(4)
+        review.appointment.delete()
+        self.assert_aggregates(0, 0, '0.00')
+
+    def test_queryset_delete_discounts_every_review(self):
+        self.review(4)
+        self.review(2, start=time(12, 0))
+        Review.objects.all().delete()
+        self.assert_aggregates(0, 0, '0.00')
+
+    def test_concurrent_duplicate_review_returns_400(self):
+        review = self.review(4)
+        client = APIClient()
+        client.force_authenticate(self.patient)
+        url = f'/api/appointments/appointments/{review.appointment_id}/review/'
+
+        # La otra reseña entra entre el exists() y el INSERT
+        with mock.patch.object(QuerySet, 'exists', return_value=False):
+            response = client.post(url, {'rating': 5}, format='json')
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data, {'error': 'Esta cita ya fue calificada'})
+        self.assert_aggregates(4, 1, '4.00')
+
+
+class ScheduleTemplateTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.psychologist, self.profile = create_professional()
+        self.patient = create_patient()
+        self.day = date.today() + timedelta(days=7)
+        self.availability = PsychologistAvailability.objects.create(
+            psychologist=self.psychologist,
+            weekday=self.day.weekday(),
+            start_time=time(9, 0),
+            end_time=time(12, 0)
+        )
+
+    def book(self, start=time(10, 0)):
+        client = APIClient()
+        client.force_authenticate(self.patient)
+        return client.post('/api/appointments/appointments/', {
+            'psychologist': self.psychologist.id,
+            'appointment_date': str(self.day),
+            'start_time': start.strftime('%H:%M'),
+            'appointment_type': 'online',
+        }, format='json')
+
+    def slots(self):
+        return schedule.get_template(self.psychologist.id).day_slots(self.day)[0]
+
+    def test_cached_template_costs_one_version_query(self):
+        self.assertEqual(len(self.slots()), 3)
+        with self.assertNumQueries(1):
+            self.assertEqual(len(self.slots()), 3)
+
+    def test_change_bumps_database_version(self):
+        self.slots()
+        self.availability.end_time = time(10, 0)
+        self.availability.save()
+        self.assertEqual(len(self.slots()), 1)
+
+    def test_change_from_other_worker_is_seen_through_database_version(self):
+        self.slots()
+        # Otro worker: cambia la BD y sube la versión, sin tocar la caché de este proceso
+        PsychologistAvailability.objects.filter(pk=self.availability.pk).update(is_active=False)
+        ScheduleVersion.bump(self.psychologist.id)
+        self.assertEqual(self.slots(), [])
+
+    def test_version_never_restarts(self):
+        ScheduleVersion.objects.all().delete()
+        ScheduleVersion.bump(self.psychologist.id)
+        first = ScheduleVersion.objects.get(psychologist_id=self.psychologist.id).version
+        self.assertGreater(first, 1)
+        ScheduleVersion.bump(self.psychologist.id)
+        self.assertEqual(ScheduleVersion.objects.get(psychologist_id=self.psychologist.id).version, first + 1)
+
+    def test_cascade_delete_of_psychologist(self):
+        self.psychologist.delete()
+        self.assertFalse(PsychologistAvailability.objects.exists())
+
+    def test_booking_with_local_cache_validates_against_database(self):
+        self.slots()
+        # Copia local desactualizada y sin subir la versión: la reserva no la usa
+        PsychologistAvailability.objects.filter(pk=self.availability.pk).update(is_active=False)
+        response = self.book()
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(Appointment.objects.exists())
+
+    def test_booking_with_shared_cache_uses_versioned_template(self):
+        # Como con Redis
+        with mock.patch.object(schedule, 'shared_cache', return_value=True), \
+                mock.patch.object(schedule, 'get_template', wraps=schedule.get_template) as get_template:
+            response = self.book()
+        get_template.assert_called_with(self.psychologist.id)
+        self.assertEqual(response.status_code, 201)
+
+    def test_blocked_date_rejects_booking(self):
+        self.availability.blocked_dates = [str(self.day)]
+        self.availability.save()
+        self.assertEqual(self.book().status_code, 400)
+        self.assertEqual(self.book(start=time(13, 0)).status_code, 400)
+
+
+class FastSerializerParityTests(TestCase):
+    """fast_serializers.py debe producir los mismos bytes que los serializers de DRF"""
+
+    def setUp(self):
+        cache.clear()
+        anxiety = Specialization.objects.create(name='Ansiedad')
+        couples = Specialization.objects.create(name='Terapia de pareja "integrativa"')
+
+        self.psychologist, profile = create_professional(
+            city='La Paz', latitude='-16.495500', longitude='-68.133600', office_address='Av. 6 de Agosto ñ 123'
+        )
+        profile.specializations.add(anxiety, couples)
+        other, _ = create_professional('otro@example.com', consultation_fee=Decimal('99.90'))
+        User.objects.filter(pk=other.pk).update(first_name='José Ángel', last_name="O'Brien")
+        patient = create_patient()
+
+        day = date.today() + timedelta(days=3)
+        PsychologistAvailability.objects.create(
+            psychologist=self.psychologist, weekday=day.weekday(),
+            start_time=time(9, 0), end_time=time(12, 30), blocked_dates=[str(day)]
+        )
+        PsychologistAvailability.objects.create(
+            psychologist=other, weekday=(day.weekday() + 1) % 7, start_time=time(14, 0), end_time=time(18, 0)
+        )
+        create_appointment(
+            patient, self.psychologist, days=3, reason_for_visit='Ansiedad\n"nocturna" ✓',
+            meeting_link='https://meet.example.com/abc', consultation_fee=Decimal('150.00')
+        )
+        create_appointment(patient, other, days=-5, status='completed', is_paid=True)
+        create_appointment(patient, other, days=10, start=time(15, 30), appointment_type='in_person')
+
+    def test_fast_serializers_match_drf_byte_for_byte(self):
+        for name, (queryset, drf, fast) in CHECKS.items():
+            with self.subTest(name):
+                expected = JSONRenderer().render(drf(queryset(100)))
+                actual = FastJSONRenderer().render(fast(queryset(100)))
+                self.assertGreater(len(fast(queryset(100))), 1)
+                self.assertEqual(actual, expected)
 
-# Create your tests here.
+    def test_compare_serializers_command(self):
+        out = io.StringIO()
+        call_command('compare_serializers', iterations=1, stdout=out)
+        self.assertIn('✅ Salida idéntica en todos los listados', out.getvalue())
@@ -15,4 +15,5 @@ urlpatterns = [
     # Custom endpoints
     path('search-psychologists/', views.search_available_psychologists, name='search-psychologists'),
     path('psychologist/<int:psychologist_id>/schedule/', views.get_psychologist_schedule, name='psychologist-schedule'),
+    path('psychologist/<int:psychologist_id>/reviews/', views.list_psychologist_reviews, name='psychologist-reviews'),
 ]
\ No newline at end of file
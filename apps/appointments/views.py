@@ -3,19 +3,29 @@
 from rest_framework import status, viewsets, permissions
 from rest_framework.decorators import action, api_view, permission_classes
 from rest_framework.response import Response
+from rest_framework.pagination import PageNumberPagination
 from django.contrib.auth import get_user_model
+from django.db import IntegrityError
 from django.db.models import Q
 from datetime import datetime, timedelta
-from .models import Appointment, PsychologistAvailability, TimeSlot
-from apps.professionals.models import ProfessionalProfile
+from .models import Appointment, PsychologistAvailability, TimeSlot, Review
 from apps.professionals.models import ProfessionalProfile
+from config.cache_tags import cache_by_tags
+from .schedule import get_template, get_templates
+from .fast_serializers import (
+    appointment_rows,
+    availability_rows,
+    serialize_appointments,
+    serialize_availabilities,
+)
 from .serializers import (
     AppointmentSerializer,
     AppointmentCreateSerializer,
     AppointmentUpdateSerializer,
     PsychologistAvailabilitySerializer,
     TimeSlotSerializer,
-    AvailablePsychologistSerializer
+    AvailablePsychologistSerializer,
+    ReviewSerializer
 )
 
 User = get_user_model()
@@ -28,9 +38,10 @@ class IsOwnerOrPsychologist(permissions.BasePermission):
     - El psicólogo puede ver/editar las citas donde es el profesional
     """
     def has_object_permission(self, request, view, obj):
+        # Por id: no hace falta cargar el usuario (tokens de acceso firmados)
         return (
-            obj.patient == request.user or 
-            obj.psychologist == request.user
+            obj.patient_id == request.user.id or 
+            obj.psychologist_id == request.user.id
         )
 
 
@@ -51,9 +62,9 @@ class AppointmentViewSet(viewsets.ModelViewSet):
         
         # Filtrar por tipo de usuario
         if user.user_type == 'patient':
-            queryset = queryset.filter(patient=user)
+            queryset = queryset.filter(patient_id=user.id)
         elif user.user_type == 'professional':
-            queryset = queryset.filter(psychologist=user)
+            queryset = queryset.filter(psychologist_id=user.id)
         
         # Filtros adicionales por query params
         status_filter = self.request.query_params.get('status', None)
@@ -70,6 +81,13 @@ class AppointmentViewSet(viewsets.ModelViewSet):
         
         return queryset.order_by('-appointment_date', '-start_time')
     
+    def list(self, request, *args, **kwargs):
+        """Listado paginado con filas planas (misma salida que AppointmentSerializer)"""
+        page = self.paginate_queryset(appointment_rows(self.get_queryset()))
+        if page is not None:
+            return self.get_paginated_response(serialize_appointments(page))
+        return Response(serialize_appointments(appointment_rows(self.get_queryset())))
+    
     def get_serializer_class(self):
         if self.action == 'create':
             return AppointmentCreateSerializer
@@ -101,7 +119,7 @@ class AppointmentViewSet(viewsets.ModelViewSet):
         """Confirmar una cita (solo el psicólogo)"""
         appointment = self.get_object()
         
-        if request.user != appointment.psychologist:
+        if request.user.id != appointment.psychologist_id:
             return Response(
                 {'error': 'Solo el psicólogo puede confirmar la cita'},
                 status=status.HTTP_403_FORBIDDEN
@@ -159,7 +177,7 @@ class AppointmentViewSet(viewsets.ModelViewSet):
         """Marcar cita como completada (solo el psicólogo)"""
         appointment = self.get_object()
         
-        if request.user != appointment.psychologist:
+        if request.user.id != appointment.psychologist_id:
             return Response(
                 {'error': 'Solo el psicólogo puede completar la cita'},
                 status=status.HTTP_403_FORBIDDEN
@@ -179,6 +197,46 @@ class AppointmentViewSet(viewsets.ModelViewSet):
             status=status.HTTP_200_OK
         )
     
+    @action(detail=True, methods=['post'])
+    def review(self, request, pk=None):
+        """Calificar una cita completada (solo el paciente)"""
+        appointment = self.get_object()
+        
+        if request.user.id != appointment.patient_id:
+            return Response(
+                {'error': 'Solo el paciente puede calificar la cita'},
+                status=status.HTTP_403_FORBIDDEN
+            )
+        
+        if appointment.status != 'completed':
+            return Response(
+                {'error': 'Solo se pueden calificar citas completadas'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        if Review.objects.filter(appointment=appointment).exists():
+            return Response(
+                {'error': 'Esta cita ya fue calificada'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        serializer = ReviewSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        try:
+            serializer.save(
+                appointment=appointment,
+                patient=appointment.patient,
+                psychologist=appointment.psychologist
+            )
+        except IntegrityError:
+            # Otra reseña de la misma cita entró después del exists()
+            return Response(
+                {'error': 'Esta cita ya fue calificada'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        return Response(serializer.data, status=status.HTTP_201_CREATED)
+    
     @action(detail=False, methods=['get'])
     def upcoming(self, request):
         """Obtener próximas citas"""
@@ -188,10 +246,10 @@ class AppointmentViewSet(viewsets.ModelViewSet):
             status__in=['pending', 'confirmed']
         )[:10]
         
-        serializer = AppointmentSerializer(appointments, many=True)
-        return Response(serializer.data)
+        return Response(serialize_appointments(appointment_rows(appointments)))
     
     @action(detail=False, methods=['get'])
+    @cache_by_tags('appointments:user:{user}', 'users', timeout=60, per_user=True)
     def history(self, request):
         """Obtener historial de citas"""
         today = datetime.now().date()
@@ -199,8 +257,7 @@ class AppointmentViewSet(viewsets.ModelViewSet):
             Q(appointment_date__lt=today) | Q(status='completed')
         )
         
-        serializer = AppointmentSerializer(appointments, many=True)
-        return Response(serializer.data)
+        return Response(serialize_appointments(appointment_rows(appointments)))
 
 
 class PsychologistAvailabilityViewSet(viewsets.ModelViewSet):
@@ -216,7 +273,7 @@ class PsychologistAvailabilityViewSet(viewsets.ModelViewSet):
         
         # Si es psicólogo, solo ve su propia disponibilidad
         if self.request.user.user_type == 'psychologist':
-            queryset = queryset.filter(psychologist=self.request.user)
+            queryset = queryset.filter(psychologist_id=self.request.user.id)
         
         # Filtro por psicólogo específico
         psychologist_id = self.request.query_params.get('psychologist', None)
@@ -225,6 +282,13 @@ class PsychologistAvailabilityViewSet(viewsets.ModelViewSet):
         
         return queryset.filter(is_active=True)
     
+    def list(self, request, *args, **kwargs):
+        """Listado paginado con filas planas (misma salida que PsychologistAvailabilitySerializer)"""
+        page = self.paginate_queryset(availability_rows(self.get_queryset()))
+        if page is not None:
+            return self.get_paginated_response(serialize_availabilities(page))
+        return Response(serialize_availabilities(availability_rows(self.get_queryset())))
+    
     def create(self, request, *args, **kwargs):
         """Crear disponibilidad (solo psicólogos para sí mismos)"""
         if request.user.user_type != 'professional':
@@ -247,7 +311,7 @@ class PsychologistAvailabilityViewSet(viewsets.ModelViewSet):
         """Actualizar disponibilidad (solo el propio psicólogo)"""
         instance = self.get_object()
         
-        if request.user != instance.psychologist:
+        if request.user.id != instance.psychologist_id:
             return Response(
                 {'error': 'Solo puedes editar tu propia disponibilidad'},
                 status=status.HTTP_403_FORBIDDEN
@@ -260,7 +324,7 @@ class PsychologistAvailabilityViewSet(viewsets.ModelViewSet):
         """Bloquear una fecha específica"""
         availability = self.get_object()
         
-        if request.user != availability.psychologist:
+        if request.user.id != availability.psychologist_id:
             return Response(
                 {'error': 'Solo puedes bloquear tu propia disponibilidad'},
                 status=status.HTTP_403_FORBIDDEN
@@ -287,7 +351,7 @@ class PsychologistAvailabilityViewSet(viewsets.ModelViewSet):
         """Desbloquear una fecha específica"""
         availability = self.get_object()
         
-        if request.user != availability.psychologist:
+        if request.user.id != availability.psychologist_id:
             return Response(
                 {'error': 'Solo puedes desbloquear tu propia disponibilidad'},
                 status=status.HTTP_403_FORBIDDEN
@@ -387,25 +451,19 @@ def search_available_psychologists(request):
             availabilities__end_time__gt=search_time
         )
     
-    # Filtrar psicólogos que no tengan fechas bloqueadas
-    available_psychologists = []
-    for psychologist in psychologists:
-        availabilities = psychologist.availabilities.filter(
-            weekday=weekday,
-            is_active=True
-        )
-        
-        # Verificar si alguna disponibilidad no está bloqueada para esa fecha
-        for availability in availabilities:
-            if str(search_date) not in availability.blocked_dates:
-                available_psychologists.append(psychologist)
-                break
+    # Filtrar psicólogos que no tengan fechas bloqueadas (plantillas en una lectura de caché)
+    psychologists = list(psychologists.select_related('professional_profile'))
+    templates = get_templates(psychologist.id for psychologist in psychologists)
+    available_psychologists = [
+        psychologist for psychologist in psychologists
+        if templates[psychologist.id].is_available_on(search_date)
+    ]
     
     # Serializar y devolver
     serializer = AvailablePsychologistSerializer(
         available_psychologists,
         many=True,
-        context={'request': request}
+        context={'request': request, 'schedule_templates': templates}
     )
     
     return Response({
@@ -419,6 +477,7 @@ def search_available_psychologists(request):
 
 @api_view(['GET'])
 @permission_classes([permissions.IsAuthenticated])
+@cache_by_tags('profile:{psychologist_id}', 'users', timeout=60)
 def get_psychologist_schedule(request, psychologist_id):
     """
     Obtener el horario completo de un psicólogo para una semana
@@ -443,61 +502,47 @@ def get_psychologist_schedule(request, psychologist_id):
     else:
         week_start = datetime.now().date()
 
-    # Generar el horario de la semana
+    # Generar el horario de la semana desde la plantilla compilada
+    template = get_template(psychologist.id)
+    week_end = week_start + timedelta(days=6)
+
+    # Citas ocupadas de toda la semana en una sola consulta
+    booked_by_date = {}
+    for appointment_date, start_time, end_time in Appointment.objects.filter(
+        psychologist=psychologist,
+        appointment_date__range=(week_start, week_end),
+        status__in=['pending', 'confirmed']
+    ).values_list('appointment_date', 'start_time', 'end_time'):
+        booked_by_date.setdefault(appointment_date, []).append((start_time, end_time))
+
     schedule = []
     for i in range(7):
         current_date = week_start + timedelta(days=i)
         weekday = current_date.weekday()
-
-        availabilities = PsychologistAvailability.objects.filter(
-            psychologist=psychologist,
-            weekday=weekday,
-            is_active=True
-        )
+        day_slots, blocked = template.day_slots(current_date)
+        booked = booked_by_date.get(current_date, [])
 
         day_schedule = {
             'date': current_date.strftime('%Y-%m-%d'),
             'weekday': weekday,
             'day_name': ['Lunes', 'Martes', 'Miércoles', 'Jueves', 'Viernes', 'Sábado', 'Domingo'][weekday],
-            'is_available': False,
-            'blocked': False,
+            'is_available': template.is_available_on(current_date),
+            'blocked': blocked,
             'time_slots': []
         }
 
-        for availability in availabilities:
-            if str(current_date) in availability.blocked_dates:
-                day_schedule['blocked'] = True
-                continue
-
-            day_schedule['is_available'] = True
-
-            current_time = datetime.combine(current_date, availability.start_time)
-            end_time = datetime.combine(current_date, availability.end_time)
-
-            duration = 60
-            if hasattr(psychologist, 'professional_profile'):
-                duration = psychologist.professional_profile.session_duration
-
-            while current_time + timedelta(minutes=duration) <= end_time:
-                slot_start = current_time.time()
-                slot_end = (current_time + timedelta(minutes=duration)).time()
-
-                is_booked = Appointment.objects.filter(
-                    psychologist=psychologist,
-                    appointment_date=current_date,
-                    start_time__lt=slot_end,
-                    end_time__gt=slot_start,
-                    status__in=['pending', 'confirmed']
-                ).exists()
-
-                day_schedule['time_slots'].append({
-                    'start_time': slot_start.strftime('%H:%M'),
-                    'end_time': slot_end.strftime('%H:%M'),
-                    'is_available': not is_booked,
-                    'is_booked': is_booked
-                })
+        for slot_start, slot_end in day_slots:
+            is_booked = any(
+                booked_start < slot_end and booked_end > slot_start
+                for booked_start, booked_end in booked
+            )
 
-                current_time += timedelta(minutes=duration)
+            day_schedule['time_slots'].append({
+                'start_time': slot_start.strftime('%H:%M'),
+                'end_time': slot_end.strftime('%H:%M'),
+                'is_available': not is_booked,
+                'is_booked': is_booked
+            })
 
         schedule.append(day_schedule)
 
@@ -508,6 +553,34 @@ def get_psychologist_schedule(request, psychologist_id):
             'email': psychologist.email
         },
         'week_start': week_start.strftime('%Y-%m-%d'),
-        'week_end': (week_start + timedelta(days=6)).strftime('%Y-%m-%d'),
+        'week_end': week_end.strftime('%Y-%m-%d'),
         'schedule': schedule
-    })
\ No newline at end of file
+    })
+
+
+@api_view(['GET'])
+@permission_classes([permissions.AllowAny])
+@cache_by_tags('profile:{psychologist_id}', 'users')
+def list_psychologist_reviews(request, psychologist_id):
+    """
+    Listar las reseñas de un psicólogo (por ID de perfil profesional)
+    """
+    try:
+        profile = ProfessionalProfile.objects.get(id=psychologist_id)
+    except ProfessionalProfile.DoesNotExist:
+        return Response(
+            {'error': 'Perfil de Psicólogo no encontrado'},
+            status=status.HTTP_404_NOT_FOUND
+        )
+
+    reviews = Review.objects.filter(
+        psychologist_id=profile.user_id
+    ).select_related('patient')
+
+    paginator = PageNumberPagination()
+    page = paginator.paginate_queryset(reviews, request)
+    serializer = ReviewSerializer(page, many=True)
+    response = paginator.get_paginated_response(serializer.data)
+    response.data['average_rating'] = profile.average_rating
+    response.data['total_reviews'] = profile.total_reviews
+    return response
@@ -0,0 +1,84 @@
+# apps/authentication/async_api.py
+
+from asgiref.sync import sync_to_async
+from django.http import JsonResponse
+from rest_framework import exceptions
+from rest_framework.request import Request
+from rest_framework.settings import api_settings
+from .throttles import check_throttles
+
+# Piezas mínimas de DRF para vistas `async def` (DRF no soporta vistas async):
+# parseo del cuerpo, autenticación, throttling y respuestas JSON con el mismo
+# formato que Response. El trabajo bloqueante (BD, caché) corre en sync_to_async.
+
+
+def api_request(request):
+    """Envuelve el HttpRequest con los parsers y autenticadores por defecto de DRF"""
+    return Request(
+        request,
+        parsers=[parser() for parser in api_settings.DEFAULT_PARSER_CLASSES],
+        authenticators=[auth() for auth in api_settings.DEFAULT_AUTHENTICATION_CLASSES],
+    )
+
+
+def json_response(data, status):
+    return JsonResponse(data, status=status, json_dumps_params={'ensure_ascii': False})
+
+
+def error_response(exc):
+    """Respuesta para una APIException, como la arma el exception handler de DRF"""
+    response = json_response({'detail': exc.detail}, exc.status_code)
+    if getattr(exc, 'wait', None):
+        response['Retry-After'] = '%d' % exc.wait
+    return response
+
+
+def busy_response():
+    response = json_response(
+        {'error': 'Servidor ocupado, intenta nuevamente en unos segundos'}, 503
+    )
+    response['Retry-After'] = '1'
+    return response
+
+
+async def aparse(drf_request):
+    """request.data; devuelve (datos, respuesta_de_error)"""
+    try:
+        return await sync_to_async(lambda: drf_request.data)(), None
+    except exceptions.ParseError as exc:
+        return None, error_response(exc)
+
+
+async def athrottle(drf_request, throttle_classes):
+    """Respuesta 429 si algún throttle rechaza el request, o None"""
+    wait = await sync_to_async(check_throttles)(throttle_classes, drf_request)
+    if wait is None:
+        return None
+    return error_response(exceptions.Throttled(wait))
+
+
+def _not_authenticated(drf_request, exc):
+    # Igual que APIView.permission_denied: 401 solo si el primer autenticador
+    # define WWW-Authenticate (con SessionAuthentication primero, 403)
+    response = error_response(exc)
+    authenticators = drf_request.authenticators
+    header = authenticators[0].authenticate_header(drf_request) if authenticators else None
+    if header:
+        response['WWW-Authenticate'] = header
+    else:
+        response.status_code = 403
+    return response
+
+
+async def aauthenticate(drf_request):
+    """Usuario autenticado; devuelve (usuario, respuesta_de_error)"""
+    try:
+        user = await sync_to_async(lambda: drf_request.user)()
+    except (exceptions.AuthenticationFailed, exceptions.NotAuthenticated) as exc:
+        return None, _not_authenticated(drf_request, exc)
+    except exceptions.APIException as exc:
+        return None, error_response(exc)
+    if not user or not user.is_authenticated:
+        return None, _not_authenticated(drf_request, exceptions.NotAuthenticated())
+    return user, None
+
@@ -0,0 +1,335 @@
+# apps/authentication/authentication.py
+
+import copy
+import threading
+import time
+from collections import OrderedDict
+from datetime import timedelta
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core import signing
+from django.core.cache import cache
+from django.db import transaction
+from django.utils import timezone
+from django.utils.functional import SimpleLazyObject
+from rest_framework import exceptions
+from rest_framework.authentication import BaseAuthentication, TokenAuthentication, get_authorization_header
+from rest_framework.authtoken.models import Token
+from config.caches import shared_cache
+from .models import AccessTokenVersion, TokenInvalidation
+
+# Caché token -> usuario compartida por la API REST y el WebSocket del chat.
+# Cada worker guarda un LRU acotado con TTL; al invalidar un usuario se borra su
+# entrada local y se deja una marca para que el resto de workers descarte las
+# entradas anteriores a ella:
+# - con caché compartida (Redis), en la caché; se revisa en cada request;
+# - con caché local al proceso (LocMemCache), en la tabla token_invalidations;
+#   cada worker la revisa como mucho cada TOKEN_CACHE_CHECK_INTERVAL segundos,
+#   así que en otro worker un logout tarda hasta ese tiempo en verse.
+TOKEN_CACHE_TTL = getattr(settings, 'AUTH_TOKEN_CACHE_TTL', 60)
+TOKEN_CACHE_SIZE = getattr(settings, 'AUTH_TOKEN_CACHE_SIZE', 10000)
+TOKEN_CACHE_CHECK_INTERVAL = getattr(settings, 'AUTH_TOKEN_CACHE_CHECK_SECONDS', 5)
+INVALIDATION_OVERLAP = timedelta(seconds=60)  # transacciones que confirmaron tarde
+INVALIDATED_KEY = 'auth:invalidated:{}'
+
+# Expiración deslizante: Token.created se usa como última renovación.
+# Un token sin uso durante TOKEN_TTL expira; si se usa pasada la mitad de su
+# vida se renueva (una escritura como máximo cada TOKEN_TTL / 2).
+TOKEN_TTL = timedelta(seconds=getattr(settings, 'AUTH_TOKEN_TTL', 60 * 60 * 24 * 7))
+TOKEN_RENEW_AFTER = TOKEN_TTL / 2
+
+
+class TokenCache:
+    """LRU de key -> (usuario, token, guardado_en) con expiración"""
+
+    def __init__(self, max_size, ttl):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if time.time() - entry[2] > self.ttl:
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return entry
+
+    def set(self, key, user, token, loaded_at):
+        with self._lock:
+            self._entries[key] = (user, token, loaded_at)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def discard(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def discard_user(self, user_id, before=None):
+        """Descarta las entradas del usuario (solo las guardadas antes de `before`, si se indica)"""
+        with self._lock:
+            for key in [
+                k for k, entry in self._entries.items()
+                if entry[0].pk == user_id and (before is None or entry[2] < before)
+            ]:
+                del self._entries[key]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+token_cache = TokenCache(TOKEN_CACHE_SIZE, TOKEN_CACHE_TTL)
+
+_invalidations_lock = threading.Lock()
+_invalidations_checked_at = 0.0
+_invalidations_since = None
+
+
+def _discard_invalidated():
+    """Caché local al proceso: aplica al LRU las invalidaciones de otros workers"""
+    global _invalidations_checked_at, _invalidations_since
+
+    now = time.monotonic()
+    if now - _invalidations_checked_at < TOKEN_CACHE_CHECK_INTERVAL:
+        return
+    # Un solo hilo consulta; los demás siguen con el LRU actual
+    if not _invalidations_lock.acquire(blocking=False):
+        return
+    try:
+        started_at = timezone.now()
+        if _invalidations_since is not None:
+            rows = TokenInvalidation.objects.filter(
+                invalidated_at__gt=_invalidations_since - INVALIDATION_OVERLAP
+            ).values_list('user_id', 'invalidated_at')
+            for user_id, invalidated_at in rows:
+                token_cache.discard_user(user_id, before=invalidated_at.timestamp())
+        # La primera vez el LRU todavía está vacío
+        _invalidations_since = started_at
+        _invalidations_checked_at = now
+    finally:
+        _invalidations_lock.release()
+
+
+def _load(key):
+    try:
+        token = Token.objects.select_related('user').get(key=key)
+    except Token.DoesNotExist:
+        return None, None
+    return token.user, token
+
+
+def _cached(key):
+    shared = shared_cache()
+    if not shared:
+        _discard_invalidated()
+
+    entry = token_cache.get(key)
+    if entry is not None:
+        user, token, cached_at = entry
+        if not shared:
+            return user, token
+        invalidated_at = cache.get(INVALIDATED_KEY.format(user.pk))
+        if invalidated_at is None or invalidated_at < cached_at:
+            return user, token
+        token_cache.discard(key)
+
+    # Hora previa a la lectura: una invalidación concurrente gana sobre esta entrada
+    loaded_at = time.time()
+    user, token = _load(key)
+    if user is not None:
+        token_cache.set(key, user, token, loaded_at)
+    return user, token
+
+
+def is_expired(token, now=None):
+    return (now or timezone.now()) - token.created > TOKEN_TTL
+
+
+def renew_token(token, now=None):
+    """Extiende la vida del token si ya pasó la mitad; devuelve True si lo renovó"""
+    now = now or timezone.now()
+    if now - token.created <= TOKEN_RENEW_AFTER:
+        return False
+    Token.objects.filter(key=token.key).update(created=now)
+    token.created = now
+    return True
+
+
+def get_user_for_token(key):
+    """
+    Devuelve (usuario, token) para una key, o (None, None) si no existe o expiró.
+    El usuario es una copia: las vistas pueden modificarlo sin tocar la caché.
+    """
+    user, token = _cached(key)
+    if user is None:
+        return None, None
+
+    now = timezone.now()
+    if is_expired(token, now):
+        token_cache.discard(key)
+        Token.objects.filter(key=key).delete()
+        return None, None
+
+    renew_token(token, now)
+    return copy.copy(user), token
+
+
+def issue_token(user):
+    """Token vigente del usuario (renovado) o uno nuevo si no tiene o expiró"""
+    token = Token.objects.filter(user=user).first()
+    if token is not None and is_expired(token):
+        token.delete()
+        token = None
+    if token is None:
+        return Token.objects.create(user=user)
+    renew_token(token)
+    return token
+
+
+def invalidate_user(user_id):
+    """Descarta los tokens cacheados de un usuario en todos los workers"""
+    token_cache.discard_user(user_id)
+    if shared_cache():
+        cache.set(INVALIDATED_KEY.format(user_id), time.time(), TOKEN_CACHE_TTL)
+    else:
+        TokenInvalidation.objects.update_or_create(
+            user_id=user_id, defaults={'invalidated_at': timezone.now()}
+        )
+    cache.delete(ACCESS_STATE_KEY.format(user_id))
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """TokenAuthentication sin consulta a la BD cuando la key está en caché"""
+
+    def authenticate_credentials(self, key):
+        user, token = get_user_for_token(key)
+        if user is None:
+            raise exceptions.AuthenticationFailed('Token inválido o expirado.')
+        if not user.is_active:
+            raise exceptions.AuthenticationFailed('Usuario inactivo o eliminado.')
+        return user, token
+
+
+# Tokens de acceso firmados (HMAC con SECRET_KEY) de vida corta.
+# Llevan id, user_type y la versión de tokens del usuario ('v'). Verificarlos
+# solo comprueba la firma, sin BD ni caché: un token emitido antes de un logout,
+# un cambio de contraseña o una desactivación vale hasta que expira
+# (ACCESS_TOKEN_TTL). El Token de authtoken queda como credencial de refresco
+# (ver refresh_access_token) y al refrescar sí se revisan el usuario y la versión.
+# Con ACCESS_TOKEN_CHECK_REVOCATION cada request revisa además el estado del
+# usuario (activo, versión): una lectura de la caché compartida por request, o
+# una consulta a la BD si la caché es local al proceso.
+ACCESS_TOKEN_TTL = getattr(settings, 'AUTH_ACCESS_TOKEN_TTL', 60 * 15)
+ACCESS_TOKEN_SALT = 'apps.authentication.access'
+ACCESS_TOKEN_CHECK_REVOCATION = getattr(settings, 'AUTH_ACCESS_TOKEN_CHECK_REVOCATION', False)
+ACCESS_STATE_KEY = 'auth:access:{}'
+
+
+def _load_access_state(user_id):
+    """(activo, versión) del usuario, o None si no existe"""
+    row = get_user_model().objects.filter(pk=user_id).values_list(
+        'is_active', 'access_token_version__version'
+    ).first()
+    if row is None:
+        return None
+    is_active, version = row
+    return is_active, version or 0
+
+
+def access_state(user_id):
+    if not shared_cache():
+        return _load_access_state(user_id)
+
+    key = ACCESS_STATE_KEY.format(user_id)
+    state = cache.get(key)
+    if state is None:
+        # Usuario inexistente: (False, 0), así también se cachea el rechazo
+        state = _load_access_state(user_id) or (False, 0)
+        cache.set(key, state, ACCESS_TOKEN_TTL)
+    return state
+
+
+def issue_access_token(user):
+    """Token de acceso con la versión vigente, leída de la BD (login y refresco)"""
+    state = _load_access_state(user.pk)
+    if state is None or not state[0]:
+        raise exceptions.AuthenticationFailed('Usuario inactivo o eliminado.')
+    _, version = state
+    return signing.dumps(
+        {'id': user.pk, 'type': user.user_type, 'v': version},
+        salt=ACCESS_TOKEN_SALT
+    )
+
+
+def revoke_access_tokens(user_id):
+    """Invalida los tokens de acceso emitidos hasta ahora (logout, cambio de contraseña)"""
+    AccessTokenVersion.bump(user_id)
+    transaction.on_commit(lambda: cache.delete(ACCESS_STATE_KEY.format(user_id)))
+
+
+def _get_user(user_id):
+    try:
+        return get_user_model().objects.get(pk=user_id)
+    except get_user_model().DoesNotExist:
+        # Borrado entre la verificación del token y el primer acceso al usuario
+        raise exceptions.AuthenticationFailed('Usuario inactivo o eliminado.')
+
+
+class AccessTokenUser(SimpleLazyObject):
+    """
+    Usuario de un token de acceso: id, pk y user_type salen del token;
+    cualquier otro atributo carga el usuario desde la BD la primera vez.
+    """
+    is_authenticated = True
+    is_anonymous = False
+
+    def __init__(self, user_id, user_type):
+        super().__init__(lambda: _get_user(user_id))
+        self.__dict__.update(id=user_id, pk=user_id, user_type=user_type)
+
+    def __bool__(self):
+        return True
+
+
+class SignedAccessTokenAuthentication(BaseAuthentication):
+    """
+    Authorization: Bearer <token de acceso>
+    Solo verifica firma y expiración. Con ACCESS_TOKEN_CHECK_REVOCATION rechaza
+    además tokens de usuarios borrados o inactivos y los emitidos antes del
+    último logout / cambio de contraseña.
+    """
+    keyword = 'Bearer'
+
+    def authenticate(self, request):
+        auth = get_authorization_header(request).split()
+        if not auth or auth[0].lower() != self.keyword.lower().encode():
+            return None
+        if len(auth) != 2:
+            raise exceptions.AuthenticationFailed('Encabezado Bearer inválido.')
+
+        try:
+            payload = signing.loads(
+                auth[1].decode(), salt=ACCESS_TOKEN_SALT, max_age=ACCESS_TOKEN_TTL
+            )
+        except signing.SignatureExpired:
+            raise exceptions.AuthenticationFailed('Token de acceso expirado.')
+        except (signing.BadSignature, UnicodeDecodeError):
+            raise exceptions.AuthenticationFailed('Token de acceso inválido.')
+
+        if ACCESS_TOKEN_CHECK_REVOCATION:
+            state = access_state(payload['id'])
+            if state is None or not state[0]:
+                raise exceptions.AuthenticationFailed('Usuario inactivo o eliminado.')
+            if payload.get('v', 0) != state[1]:
+                raise exceptions.AuthenticationFailed('Token de acceso revocado.')
+
+        return AccessTokenUser(payload['id'], payload['type']), None
+
+    def authenticate_header(self, request):
+        return self.keyword
@@ -0,0 +1,109 @@
+# apps/authentication/hashing.py
+
+import asyncio
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth.hashers import check_password, get_hasher, identify_hasher, make_password
+
+# Hashing de contraseñas (PBKDF2, cientos de ms de CPU) fuera del event loop.
+# Las vistas async esperan el resultado de un pool de procesos acotado, así el
+# worker ASGI sigue atendiendo otros requests mientras se calcula el hash.
+# Si hay más de MAX_PENDING hashes en curso o en cola se rechaza el request
+# (HashingBusy -> 503) en lugar de acumular latencia sin límite.
+# Con HASHING_WORKERS = 0 se hashea en el hilo sync de Django (sin pool).
+# Si un proceso del pool muere (OOM, kill) el pool queda roto: se descarta,
+# se reintenta una vez con uno nuevo y, si también falla, HashingBusy.
+HASHING_WORKERS = getattr(settings, 'PASSWORD_HASHING_WORKERS', 2)
+MAX_PENDING = getattr(settings, 'PASSWORD_HASHING_MAX_PENDING', 32)
+
+
+class HashingBusy(Exception):
+    """La cola de hashing está llena"""
+
+
+_lock = threading.Lock()
+_executor = None
+_pending = 0
+
+
+def _init_worker():
+    # Proceso nuevo (spawn): necesita la configuración de Django para los hashers
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
+    import django
+    django.setup()
+
+
+def create_pool(workers):
+    # spawn: no se heredan hilos ni conexiones abiertas del servidor
+    return ProcessPoolExecutor(
+        max_workers=workers,
+        mp_context=multiprocessing.get_context('spawn'),
+        initializer=_init_worker,
+    )
+
+
+def _get_executor():
+    global _executor
+    with _lock:
+        if _executor is None:
+            _executor = create_pool(HASHING_WORKERS)
+        return _executor
+
+
+def _discard_executor(executor):
+    """Descarta un pool roto; el siguiente _get_executor crea otro"""
+    global _executor
+    with _lock:
+        if _executor is executor:
+            _executor = None
+    executor.shutdown(wait=False, cancel_futures=True)
+
+
+def pending():
+    """Hashes en curso o en cola en este proceso"""
+    return _pending
+
+
+async def _run(func, *args):
+    global _pending
+    with _lock:
+        if _pending >= MAX_PENDING:
+            raise HashingBusy()
+        _pending += 1
+    try:
+        if not HASHING_WORKERS:
+            return await sync_to_async(func)(*args)
+        loop = asyncio.get_running_loop()
+        for _ in range(2):
+            executor = _get_executor()
+            try:
+                return await loop.run_in_executor(executor, func, *args)
+            except BrokenProcessPool:
+                _discard_executor(executor)
+        raise HashingBusy()
+    finally:
+        with _lock:
+            _pending -= 1
+
+
+async def acheck_password(password, encoded):
+    return await _run(check_password, password, encoded)
+
+
+async def amake_password(password):
+    return await _run(make_password, password)
+
+
+def needs_rehash(encoded):
+    """Como el setter de check_password: hasher distinto al preferido o iteraciones viejas"""
+    try:
+        hasher = identify_hasher(encoded)
+    except ValueError:
+        return False
+    preferred = get_hasher('default')
+    return hasher.algorithm != preferred.algorithm or preferred.must_update(encoded)
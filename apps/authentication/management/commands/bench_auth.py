@@ -0,0 +1,81 @@
+# apps/authentication/management/commands/bench_auth.py
+
+import time
+from django.core.management.base import BaseCommand
+from django.contrib.auth import get_user_model
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.authtoken.models import Token
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+from apps.authentication.authentication import (
+    CachedTokenAuthentication,
+    SignedAccessTokenAuthentication,
+    issue_access_token,
+    token_cache,
+)
+from config.caches import shared_cache
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = 'Mide el costo de autenticación por request: TokenAuthentication vs caché vs tokens firmados'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--requests',
+            type=int,
+            default=2000,
+            help='Cantidad de requests simulados por backend'
+        )
+
+    def handle(self, *args, **options):
+        total = options['requests']
+        if not shared_cache():
+            self.stdout.write(self.style.WARNING(
+                'La caché por defecto es local al proceso: las invalidaciones llegan '
+                'a los demás workers por token_invalidations, con hasta '
+                'AUTH_TOKEN_CACHE_CHECK_SECONDS de demora'
+            ))
+
+        # Usuario y token temporales; se revierte todo al terminar
+        with transaction.atomic():
+            user = User.objects.create_user(
+                email='bench-auth@example.com',
+                username='bench-auth',
+                password=None
+            )
+            token = Token.objects.create(user=user)
+            factory = APIRequestFactory()
+            token_request = factory.get('/', HTTP_AUTHORIZATION=f'Token {token.key}')
+            access_request = factory.get(
+                '/', HTTP_AUTHORIZATION=f'Bearer {issue_access_token(user)}'
+            )
+
+            token_cache.clear()
+            for name, backend, request in (
+                ('TokenAuthentication', TokenAuthentication(), token_request),
+                ('CachedTokenAuthentication', CachedTokenAuthentication(), token_request),
+                ('SignedAccessTokenAuthentication', SignedAccessTokenAuthentication(), access_request),
+            ):
+                backend.authenticate(Request(request))  # calentar
+                with CaptureQueriesContext(connection) as queries:
+                    start = time.perf_counter()
+                    for _ in range(total):
+                        # Lo que usan los permisos y get_queryset
+                        authenticated, _ = backend.authenticate(Request(request))
+                        authenticated.id, authenticated.user_type
+                    elapsed = time.perf_counter() - start
+
+                self.stdout.write(
+                    f'{name}: {elapsed / total * 1e6:.1f} µs/request, '
+                    f'{total / elapsed:.0f} requests/s, '
+                    f'{len(queries) / total:.2f} consultas/request'
+                )
+
+            token_cache.clear()
+            transaction.set_rollback(True)
+
+        self.stdout.write(self.style.SUCCESS(f'✅ {total} requests por backend'))
@@ -0,0 +1,95 @@
+# apps/authentication/management/commands/bench_login_concurrency.py
+
+import asyncio
+import statistics
+import time
+from unittest import mock
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.test import AsyncClient
+from apps.authentication import hashing
+from apps.authentication.throttles import SlidingWindowThrottle
+
+User = get_user_model()
+
+LOGIN_URL = '/api/auth/login/'
+UNRELATED_URL = '/api/professionals/specializations/'
+EMAIL = 'bench-login@example.com'
+PASSWORD = 'bench-login-123'
+
+
+class Command(BaseCommand):
+    help = (
+        'Latencia de un endpoint no relacionado mientras hay logins concurrentes: '
+        'hash en el hilo sync de Django vs. pool de procesos'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--logins', type=int, default=8, help='Logins concurrentes sostenidos')
+        parser.add_argument('--requests', type=int, default=50, help='Requests no relacionados a medir')
+        parser.add_argument('--host', default='localhost', help='Host permitido por ALLOWED_HOSTS')
+
+    def handle(self, *args, **options):
+        self.host = options['host']
+        user = User.objects.create_user(email=EMAIL, username='bench-login', password=PASSWORD)
+        workers = hashing.HASHING_WORKERS or 2
+        try:
+            # El benchmark repite logins del mismo email: sin rate limiting
+            with mock.patch.object(SlidingWindowThrottle, 'allow_request', return_value=True):
+                baseline = asyncio.run(self.phase(0, options['requests']))
+                self.report('Sin logins', baseline)
+
+                for label, pool_size in (
+                    ('Hash en el hilo sync', 0),
+                    (f'Pool de {workers} procesos', workers),
+                ):
+                    with mock.patch.object(hashing, 'HASHING_WORKERS', pool_size):
+                        latencies, logins = asyncio.run(
+                            self.phase(options['logins'], options['requests'])
+                        )
+                    self.report(label, latencies, logins)
+        finally:
+            user.delete()
+
+        self.stdout.write(self.style.SUCCESS('✅ Benchmark completado'))
+
+    async def phase(self, concurrency, total):
+        client = AsyncClient(headers={'host': self.host})
+        stop = asyncio.Event()
+        completed = []
+
+        async def login_loop():
+            while not stop.is_set():
+                start = time.perf_counter()
+                response = await client.post(
+                    LOGIN_URL, {'email': EMAIL, 'password': PASSWORD},
+                    content_type='application/json'
+                )
+                if response.status_code == 200:
+                    completed.append(time.perf_counter() - start)
+
+        tasks = [asyncio.create_task(login_loop()) for _ in range(concurrency)]
+        if tasks:
+            await asyncio.sleep(1)  # logins ya en curso
+
+        latencies = []
+        for _ in range(total):
+            start = time.perf_counter()
+            await client.get(UNRELATED_URL)
+            latencies.append(time.perf_counter() - start)
+
+        stop.set()
+        await asyncio.gather(*tasks)
+        if not concurrency:
+            return latencies
+        return latencies, completed
+
+    def report(self, label, latencies, logins=None):
+        p95 = statistics.quantiles(latencies, n=20)[-1]
+        line = (
+            f'{label}: {UNRELATED_URL} p50 {statistics.median(latencies) * 1000:.1f} ms, '
+            f'p95 {p95 * 1000:.1f} ms'
+        )
+        if logins:
+            line += f'; {len(logins)} logins, p50 {statistics.median(logins) * 1000:.0f} ms'
+        self.stdout.write(line)
@@ -0,0 +1,89 @@
+# apps/authentication/management/commands/cleanup_tokens.py
+
+import random
+import time
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.utils import timezone
+from rest_framework.authtoken.models import Token
+from apps.authentication.authentication import TOKEN_TTL
+
+LATENCY_SAMPLE = 200
+
+
+class Command(BaseCommand):
+    help = 'Elimina tokens expirados por lotes cortos y muestra métricas de la tabla'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Tokens eliminados por transacción'
+        )
+        parser.add_argument(
+            '--sleep',
+            type=float,
+            default=0.05,
+            help='Pausa en segundos entre lotes para no acaparar la BD'
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Solo contar los tokens expirados'
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        cutoff = timezone.now() - TOKEN_TTL
+        expired = Token.objects.filter(created__lt=cutoff)
+
+        self.report('Antes')
+        if options['dry_run']:
+            self.stdout.write(self.style.WARNING(f'{expired.count()} tokens expirados (dry-run)'))
+            return
+
+        deleted = 0
+        while True:
+            # Cada lote en su propia transacción: bloqueos cortos sobre pocas filas
+            with transaction.atomic():
+                keys = list(expired.values_list('key', flat=True)[:batch_size])
+                if not keys:
+                    break
+                Token.objects.filter(key__in=keys, created__lt=cutoff).delete()
+            deleted += len(keys)
+            self.stdout.write(f'  {deleted} tokens eliminados...')
+            time.sleep(options['sleep'])
+
+        self.report('Después')
+        self.stdout.write(self.style.SUCCESS(f'✅ {deleted} tokens expirados eliminados'))
+
+    def report(self, label):
+        rows = Token.objects.count()
+        size = self.table_size()
+        latency = self.lookup_latency()
+        self.stdout.write(
+            f'{label}: {rows} tokens'
+            + (f', {size / 1024:.0f} KiB' if size is not None else '')
+            + (f', búsqueda por key {latency:.1f} µs' if latency is not None else '')
+        )
+
+    def table_size(self):
+        """Tamaño en disco de la tabla con índices (solo PostgreSQL)"""
+        if connection.vendor != 'postgresql':
+            return None
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT pg_total_relation_size('authtoken_token')")
+            return cursor.fetchone()[0]
+
+    def lookup_latency(self):
+        """Latencia media de Token.objects.get(key=...) sobre una muestra de keys"""
+        keys = list(Token.objects.values_list('key', flat=True)[:LATENCY_SAMPLE * 5])
+        if not keys:
+            return None
+        sample = random.sample(keys, min(LATENCY_SAMPLE, len(keys)))
+
+        start = time.perf_counter()
+        for key in sample:
+            Token.objects.get(key=key)
+        return (time.perf_counter() - start) / len(sample) * 1e6
@@ -0,0 +1,144 @@
+# apps/authentication/management/commands/load_test_throttling.py
+
+import statistics
+import threading
+import time
+from collections import Counter
+from unittest import mock
+from django.core.cache import cache
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test import Client
+from apps.authentication.throttles import SlidingWindowThrottle
+
+LEGIT_URL = '/api/professionals/'
+LOGIN_URL = '/api/auth/login/'
+ATTACKER_IP = '203.0.113.66'
+
+
+class Command(BaseCommand):
+    help = (
+        'Prueba de carga del rate limiting: latencia del tráfico legítimo '
+        'sin ataque vs. con credential stuffing y scraping desde una IP'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=200, help='Requests legítimos por fase')
+        parser.add_argument('--attackers', type=int, default=4, help='Hilos atacantes')
+        parser.add_argument(
+            '--attack-rate',
+            type=float,
+            default=50,
+            help='Requests por segundo de cada hilo atacante'
+        )
+        parser.add_argument(
+            '--warmup',
+            type=float,
+            default=120,
+            help='Segundos máximos de ataque antes de medir (hasta el primer 429)'
+        )
+        parser.add_argument(
+            '--compare',
+            action='store_true',
+            help='Repetir el ataque con el rate limiting desactivado'
+        )
+        parser.add_argument('--host', default='localhost', help='Host permitido por ALLOWED_HOSTS')
+
+    def handle(self, *args, **options):
+        self.host = options['host']
+        # Contadores de throttling limpios entre corridas
+        cache.clear()
+
+        baseline = self.legit_traffic(options['requests'])
+        self.report('Sin ataque', baseline)
+
+        self.attack_interval = 1 / options['attack_rate']
+        under_attack, attack_results = self.under_attack(options)
+        self.report('Bajo ataque', under_attack)
+        self.report_attack(attack_results)
+
+        p95_ratio = self.p95(under_attack) / self.p95(baseline)
+        self.stdout.write(self.style.SUCCESS(f'✅ p95 bajo ataque / p95 sin ataque: {p95_ratio:.2f}x'))
+
+        if options['compare']:
+            cache.clear()
+            with mock.patch.object(SlidingWindowThrottle, 'allow_request', return_value=True):
+                unprotected, attack_results = self.under_attack(options)
+            self.report('Bajo ataque sin rate limiting', unprotected)
+            self.report_attack(attack_results)
+            self.stdout.write(
+                f'p95 sin rate limiting / p95 sin ataque: '
+                f'{self.p95(unprotected) / self.p95(baseline):.2f}x'
+            )
+        cache.clear()
+
+    def under_attack(self, options):
+        stop = threading.Event()
+        results = Counter()
+        throttled = [threading.Event() for _ in range(options['attackers'])]
+        attackers = [
+            threading.Thread(target=self.attack, args=(stop, results, throttled[i], i % 2 == 0))
+            for i in range(options['attackers'])
+        ]
+        for thread in attackers:
+            thread.start()
+        try:
+            # Ataque sostenido: medir cuando cada atacante ya recibió un 429
+            # (o tras --warmup segundos si el rate limiting está desactivado)
+            deadline = time.monotonic() + options['warmup']
+            for event in throttled:
+                event.wait(max(deadline - time.monotonic(), 0))
+            latencies = self.legit_traffic(options['requests'])
+        finally:
+            stop.set()
+            for thread in attackers:
+                thread.join()
+        return latencies, results
+
+    def legit_traffic(self, total):
+        """Clientes anónimos legítimos, cada uno desde su propia IP"""
+        latencies = []
+        for i in range(total):
+            client = Client(SERVER_NAME=self.host, REMOTE_ADDR=f'198.51.100.{i % 250 + 1}')
+            start = time.perf_counter()
+            response = client.get(LEGIT_URL)
+            latencies.append(time.perf_counter() - start)
+            if response.status_code != 200:
+                self.stdout.write(self.style.WARNING(f'Legítimo recibió {response.status_code}'))
+        return latencies
+
+    def attack(self, stop, results, throttled, credential_stuffing):
+        client = Client(SERVER_NAME=self.host, REMOTE_ADDR=ATTACKER_IP)
+        attempt = 0
+        try:
+            while not stop.is_set():
+                attempt += 1
+                if credential_stuffing:
+                    response = client.post(
+                        LOGIN_URL,
+                        {'email': f'victim{attempt}@example.com', 'password': 'wrong-password'},
+                        content_type='application/json'
+                    )
+                else:
+                    response = client.get(LEGIT_URL)
+                results[response.status_code] += 1
+                if response.status_code == 429:
+                    throttled.set()
+                stop.wait(self.attack_interval)
+        finally:
+            connection.close()
+
+    def p95(self, latencies):
+        return statistics.quantiles(latencies, n=20)[-1]
+
+    def report_attack(self, results):
+        self.stdout.write(
+            '  requests del atacante: ' +
+            ', '.join(f'{code}: {count}' for code, count in sorted(results.items()))
+        )
+
+    def report(self, label, latencies):
+        self.stdout.write(
+            f'{label}: p50 {statistics.median(latencies) * 1000:.1f} ms, '
+            f'p95 {self.p95(latencies) * 1000:.1f} ms ({len(latencies)} requests)'
+        )
@@ -0,0 +1,34 @@
+# Índice sobre authtoken_token.created para expirar y limpiar tokens por fecha.
+# El modelo Token es de rest_framework.authtoken, por eso se crea con SQL.
+# En PostgreSQL se crea CONCURRENTLY (sin bloquear escrituras en la tabla de
+# tokens durante la construcción); eso no puede correr dentro de una
+# transacción, de ahí atomic = False.
+
+from django.db import migrations
+
+INDEX_NAME = 'authtoken_token_created_idx'
+
+
+def create_index(apps, schema_editor):
+    concurrently = 'CONCURRENTLY ' if schema_editor.connection.vendor == 'postgresql' else ''
+    schema_editor.execute(
+        f'CREATE INDEX {concurrently}IF NOT EXISTS {INDEX_NAME} ON authtoken_token (created)'
+    )
+
+
+def drop_index(apps, schema_editor):
+    concurrently = 'CONCURRENTLY ' if schema_editor.connection.vendor == 'postgresql' else ''
+    schema_editor.execute(f'DROP INDEX {concurrently}IF EXISTS {INDEX_NAME}')
+
+
+class Migration(migrations.Migration):
+
+    atomic = False
+
+    dependencies = [
+        ('authtoken', '0004_alter_tokenproxy_options'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_index, drop_index),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 5.2.6 on 2026-10-19 03:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('authentication', '0002_accesstokenversion'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TokenInvalidation',
+            fields=[
+                ('user_id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('invalidated_at', models.DateTimeField(db_index=True)),
+            ],
+            options={
+                'verbose_name': 'Invalidación de tokens',
+                'verbose_name_plural': 'Invalidaciones de tokens',
+                'db_table': 'token_invalidations',
+            },
+        ),
+    ]
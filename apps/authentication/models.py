@@ -1,3 +1,55 @@
+# apps/authentication/models.py
+
+from django.conf import settings
 from django.db import models
+from django.db.models import F
+
+
+class AccessTokenVersion(models.Model):
+    """
+    Versión de los tokens de acceso firmados de un usuario (claim 'v').
+    Cerrar sesión o cambiar la contraseña la incrementa: los tokens emitidos
+    antes dejan de valer sin esperar a que expiren. Sin fila, versión 0.
+    """
+    user = models.OneToOneField(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='access_token_version'
+    )
+    version = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        db_table = 'access_token_versions'
+        verbose_name = 'Versión de tokens de acceso'
+        verbose_name_plural = 'Versiones de tokens de acceso'
+
+    def __str__(self):
+        return f"Tokens de acceso de {self.user_id} v{self.version}"
+
+    @classmethod
+    def bump(cls, user_id):
+        updated = cls.objects.filter(user_id=user_id).update(version=F('version') + 1)
+        if not updated:
+            _, created = cls.objects.get_or_create(user_id=user_id, defaults={'version': 1})
+            if not created:
+                cls.objects.filter(user_id=user_id).update(version=F('version') + 1)
+
+
+class TokenInvalidation(models.Model):
+    """
+    Última invalidación de los tokens cacheados de un usuario (authentication.py).
+    Solo se usa si la caché por defecto es local al proceso: cada worker lee las
+    filas nuevas como mucho cada AUTH_TOKEN_CACHE_CHECK_SECONDS y descarta esos
+    usuarios de su LRU. Sin FK: también marca usuarios borrados.
+    """
+    user_id = models.BigIntegerField(primary_key=True)
+    invalidated_at = models.DateTimeField(db_index=True)
+
+    class Meta:
+        db_table = 'token_invalidations'
+        verbose_name = 'Invalidación de tokens'
+        verbose_name_plural = 'Invalidaciones de tokens'
 
-# Create your models here.
+    def __str__(self):
+        return f"Tokens de {self.user_id} invalidados {self.invalidated_at}"
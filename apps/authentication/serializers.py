@@ -1,13 +1,14 @@
 # apps/authentication/serializers.py
 
 from rest_framework import serializers
-from django.contrib.auth import authenticate, get_user_model
+from django.contrib.auth import get_user_model
 from django.contrib.auth.password_validation import validate_password
 from django.core.exceptions import ValidationError
+from apps.users.registration import RegistrationSerializerMixin
 
 User = get_user_model()
 
-class UserRegistrationSerializer(serializers.ModelSerializer):
+class UserRegistrationSerializer(RegistrationSerializerMixin, serializers.ModelSerializer):
     """
     Serializer para registro de paciente en el centro de salud mental - CU-01
     """
@@ -23,26 +24,6 @@ class UserRegistrationSerializer(serializers.ModelSerializer):
             'password', 'password_confirm'
         )
     
-    def validate(self, attrs):
-        if attrs['password'] != attrs['password_confirm']:
-            raise serializers.ValidationError("Las contraseñas no coinciden")
-        return attrs
-    
-    def validate_ci(self, value):
-        if User.objects.filter(ci=value).exists():
-            raise serializers.ValidationError("Esta cédula ya está registrada")
-        return value
-    
-    def validate_email(self, value):
-        if User.objects.filter(email=value).exists():
-            raise serializers.ValidationError("Este email ya está registrado")
-        return value
-    
-    def validate_username(self, value):
-        if User.objects.filter(username=value).exists():
-            raise serializers.ValidationError("Este nombre de usuario ya existe")
-        return value
-    
     def validate_date_of_birth(self, value):
         from datetime import date
         today = date.today()
@@ -54,16 +35,6 @@ class UserRegistrationSerializer(serializers.ModelSerializer):
             raise serializers.ValidationError("Edad no válida")
         
         return value
-    
-    def create(self, validated_data):
-        validated_data.pop('password_confirm')
-        password = validated_data.pop('password')
-        validated_data['user_type'] = 'patient'  # Solo pacientes se registran por la app
-        
-        user = User.objects.create_user(**validated_data)
-        user.set_password(password)
-        user.save()
-        return user
 
 
 class UserLoginSerializer(serializers.Serializer):
@@ -73,21 +44,7 @@ class UserLoginSerializer(serializers.Serializer):
     email = serializers.EmailField()
     password = serializers.CharField()
     
-    def validate(self, attrs):
-        email = attrs.get('email')
-        password = attrs.get('password')
-        
-        if email and password:
-            user = authenticate(username=email, password=password)
-            if not user:
-                raise serializers.ValidationError('Credenciales incorrectas')
-            if not user.is_active:
-                raise serializers.ValidationError('Cuenta desactivada')
-            attrs['user'] = user
-        else:
-            raise serializers.ValidationError('Email y contraseña son requeridos')
-        
-        return attrs
+    # Las credenciales se verifican en la vista con acheck_password (hashing.py)
 
 
 class PasswordResetRequestSerializer(serializers.Serializer):
@@ -124,11 +81,7 @@ class ChangePasswordSerializer(serializers.Serializer):
     new_password = serializers.CharField(validators=[validate_password])
     new_password_confirm = serializers.CharField()
     
-    def validate_current_password(self, value):
-        user = self.context['request'].user
-        if not user.check_password(value):
-            raise serializers.ValidationError("Contraseña actual incorrecta")
-        return value
+    # La contraseña actual se verifica en la vista con acheck_password (hashing.py)
     
     def validate(self, attrs):
         if attrs['new_password'] != attrs['new_password_confirm']:
@@ -0,0 +1,25 @@
+# apps/authentication/signals.py
+
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from rest_framework.authtoken.models import Token
+from .authentication import invalidate_user
+
+User = get_user_model()
+
+
+@receiver(post_delete, sender=Token)
+def token_deleted(sender, instance, **kwargs):
+    # logout_user y change_password borran el token
+    user_id = instance.user_id
+    transaction.on_commit(lambda: invalidate_user(user_id))
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def user_changed(sender, instance, **kwargs):
+    # Desactivación (delete_account, admin) y cambios de perfil/contraseña
+    user_id = instance.pk
+    transaction.on_commit(lambda: invalidate_user(user_id))
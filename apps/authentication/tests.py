@@ -1,3 +1,388 @@
-from django.test import TestCase
+# apps/authentication/tests.py
 
-# Create your tests here.
+import importlib
+import io
+import time
+from concurrent.futures import Executor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from datetime import timedelta
+from unittest import mock
+from asgiref.sync import async_to_sync
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test import SimpleTestCase, TestCase
+from django.utils import timezone
+from rest_framework import exceptions
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+from . import authentication, hashing
+from .throttles import SlidingWindowThrottle
+from .models import TokenInvalidation
+from .authentication import (
+    TOKEN_TTL,
+    CachedTokenAuthentication,
+    SignedAccessTokenAuthentication,
+    get_user_for_token,
+    issue_access_token,
+    token_cache,
+)
+
+User = get_user_model()
+
+
+def create_user(email='user@example.com', **fields):
+    return User.objects.create_user(email=email, first_name='Ana', last_name='Paz', **fields)
+
+
+def reset_token_cache():
+    token_cache.clear()
+    # Como si este worker acabara de revisar token_invalidations
+    authentication._invalidations_since = timezone.now() - timedelta(minutes=5)
+    authentication._invalidations_checked_at = time.monotonic()
+
+
+class TokenCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        reset_token_cache()
+        self.user = create_user()
+        self.token = Token.objects.create(user=self.user)
+
+    def shared(self):
+        return mock.patch.object(authentication, 'shared_cache', return_value=True)
+
+    def test_local_cache_serves_from_process_cache(self):
+        get_user_for_token(self.token.key)
+        with self.assertNumQueries(0):
+            user, _ = get_user_for_token(self.token.key)
+        self.assertEqual(user.pk, self.user.pk)
+
+    def test_local_cache_sees_other_worker_invalidation_from_database(self):
+        get_user_for_token(self.token.key)
+        # Fila dejada por otro worker
+        TokenInvalidation.objects.create(user_id=self.user.pk, invalidated_at=timezone.now() + timedelta(seconds=1))
+        with self.assertNumQueries(0):
+            get_user_for_token(self.token.key)  # todavía sin revisar la tabla
+
+        authentication._invalidations_checked_at = 0.0
+        with self.assertNumQueries(2):  # invalidaciones y token
+            get_user_for_token(self.token.key)
+        with self.assertNumQueries(0):
+            get_user_for_token(self.token.key)
+
+    def test_local_invalidation_is_recorded_for_other_workers(self):
+        get_user_for_token(self.token.key)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.is_active = False
+            self.user.save()
+        self.assertTrue(TokenInvalidation.objects.filter(user_id=self.user.pk).exists())
+        with self.assertRaises(exceptions.AuthenticationFailed):
+            CachedTokenAuthentication().authenticate_credentials(self.token.key)
+
+    def test_shared_cache_serves_from_process_cache(self):
+        with self.shared():
+            get_user_for_token(self.token.key)
+            with self.assertNumQueries(0):
+                user, _ = get_user_for_token(self.token.key)
+        self.assertEqual(user.pk, self.user.pk)
+
+    def test_invalidation_from_other_worker_discards_entry(self):
+        with self.shared():
+            get_user_for_token(self.token.key)
+            # Marca dejada por otro worker en la caché compartida
+            cache.set(authentication.INVALIDATED_KEY.format(self.user.pk), time.time() + 1)
+            with self.assertNumQueries(1):
+                get_user_for_token(self.token.key)
+
+    def test_logout_revokes_cached_token(self):
+        with self.shared():
+            get_user_for_token(self.token.key)
+            client = APIClient()
+            client.credentials(HTTP_AUTHORIZATION=f'Token {self.token.key}')
+            with self.captureOnCommitCallbacks(execute=True):
+                self.assertEqual(client.post('/api/auth/logout/').status_code, 200)
+            self.assertEqual(get_user_for_token(self.token.key), (None, None))
+
+    def test_deactivated_user_is_rejected(self):
+        with self.shared():
+            get_user_for_token(self.token.key)
+            with self.captureOnCommitCallbacks(execute=True):
+                self.user.is_active = False
+                self.user.save()
+            with self.assertRaises(exceptions.AuthenticationFailed):
+                CachedTokenAuthentication().authenticate_credentials(self.token.key)
+
+    def test_cached_user_is_a_copy(self):
+        with self.shared():
+            user, _ = get_user_for_token(self.token.key)
+            user.first_name = 'Modificado'
+            self.assertEqual(get_user_for_token(self.token.key)[0].first_name, 'Ana')
+
+
+class TokenExpirationTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        reset_token_cache()
+        self.user = create_user()
+
+    def token(self, age, user=None):
+        token = Token.objects.create(user=user or self.user)
+        Token.objects.filter(pk=token.pk).update(created=timezone.now() - age)
+        return token
+
+    def test_expired_token_is_rejected_and_deleted(self):
+        token = self.token(TOKEN_TTL + timedelta(minutes=1))
+        self.assertEqual(get_user_for_token(token.key), (None, None))
+        self.assertFalse(Token.objects.filter(pk=token.pk).exists())
+
+    def test_token_is_renewed_after_half_its_life(self):
+        token = self.token(TOKEN_TTL * 0.75)
+        get_user_for_token(token.key)
+        token.refresh_from_db()
+        self.assertLess(timezone.now() - token.created, timedelta(minutes=1))
+
+    def test_recent_token_is_not_rewritten(self):
+        token = self.token(timedelta(minutes=5))
+        with self.assertNumQueries(1):
+            get_user_for_token(token.key)
+
+    def test_cleanup_deletes_only_expired_tokens_in_batches(self):
+        for i in range(5):
+            self.token(TOKEN_TTL + timedelta(hours=1), create_user(f'old{i}@example.com'))
+        fresh = self.token(timedelta(minutes=5))
+
+        out = io.StringIO()
+        call_command('cleanup_tokens', batch_size=2, sleep=0, stdout=out)
+        self.assertEqual(list(Token.objects.values_list('pk', flat=True)), [fresh.pk])
+        self.assertIn('5 tokens expirados eliminados', out.getvalue())
+
+
+class TokenCreatedIndexMigrationTests(TestCase):
+    migration = importlib.import_module('apps.authentication.migrations.0001_token_created_index')
+
+    def test_index_exists(self):
+        with connection.cursor() as cursor:
+            constraints = connection.introspection.get_constraints(cursor, 'authtoken_token')
+        self.assertEqual(constraints[self.migration.INDEX_NAME]['columns'], ['created'])
+
+    def test_postgresql_builds_index_concurrently(self):
+        self.assertFalse(self.migration.Migration.atomic)
+        schema_editor = mock.Mock()
+        schema_editor.connection.vendor = 'postgresql'
+        self.migration.create_index(None, schema_editor)
+        self.migration.drop_index(None, schema_editor)
+        create_sql, drop_sql = [call.args[0] for call in schema_editor.execute.call_args_list]
+        self.assertIn('CREATE INDEX CONCURRENTLY', create_sql)
+        self.assertIn('DROP INDEX CONCURRENTLY', drop_sql)
+
+
+class SignedAccessTokenTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        reset_token_cache()
+        self.user = create_user()
+        self.user.set_password('Clave-antigua-123')
+        self.user.save()
+        self.token = Token.objects.create(user=self.user)
+        self.access = issue_access_token(self.user)
+
+    def me(self, access=None):
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f'Bearer {access or self.access}')
+        return client.get('/api/users/me/')
+
+    def refresh(self):
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f'Token {self.token.key}')
+        return client.post('/api/auth/token/refresh/')
+
+    def check_revocation(self):
+        return mock.patch.object(authentication, 'ACCESS_TOKEN_CHECK_REVOCATION', True)
+
+    # SessionAuthentication va primero: DRF responde 403 (no 401) al rechazar
+    def test_valid_token_authenticates(self):
+        self.assertEqual(self.me().status_code, 200)
+
+    def test_verification_only_checks_signature(self):
+        request = APIClient().get('/').wsgi_request
+        request.META['HTTP_AUTHORIZATION'] = f'Bearer {self.access}'
+        with self.assertNumQueries(0), mock.patch.object(authentication, 'cache') as shared:
+            user, _ = SignedAccessTokenAuthentication().authenticate(request)
+        self.assertFalse(shared.method_calls)
+        self.assertEqual((user.id, user.user_type), (self.user.pk, self.user.user_type))
+
+    def test_tampered_token_is_rejected(self):
+        self.assertEqual(self.me(self.access[:-2] + 'xx').status_code, 403)
+
+    def test_deleted_user_is_rejected(self):
+        self.user.delete()
+        self.assertEqual(self.me().status_code, 403)
+
+    def test_user_deleted_after_verification_raises_authentication_failed(self):
+        request = APIClient().get('/').wsgi_request
+        request.META['HTTP_AUTHORIZATION'] = f'Bearer {self.access}'
+        user, _ = SignedAccessTokenAuthentication().authenticate(request)
+        User.objects.filter(pk=self.user.pk).delete()
+        with self.assertRaises(exceptions.AuthenticationFailed):
+            user.email
+
+    def test_refresh_issues_token_with_current_version(self):
+        authentication.revoke_access_tokens(self.user.pk)
+        response = self.refresh()
+        self.assertEqual(response.status_code, 200)
+        with self.check_revocation():
+            self.assertEqual(self.me(response.json()['access']).status_code, 200)
+            self.assertEqual(self.me().status_code, 403)
+
+    def test_refresh_rejects_inactive_user(self):
+        User.objects.filter(pk=self.user.pk).update(is_active=False)
+        self.assertEqual(self.refresh().status_code, 401)
+
+    def test_logout_ends_refresh(self):
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f'Bearer {self.access}')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(client.post('/api/auth/logout/').status_code, 200)
+        # El refresco solo acepta Token: 401
+        self.assertEqual(self.refresh().status_code, 401)
+        # Sin revisión por request, el token de acceso vale hasta expirar
+        self.assertEqual(self.me().status_code, 200)
+        with self.check_revocation():
+            self.assertEqual(self.me().status_code, 403)
+
+    def test_expired_token_is_rejected(self):
+        with mock.patch.object(authentication, 'ACCESS_TOKEN_TTL', -1):
+            self.assertEqual(self.me().status_code, 403)
+
+    def test_inactive_user_is_rejected_with_revocation_check(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.is_active = False
+            self.user.save()
+        with self.check_revocation():
+            self.assertEqual(self.me().status_code, 403)
+
+    def test_password_change_revokes_access_token_with_revocation_check(self):
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f'Token {self.token.key}')
+        response = client.post('/api/auth/change-password/', {
+            'current_password': 'Clave-antigua-123',
+            'new_password': 'Clave-nueva-456!',
+            'new_password_confirm': 'Clave-nueva-456!',
+        }, format='json')
+        self.assertEqual(response.status_code, 200, response.content)
+        with self.check_revocation():
+            self.assertEqual(self.me().status_code, 403)
+            self.assertEqual(self.me(issue_access_token(self.user)).status_code, 200)
+
+    def test_revocation_is_seen_through_shared_cache(self):
+        with mock.patch.object(authentication, 'shared_cache', return_value=True), self.check_revocation():
+            self.assertEqual(self.me().status_code, 200)
+            with self.captureOnCommitCallbacks(execute=True):
+                authentication.revoke_access_tokens(self.user.pk)
+            self.assertEqual(self.me().status_code, 403)
+
+
+class SlidingWindowThrottleTests(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def throttle(self, now):
+        throttle_class = type('TestThrottle', (SlidingWindowThrottle,), {
+            'rate': '4/min',
+            'get_cache_key': lambda self, request, view: 'throttle:test:ip',
+            'timer': lambda self: now,
+        })
+        return throttle_class()
+
+    def allowed(self, now, times=1):
+        return [self.throttle(now).allow_request(None, None) for _ in range(times)]
+
+    def test_limit_within_window(self):
+        self.assertEqual(self.allowed(6000, times=5), [True] * 4 + [False])
+
+    def test_previous_window_weighs_by_remaining_fraction(self):
+        self.allowed(6000, times=4)
+        # Mitad de la ventana siguiente: 4 * 0,5 + 0 = 2, quedan 2
+        self.assertEqual(self.allowed(6090, times=3), [True, True, False])
+
+    def test_retry_after(self):
+        self.allowed(6000, times=4)
+        throttle = self.throttle(6030)
+        self.assertFalse(throttle.allow_request(None, None))
+        # Próxima ventana (30 s) y que la actual pese menos de 4 * (1 - 4/4)
+        self.assertEqual(throttle.wait(), 30)
+
+
+class EndpointThrottleTests(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def reset(self, email, ip='10.0.0.1'):
+        return APIClient().post(
+            '/api/auth/password-reset/', {'email': email}, format='json', REMOTE_ADDR=ip
+        )
+
+    def test_password_reset_is_limited_per_email(self):
+        # password_reset_email: 3/hour por defecto, desde IPs distintas
+        statuses = [self.reset('victima@example.com', f'10.0.0.{i}').status_code for i in range(4)]
+        self.assertEqual(statuses[3], 429)
+        response = self.reset('victima@example.com', '10.0.0.9')
+        self.assertGreater(int(response['Retry-After']), 0)
+        self.assertNotEqual(self.reset('otra@example.com', '10.0.0.9').status_code, 429)
+
+    def test_login_is_limited_per_ip(self):
+        # login: 20/min por IP, con emails distintos (sin usuario: no llega a comparar claves)
+        client = APIClient()
+        with mock.patch('apps.authentication.views.amake_password', return_value='x'):
+            statuses = [
+                client.post('/api/auth/login/', {
+                    'email': f'u{i}@example.com', 'password': 'clave'
+                }, format='json').status_code
+                for i in range(21)
+            ]
+        self.assertEqual(statuses[:20], [400] * 20)
+        self.assertEqual(statuses[20], 429)
+
+
+class BrokenExecutor(Executor):
+    """Pool cuyo proceso murió"""
+
+    def __init__(self):
+        self.shutdown_called = False
+
+    def submit(self, fn, *args, **kwargs):
+        raise BrokenProcessPool('proceso terminado')
+
+    def shutdown(self, wait=True, *, cancel_futures=False):
+        self.shutdown_called = True
+
+
+class HashingPoolTests(SimpleTestCase):
+    def setUp(self):
+        self.broken = BrokenExecutor()
+        hashing._executor = self.broken
+        patcher = mock.patch.object(hashing, 'HASHING_WORKERS', 1)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.addCleanup(setattr, hashing, '_executor', None)
+
+    def run_hash(self):
+        return async_to_sync(hashing._run)(str.upper, 'clave')
+
+    def test_broken_pool_is_replaced_and_retried(self):
+        replacement = ThreadPoolExecutor(max_workers=1)
+        self.addCleanup(replacement.shutdown)
+        with mock.patch.object(hashing, 'create_pool', return_value=replacement):
+            self.assertEqual(self.run_hash(), 'CLAVE')
+        self.assertTrue(self.broken.shutdown_called)
+        self.assertIs(hashing._executor, replacement)
+        self.assertEqual(hashing.pending(), 0)
+
+    def test_broken_replacement_raises_busy(self):
+        with mock.patch.object(hashing, 'create_pool', return_value=BrokenExecutor()):
+            with self.assertRaises(hashing.HashingBusy):
+                self.run_hash()
+        self.assertIsNone(hashing._executor)
+        self.assertEqual(hashing.pending(), 0)
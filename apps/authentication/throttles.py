@@ -0,0 +1,106 @@
+# apps/authentication/throttles.py
+
+import hashlib
+import math
+from rest_framework.throttling import SimpleRateThrottle
+
+# Rate limiting con ventana deslizante aproximada sobre la caché (Redis en producción).
+# Se guardan dos contadores por clave (ventana actual y anterior); la cuenta estimada es
+#   anterior * (fracción de la ventana anterior que sigue dentro) + actual
+# Dos enteros por clave en lugar de la lista de timestamps de SimpleRateThrottle.
+# Las tasas se configuran por scope en REST_FRAMEWORK['DEFAULT_THROTTLE_RATES'].
+
+
+class SlidingWindowThrottle(SimpleRateThrottle):
+    """Base: las subclases definen scope y get_cache_key"""
+
+    cache_format = 'throttle:%(scope)s:%(ident)s'
+
+    def allow_request(self, request, view):
+        if self.rate is None:
+            return True
+
+        self.key = self.get_cache_key(request, view)
+        if self.key is None:
+            return True
+
+        now = self.timer()
+        window = int(now // self.duration)
+        elapsed = now - window * self.duration
+        current_key = f'{self.key}:{window}'
+        previous_key = f'{self.key}:{window - 1}'
+
+        counts = self.cache.get_many([current_key, previous_key])
+        current = counts.get(current_key, 0)
+        previous = counts.get(previous_key, 0)
+        remaining = 1 - elapsed / self.duration
+
+        if previous * remaining + current >= self.num_requests:
+            self.retry_after = self._retry_after(previous, current, elapsed)
+            return False
+
+        if not self.cache.add(current_key, 1, self.duration * 2):
+            try:
+                self.cache.incr(current_key)
+            except ValueError:  # expiró entre add e incr
+                self.cache.set(current_key, 1, self.duration * 2)
+        return True
+
+    def _retry_after(self, previous, current, elapsed):
+        """Segundos hasta que la cuenta estimada baje del límite"""
+        if current >= self.num_requests:
+            # Hay que esperar a la próxima ventana y a que la actual pese menos
+            seconds = (self.duration - elapsed) + self.duration * (1 - self.num_requests / current)
+        else:
+            seconds = self.duration * (1 - (self.num_requests - current) / previous) - elapsed
+        return max(1, math.ceil(seconds))
+
+    def wait(self):
+        return getattr(self, 'retry_after', None)
+
+
+class IPRateThrottle(SlidingWindowThrottle):
+    """Por IP del cliente (respeta NUM_PROXIES para X-Forwarded-For)"""
+
+    def get_cache_key(self, request, view):
+        return self.cache_format % {'scope': self.scope, 'ident': self.get_ident(request)}
+
+
+class EmailRateThrottle(SlidingWindowThrottle):
+    """Por email del cuerpo del request (ataques distribuidos contra una misma cuenta)"""
+
+    def get_cache_key(self, request, view):
+        email = request.data.get('email') if hasattr(request.data, 'get') else None
+        if not email or not isinstance(email, str):
+            return None
+        # Hash: la clave de caché no guarda el email
+        ident = hashlib.sha256(email.strip().lower().encode()).hexdigest()[:32]
+        return self.cache_format % {'scope': self.scope, 'ident': ident}
+
+
+def scoped_throttles(scope, by_email=False):
+    """
+    Throttles para una vista de función:
+        @throttle_classes(scoped_throttles('login', by_email=True))
+    Usa las tasas '<scope>' (por IP) y '<scope>_email' (por email).
+    """
+    throttles = [type(f'{scope.title()}IPThrottle', (IPRateThrottle,), {'scope': scope})]
+    if by_email:
+        throttles.append(type(
+            f'{scope.title()}EmailThrottle', (EmailRateThrottle,), {'scope': f'{scope}_email'}
+        ))
+    return throttles
+
+
+def check_throttles(throttle_classes, request):
+    """
+    Para vistas async fuera de APIView (ver async_api.py).
+    Devuelve los segundos de espera si algún throttle rechaza el request, o None.
+    """
+    waits = []
+    for throttle in (throttle_class() for throttle_class in throttle_classes):
+        if not throttle.allow_request(request, None):
+            waits.append(throttle.wait())
+    if not waits:
+        return None
+    return max((wait for wait in waits if wait is not None), default=None) or 1
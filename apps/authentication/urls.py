@@ -9,6 +9,9 @@ urlpatterns = [
     # CU-02: Iniciar Sesión
     path('login/', views.login_user, name='login'),
     
+    # Token de acceso firmado (se refresca con el token de login)
+    path('token/refresh/', views.refresh_access_token, name='refresh_access_token'),
+    
     # CU-03: Cerrar Sesión
     path('logout/', views.logout_user, name='logout'),
     
@@ -1,19 +1,37 @@
 # apps/authentication/views.py
 
-from rest_framework import status, permissions
-from rest_framework.decorators import api_view, permission_classes
+from rest_framework import serializers, status, permissions
+from rest_framework.decorators import api_view, permission_classes, authentication_classes, throttle_classes
 from rest_framework.response import Response
-from rest_framework.authtoken.models import Token
-from django.contrib.auth import authenticate, get_user_model
+from asgiref.sync import sync_to_async
+from django.contrib.auth import get_user_model
 from django.contrib.auth.tokens import default_token_generator
 from django.utils.http import urlsafe_base64_encode, urlsafe_base64_decode
 from django.utils.encoding import force_bytes, force_str
-from django.core.mail import send_mail
 from django.template.loader import render_to_string
 from django.conf import settings
-from django.core.mail import send_mail
-from django.utils.http import urlsafe_base64_encode, urlsafe_base64_decode
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_POST
+from rest_framework.authtoken.models import Token
 
+from .authentication import (
+    ACCESS_TOKEN_TTL,
+    CachedTokenAuthentication,
+    issue_access_token,
+    issue_token,
+    revoke_access_tokens,
+)
+from .async_api import (
+    aauthenticate,
+    aparse,
+    api_request,
+    athrottle,
+    busy_response,
+    json_response,
+)
+from .hashing import HashingBusy, acheck_password, amake_password, needs_rehash
+from .throttles import scoped_throttles
+from apps.notifications.outbox import enqueue_email
 from .serializers import (
     UserRegistrationSerializer, 
     UserLoginSerializer, 
@@ -24,51 +42,129 @@ from .serializers import (
 
 User = get_user_model()
 
-@api_view(['POST'])
-@permission_classes([permissions.AllowAny])
-def register_user(request):
-    serializer = UserRegistrationSerializer(data=request.data)
-    if serializer.is_valid():
-        user = serializer.save()
-        token, created = Token.objects.get_or_create(user=user)
-        return Response({
-            'message': 'Usuario registrado exitosamente',
-            'user': {
-                'id': user.id,
-                'email': user.email,
-                'first_name': user.first_name,
-                'last_name': user.last_name,
-                'user_type': user.user_type,
-            },
-            'token': token.key
-        }, status=status.HTTP_201_CREATED)
-    return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+# Login, registro y cambio de contraseña son vistas async: el hash de la
+# contraseña corre en un pool de procesos (hashing.py) y el worker ASGI sigue
+# atendiendo otros requests mientras tanto.
+REGISTER_THROTTLES = scoped_throttles('register')
+LOGIN_THROTTLES = scoped_throttles('login', by_email=True)
+
+
+def user_data(user):
+    return {
+        'id': user.id,
+        'email': user.email,
+        'first_name': user.first_name,
+        'last_name': user.last_name,
+        'user_type': user.user_type,
+    }
+
+
+def issue_tokens(user):
+    token = issue_token(user)
+    return {
+        'token': token.key,
+        'access': issue_access_token(user),
+        'access_expires_in': ACCESS_TOKEN_TTL,
+    }
+
+
+@csrf_exempt
+@require_POST
+async def register_user(request):
+    drf_request = api_request(request)
+    data, error = await aparse(drf_request)
+    if error:
+        return error
+    throttled = await athrottle(drf_request, REGISTER_THROTTLES)
+    if throttled:
+        return throttled
+
+    serializer = UserRegistrationSerializer(data=data)
+    if not await sync_to_async(serializer.is_valid)():
+        return json_response(serializer.errors, status.HTTP_400_BAD_REQUEST)
+
+    try:
+        password_hash = await amake_password(serializer.validated_data['password'])
+    except HashingBusy:
+        return busy_response()
+
+    try:
+        user = await sync_to_async(serializer.save_with_password_hash)(password_hash)
+    except serializers.ValidationError as exc:
+        # Otro registro con el mismo email/ci/username ganó la carrera
+        return json_response(exc.detail, status.HTTP_400_BAD_REQUEST)
+    tokens = await sync_to_async(issue_tokens)(user)
+    return json_response({
+        'message': 'Usuario registrado exitosamente',
+        'user': user_data(user),
+        **tokens,
+    }, status.HTTP_201_CREATED)
+
+@csrf_exempt
+@require_POST
+async def login_user(request):
+    drf_request = api_request(request)
+    data, error = await aparse(drf_request)
+    if error:
+        return error
+    throttled = await athrottle(drf_request, LOGIN_THROTTLES)
+    if throttled:
+        return throttled
+
+    serializer = UserLoginSerializer(data=data)
+    if not serializer.is_valid():
+        return json_response(serializer.errors, status.HTTP_400_BAD_REQUEST)
+    email = serializer.validated_data['email']
+    password = serializer.validated_data['password']
+
+    # Mismo criterio que ModelBackend: usuario inexistente o inactivo -> credenciales incorrectas
+    user = await User.objects.filter(email=email).afirst()
+    try:
+        if user is None:
+            # Hash igual de costoso para no revelar qué emails existen por tiempo de respuesta
+            await amake_password(password)
+            valid = False
+        else:
+            valid = await acheck_password(password, user.password) and user.is_active
+            if valid and needs_rehash(user.password):
+                user.password = await amake_password(password)
+                await user.asave(update_fields=['password'])
+    except HashingBusy:
+        return busy_response()
+
+    if not valid:
+        return json_response({
+            'non_field_errors': ['Credenciales incorrectas']
+        }, status.HTTP_400_BAD_REQUEST)
+
+    tokens = await sync_to_async(issue_tokens)(user)
+    return json_response({
+        'message': 'Sesión iniciada exitosamente',
+        'user': user_data(user),
+        **tokens,
+    }, status.HTTP_200_OK)
 
 @api_view(['POST'])
-@permission_classes([permissions.AllowAny])
-def login_user(request):
-    serializer = UserLoginSerializer(data=request.data)
-    if serializer.is_valid():
-        user = serializer.validated_data['user']
-        token, created = Token.objects.get_or_create(user=user)
-        return Response({
-            'message': 'Sesión iniciada exitosamente',
-            'user': {
-                'id': user.id,
-                'email': user.email,
-                'first_name': user.first_name,
-                'last_name': user.last_name,
-                'user_type': user.user_type,
-            },
-            'token': token.key
-        }, status=status.HTTP_200_OK)
-    return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+@authentication_classes([CachedTokenAuthentication])
+@permission_classes([permissions.IsAuthenticated])
+def refresh_access_token(request):
+    """
+    Emite un token de acceso firmado nuevo.
+    Se autentica con el Token de larga duración (credencial de refresco), que
+    logout y el cambio de contraseña borran; issue_access_token lee de la BD el
+    estado del usuario y rechaza inactivos o borrados.
+    """
+    return Response({
+        'access': issue_access_token(request.user),
+        'access_expires_in': ACCESS_TOKEN_TTL,
+    }, status=status.HTTP_200_OK)
 
 @api_view(['POST'])
 @permission_classes([permissions.IsAuthenticated])
 def logout_user(request):
     try:
         request.user.auth_token.delete()
+        revoke_access_tokens(request.user.id)
         return Response({'message': 'Sesión cerrada exitosamente'}, status=status.HTTP_200_OK)
     except:
         return Response({'error': 'Error al cerrar sesión'}, status=status.HTTP_400_BAD_REQUEST)
@@ -77,7 +173,6 @@ def logout_user(request):
 # --- 1. AÑADE ESTAS IMPORTACIONES AL INICIO DEL ARCHIVO ---
 from django.template.loader import render_to_string
 from django.conf import settings
-from django.core.mail import send_mail
 # ----------------------------------------------------
 
 # ... (aquí van tus otras vistas: register_user, login_user, etc.) ...
@@ -86,6 +181,7 @@ from django.core.mail import send_mail
 # --- 2. REEMPLAZA TU VISTA password_reset_request CON ESTA ---
 @api_view(['POST'])
 @permission_classes([permissions.AllowAny])
+@throttle_classes(scoped_throttles('password_reset', by_email=True))
 def password_reset_request(request):
     serializer = PasswordResetRequestSerializer(data=request.data)
     if serializer.is_valid():
@@ -106,14 +202,12 @@ def password_reset_request(request):
         # Renderizamos la plantilla HTML que creamos en el Paso 1
         email_body = render_to_string('registration/password_reset_email.html', context)
         
-        # Enviamos el correo
-        send_mail(
+        # Se encola; el comando send_outbox lo envía fuera del request
+        enqueue_email(
             subject='Restablecimiento de contraseña para Psico SAS',
-            message=email_body, # Usamos el HTML como mensaje (los clientes de correo modernos lo renderizarán)
-            from_email=settings.DEFAULT_FROM_EMAIL, # Usará el correo que configuraste
-            recipient_list=[user.email],
-            html_message=email_body, # Le decimos que es HTML
-            fail_silently=False,
+            body=email_body, # Usamos el HTML como mensaje (los clientes de correo modernos lo renderizarán)
+            recipients=[user.email],
+            html_body=email_body, # Le decimos que es HTML
         )
 
         return Response({
@@ -125,6 +219,7 @@ def password_reset_request(request):
 # ... (El resto de tus vistas: password_reset_confirm, etc., se quedan igual) ...
 @api_view(['POST'])
 @permission_classes([permissions.AllowAny])
+@throttle_classes(scoped_throttles('password_reset_confirm'))
 def password_reset_confirm(request):
     serializer = PasswordResetConfirmSerializer(data=request.data)
     if serializer.is_valid():
@@ -146,26 +241,41 @@ def password_reset_confirm(request):
             return Response({'error': 'Token inválido'}, status=status.HTTP_400_BAD_REQUEST)
     return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
-@api_view(['POST'])
-@permission_classes([permissions.IsAuthenticated])
-def change_password(request):
-    serializer = ChangePasswordSerializer(data=request.data, context={'request': request})
-    if serializer.is_valid():
-        new_password = serializer.validated_data['new_password']
-        request.user.set_password(new_password)
-        request.user.save()
-        
-        try:
-            request.user.auth_token.delete()
-        except:
-            pass
-        token = Token.objects.create(user=request.user)
-        
-        return Response({
-            'message': 'Contraseña cambiada exitosamente',
-            'token': token.key
-        }, status=status.HTTP_200_OK)
-    return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+@csrf_exempt
+@require_POST
+async def change_password(request):
+    drf_request = api_request(request)
+    user, error = await aauthenticate(drf_request)
+    if error:
+        return error
+    data, error = await aparse(drf_request)
+    if error:
+        return error
+
+    serializer = ChangePasswordSerializer(data=data, context={'request': drf_request})
+    if not await sync_to_async(serializer.is_valid)():
+        return json_response(serializer.errors, status.HTTP_400_BAD_REQUEST)
+
+    # Con token de acceso firmado request.user es perezoso: se lee la fila completa
+    user = await User.objects.aget(pk=user.id)
+    try:
+        if not await acheck_password(serializer.validated_data['current_password'], user.password):
+            return json_response({
+                'current_password': ['Contraseña actual incorrecta']
+            }, status.HTTP_400_BAD_REQUEST)
+        user.password = await amake_password(serializer.validated_data['new_password'])
+    except HashingBusy:
+        return busy_response()
+
+    await user.asave(update_fields=['password'])
+    await Token.objects.filter(user=user).adelete()
+    await sync_to_async(revoke_access_tokens)(user.pk)
+    token = await sync_to_async(issue_token)(user)
+    
+    return json_response({
+        'message': 'Contraseña cambiada exitosamente',
+        'token': token.key
+    }, status.HTTP_200_OK)
 
 @api_view(['GET'])
 @permission_classes([permissions.IsAuthenticated])
@@ -1,6 +1,8 @@
 # apps/chat/consumers.py
 import json
 from channels.generic.websocket import AsyncWebsocketConsumer
+from config import metrics
+from config.instrumentation import instrument_consumer
 
 class ChatConsumer(AsyncWebsocketConsumer):
     async def connect(self):
@@ -17,8 +19,15 @@ class ChatConsumer(AsyncWebsocketConsumer):
                 self.channel_name
             )
             await self.accept()
+            metrics.gauge_add('chat_websocket_connections', 1)
+            self.counted = True
+            metrics.maybe_flush()
 
     async def disconnect(self, close_code):
+        if getattr(self, 'counted', False):
+            metrics.gauge_add('chat_websocket_connections', -1)
+            self.counted = False
+            metrics.maybe_flush()
         # Salir del grupo de la sala
         await self.channel_layer.group_discard(
             self.room_group_name,
@@ -26,6 +35,7 @@ class ChatConsumer(AsyncWebsocketConsumer):
         )
 
     # Recibir mensaje desde WebSocket
+    @instrument_consumer
     async def receive(self, text_data):
         text_data_json = json.loads(text_data)
         message = text_data_json['message']
@@ -1,16 +1,16 @@
 # apps/chat/middleware.py
 from channels.db import database_sync_to_async
 from django.contrib.auth.models import AnonymousUser
-from rest_framework.authtoken.models import Token
 from urllib.parse import parse_qs
+from apps.authentication.authentication import get_user_for_token
 
 @database_sync_to_async
 def get_user(token_key):
-    try:
-        token = Token.objects.get(key=token_key)
-        return token.user
-    except Token.DoesNotExist:
+    # Misma caché de tokens que la API REST
+    user, _ = get_user_for_token(token_key)
+    if user is None or not user.is_active:
         return AnonymousUser()
+    return user
 
 class TokenAuthMiddleware:
     def __init__(self, inner):
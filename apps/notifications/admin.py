@@ -0,0 +1,12 @@
+# apps/notifications/admin.py
+
+from django.contrib import admin
+from .models import OutboxEmail
+
+class OutboxEmailAdmin(admin.ModelAdmin):
+    list_display = ('subject', 'status', 'attempts', 'next_attempt_at', 'created_at', 'sent_at')
+    list_filter = ('status',)
+    search_fields = ('subject', 'recipients')
+    readonly_fields = ('created_at', 'sent_at', 'last_error')
+
+admin.site.register(OutboxEmail, OutboxEmailAdmin)
@@ -0,0 +1,132 @@
+# apps/notifications/management/commands/send_outbox.py
+
+import time
+from datetime import timedelta
+from django.core.mail import EmailMultiAlternatives, get_connection
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+from apps.notifications.models import OutboxEmail
+
+# Tiempo que un lote queda reservado para este worker; si el proceso muere,
+# los correos vuelven a estar disponibles al vencer la reserva.
+LEASE = timedelta(minutes=5)
+BACKOFF_BASE_SECONDS = 30
+BACKOFF_MAX_SECONDS = 60 * 60
+
+
+class Command(BaseCommand):
+    help = 'Envía los correos pendientes del outbox por lotes, reutilizando una conexión SMTP'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=50, help='Correos por lote')
+        parser.add_argument(
+            '--max-attempts',
+            type=int,
+            default=5,
+            help='Intentos antes de marcar un correo como fallido'
+        )
+        parser.add_argument(
+            '--loop',
+            action='store_true',
+            help='Seguir consultando el outbox en lugar de terminar al vaciarlo'
+        )
+        parser.add_argument(
+            '--interval',
+            type=float,
+            default=5,
+            help='Segundos de espera con --loop cuando no hay correos pendientes'
+        )
+
+    def handle(self, *args, **options):
+        sent = failed = 0
+        while True:
+            batch = self.claim(options['batch_size'])
+            if batch:
+                batch_sent, batch_failed = self.deliver(batch, options['max_attempts'])
+                sent += batch_sent
+                failed += batch_failed
+                continue
+
+            if not options['loop']:
+                break
+            time.sleep(options['interval'])
+
+        self.stdout.write(self.style.SUCCESS(f'✅ {sent} correos enviados, {failed} con error'))
+
+    def claim(self, batch_size):
+        """Reserva un lote de correos vencidos (otros workers saltan las filas bloqueadas)"""
+        now = timezone.now()
+        with transaction.atomic():
+            batch = list(
+                OutboxEmail.objects.select_for_update(skip_locked=True).filter(
+                    status='pending',
+                    next_attempt_at__lte=now
+                ).order_by('next_attempt_at')[:batch_size]
+            )
+            if batch:
+                OutboxEmail.objects.filter(pk__in=[email.pk for email in batch]).update(
+                    next_attempt_at=now + LEASE
+                )
+        return batch
+
+    def deliver(self, batch, max_attempts):
+        sent = failed = 0
+        # Una sola conexión SMTP para todo el lote
+        connection = get_connection()
+        try:
+            connection.open()
+        except Exception as exc:
+            for email in batch:
+                email.attempts += 1
+                self.schedule_retry(email, exc, max_attempts)
+            return 0, len(batch)
+
+        try:
+            for email in batch:
+                message = EmailMultiAlternatives(
+                    subject=email.subject,
+                    body=email.body,
+                    from_email=email.from_email,
+                    to=email.recipients,
+                    connection=connection,
+                )
+                if email.html_body:
+                    message.attach_alternative(email.html_body, 'text/html')
+
+                email.attempts += 1
+                try:
+                    message.send()
+                except Exception as exc:
+                    failed += 1
+                    self.schedule_retry(email, exc, max_attempts)
+                    # La conexión puede haber quedado inutilizable; si no se puede
+                    # reabrir, cada send() siguiente intentará abrir la suya
+                    connection.close()
+                    try:
+                        connection.open()
+                    except Exception:
+                        pass
+                    continue
+
+                sent += 1
+                email.status = 'sent'
+                email.sent_at = timezone.now()
+                email.last_error = ''
+                email.save(update_fields=['status', 'attempts', 'sent_at', 'last_error'])
+        finally:
+            connection.close()
+        return sent, failed
+
+    def schedule_retry(self, email, exc, max_attempts):
+        email.last_error = f'{type(exc).__name__}: {exc}'
+        if email.attempts >= max_attempts:
+            email.status = 'failed'
+            self.stdout.write(self.style.ERROR(f'Correo {email.pk} descartado: {email.last_error}'))
+        else:
+            delay = min(BACKOFF_BASE_SECONDS * 2 ** (email.attempts - 1), BACKOFF_MAX_SECONDS)
+            email.next_attempt_at = timezone.now() + timedelta(seconds=delay)
+            self.stdout.write(self.style.WARNING(
+                f'Correo {email.pk} reintenta en {delay}s: {email.last_error}'
+            ))
+        email.save(update_fields=['status', 'attempts', 'next_attempt_at', 'last_error'])
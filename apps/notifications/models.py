@@ -0,0 +1,43 @@
+# apps/notifications/models.py
+
+from django.db import models
+from django.utils import timezone
+
+
+class OutboxEmail(models.Model):
+    """
+    Correo pendiente de envío (patrón outbox).
+    Las vistas solo insertan filas; el comando send_outbox las envía.
+    """
+    STATUS_CHOICES = [
+        ('pending', 'Pendiente'),
+        ('sent', 'Enviado'),
+        ('failed', 'Fallido'),
+    ]
+
+    subject = models.CharField(max_length=255)
+    body = models.TextField()
+    html_body = models.TextField(blank=True)
+    from_email = models.CharField(max_length=254)
+    recipients = models.JSONField(default=list)  # Lista de direcciones
+
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='pending')
+    attempts = models.PositiveSmallIntegerField(default=0)
+    # Próximo intento (reintentos con backoff y reserva del worker que lo tomó)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    last_error = models.TextField(blank=True)
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        db_table = 'email_outbox'
+        ordering = ['created_at']
+        indexes = [
+            models.Index(fields=['status', 'next_attempt_at'], name='outbox_due_idx'),
+        ]
+        verbose_name = 'Correo en cola'
+        verbose_name_plural = 'Correos en cola'
+
+    def __str__(self):
+        return f"{self.subject} -> {', '.join(self.recipients)} ({self.get_status_display()})"
@@ -0,0 +1,18 @@
+# apps/notifications/outbox.py
+
+from django.conf import settings
+from .models import OutboxEmail
+
+
+def enqueue_email(subject, body, recipients, html_body='', from_email=None):
+    """
+    Encola un correo para el worker (send_outbox).
+    Se inserta en la transacción del llamador: si esta se revierte, no se envía nada.
+    """
+    return OutboxEmail.objects.create(
+        subject=subject,
+        body=body,
+        html_body=html_body,
+        from_email=from_email or settings.DEFAULT_FROM_EMAIL,
+        recipients=list(recipients),
+    )
@@ -0,0 +1,106 @@
+# apps/notifications/tests.py
+
+import io
+from datetime import timedelta
+from unittest import mock
+from django.contrib.auth import get_user_model
+from django.core import mail
+from django.core.mail import EmailMultiAlternatives
+from django.core.management import call_command
+from django.test import TestCase
+from django.utils import timezone
+from rest_framework.test import APIClient
+from .management.commands.send_outbox import BACKOFF_BASE_SECONDS, LEASE
+from .models import OutboxEmail
+from .outbox import enqueue_email
+
+User = get_user_model()
+
+
+def send_outbox(**options):
+    out = io.StringIO()
+    call_command('send_outbox', stdout=out, **options)
+    return out.getvalue()
+
+
+class PasswordResetOutboxTests(TestCase):
+    def test_request_only_enqueues(self):
+        User.objects.create_user(email='ana@example.com', first_name='Ana', last_name='Paz')
+        response = APIClient().post('/api/auth/password-reset/', {'email': 'ana@example.com'}, format='json')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(mail.outbox, [])
+        email = OutboxEmail.objects.get()
+        self.assertEqual((email.status, email.recipients), ('pending', ['ana@example.com']))
+        self.assertTrue(email.html_body)
+
+
+class SendOutboxTests(TestCase):
+    def enqueue(self, count):
+        return [
+            enqueue_email(f'Asunto {i}', 'Cuerpo', [f'u{i}@example.com'], html_body='<p>Cuerpo</p>')
+            for i in range(count)
+        ]
+
+    def test_delivers_every_batch(self):
+        self.enqueue(5)
+        output = send_outbox(batch_size=2)
+
+        self.assertIn('✅ 5 correos enviados, 0 con error', output)
+        self.assertEqual(sorted(message.subject for message in mail.outbox), [f'Asunto {i}' for i in range(5)])
+        self.assertEqual(mail.outbox[0].alternatives[0][1], 'text/html')
+        self.assertFalse(OutboxEmail.objects.exclude(status='sent').exists())
+
+    def test_reuses_one_connection_per_batch(self):
+        self.enqueue(3)
+        with mock.patch('django.core.mail.backends.locmem.EmailBackend.open') as open_connection:
+            send_outbox(batch_size=10)
+        self.assertEqual(open_connection.call_count, 1)
+
+    def test_skips_emails_not_yet_due(self):
+        email, = self.enqueue(1)
+        OutboxEmail.objects.filter(pk=email.pk).update(next_attempt_at=timezone.now() + LEASE)
+        send_outbox()
+        self.assertEqual(mail.outbox, [])
+
+    def test_failed_send_is_retried_with_backoff(self):
+        failing, ok = self.enqueue(2)
+        original_send = EmailMultiAlternatives.send
+
+        def send(message, *args, **kwargs):
+            if message.subject == failing.subject:
+                raise OSError('SMTP caído')
+            return original_send(message, *args, **kwargs)
+
+        with mock.patch.object(EmailMultiAlternatives, 'send', send):
+            output = send_outbox()
+
+        self.assertIn('✅ 1 correos enviados, 1 con error', output)
+        failing.refresh_from_db()
+        self.assertEqual((failing.status, failing.attempts), ('pending', 1))
+        self.assertIn('SMTP caído', failing.last_error)
+        # La reserva del lote se reemplaza por el backoff
+        delay = failing.next_attempt_at - timezone.now()
+        self.assertLessEqual(delay, timedelta(seconds=BACKOFF_BASE_SECONDS))
+        self.assertGreater(delay, timedelta(seconds=BACKOFF_BASE_SECONDS - 10))
+
+        # Vencido el backoff se reenvía
+        OutboxEmail.objects.filter(pk=failing.pk).update(next_attempt_at=timezone.now())
+        send_outbox()
+        failing.refresh_from_db()
+        self.assertEqual((failing.status, failing.attempts), ('sent', 2))
+        self.assertEqual(len(mail.outbox), 2)
+
+    def test_connection_error_releases_batch_and_gives_up_after_max_attempts(self):
+        email, = self.enqueue(1)
+        with mock.patch('django.core.mail.backends.locmem.EmailBackend.open', side_effect=OSError('sin red')):
+            send_outbox(max_attempts=2)
+            email.refresh_from_db()
+            self.assertEqual((email.status, email.attempts), ('pending', 1))
+            self.assertLess(email.next_attempt_at, timezone.now() + LEASE)
+
+            OutboxEmail.objects.filter(pk=email.pk).update(next_attempt_at=timezone.now())
+            send_outbox(max_attempts=2)
+        email.refresh_from_db()
+        self.assertEqual((email.status, email.attempts), ('failed', 2))
+        self.assertEqual(mail.outbox, [])
@@ -0,0 +1,67 @@
+# apps/professionals/catalog.py
+
+import threading
+import time
+from django.conf import settings
+from .models import CatalogVersion, Specialization
+from .serializers import SpecializationSerializer
+
+# Catálogo de especialidades en memoria de cada worker (~10 filas que casi no cambian).
+# Cada worker consulta la fila de versión como máximo cada CHECK_INTERVAL segundos;
+# si otro worker modificó el catálogo, la versión cambió y se recarga.
+SPECIALIZATIONS_CATALOG = 'specializations'
+CHECK_INTERVAL = getattr(settings, 'CATALOG_VERSION_CHECK_SECONDS', 5)
+
+
+class SpecializationCatalogue:
+    """Copia inmutable del catálogo para una versión dada"""
+
+    def __init__(self, version, items):
+        self.version = version
+        self.items = tuple(items)  # datos de SpecializationSerializer
+        self._names = tuple((item['id'], item['name'].lower()) for item in self.items)
+
+    def resolve_ids(self, term):
+        """Equivalente en memoria de specializations__name__icontains"""
+        term = term.lower()
+        return [pk for pk, name in self._names if term in name]
+
+
+_lock = threading.Lock()
+_catalogue = None
+_checked_at = 0.0
+
+
+def _current_version():
+    return CatalogVersion.objects.filter(
+        name=SPECIALIZATIONS_CATALOG
+    ).values_list('version', flat=True).first() or 0
+
+
+def get_specialization_catalogue():
+    global _catalogue, _checked_at
+
+    catalogue = _catalogue
+    now = time.monotonic()
+    if catalogue is not None and now - _checked_at < CHECK_INTERVAL:
+        return catalogue
+
+    version = _current_version()
+    if catalogue is None or catalogue.version != version:
+        catalogue = SpecializationCatalogue(
+            version,
+            SpecializationSerializer(Specialization.objects.all(), many=True).data
+        )
+
+    with _lock:
+        _catalogue = catalogue
+        _checked_at = now
+    return catalogue
+
+
+def invalidate_specialization_catalogue():
+    """Sube la versión en BD (otros workers) y descarta la copia local"""
+    global _catalogue
+    CatalogVersion.bump(SPECIALIZATIONS_CATALOG)
+    with _lock:
+        _catalogue = None
@@ -0,0 +1,90 @@
+# apps/professionals/fast_serializers.py
+
+import functools
+from apps.appointments.schedule import get_templates
+from apps.users.pictures import thumbnail_urls
+from .catalog import get_specialization_catalogue
+from .models import ProfessionalProfile, Specialization
+from .serializers import ProfessionalPublicSerializer, SpecializationSerializer
+
+# Directorio de profesionales desde filas de values_list(): misma salida que
+# ProfessionalPublicSerializer(many=True) sin instancias ni campos de DRF por
+# fila. Las especialidades salen del catálogo en memoria (catalog.py); de la
+# BD solo se leen los pares perfil/especialidad de la tabla intermedia.
+
+DIRECTORY_COLUMNS = (
+    'id', 'user_id', 'user__first_name', 'user__last_name', 'bio', 'education',
+    'experience_years', 'consultation_fee', 'session_duration',
+    'accepts_online_sessions', 'accepts_in_person_sessions', 'city', 'state',
+    'average_rating', 'total_reviews', 'user__profile_picture',
+)
+
+ProfileSpecializations = ProfessionalProfile.specializations.through
+
+
+@functools.cache
+def _directory_fields():
+    fields = ProfessionalPublicSerializer().fields
+    return fields['consultation_fee'].to_representation, fields['average_rating'].to_representation
+
+
+def _specializations_by_profile(profile_ids):
+    """{perfil: [datos de SpecializationSerializer]} con una consulta a la tabla intermedia"""
+    pairs = list(
+        ProfileSpecializations.objects.filter(
+            professionalprofile_id__in=profile_ids
+        ).order_by('specialization_id').values_list('professionalprofile_id', 'specialization_id')
+    )
+    catalogue = {item['id']: item for item in get_specialization_catalogue().items}
+    missing = {specialization_id for _, specialization_id in pairs} - catalogue.keys()
+    if missing:
+        # Especialidad creada después de la última recarga del catálogo
+        for item in SpecializationSerializer(Specialization.objects.filter(id__in=missing), many=True).data:
+            catalogue[item['id']] = item
+
+    by_profile = {}
+    for profile_id, specialization_id in pairs:
+        by_profile.setdefault(profile_id, []).append(dict(catalogue[specialization_id]))
+    return by_profile
+
+
+def serialize_directory(queryset, request=None):
+    """
+    Misma salida que ProfessionalPublicSerializer(many=True).data
+    (con context['request'] si se pasa request).
+    """
+    decimal, rating = _directory_fields()
+    rows = list(queryset.values_list(*DIRECTORY_COLUMNS))
+    specializations = _specializations_by_profile([row[0] for row in rows])
+    schedule_templates = get_templates(row[1] for row in rows)
+
+    data = []
+    for (
+        pk, user_id, first_name, last_name, bio, education,
+        experience_years, fee, session_duration,
+        accepts_online, accepts_in_person, city, state,
+        average_rating, total_reviews, picture,
+    ) in rows:
+        thumbnails = thumbnail_urls(picture or None)
+        if thumbnails and request is not None:
+            thumbnails = {size: request.build_absolute_uri(url) for size, url in thumbnails.items()}
+        data.append({
+            'id': pk,
+            'user_id': user_id,
+            'full_name': f"{first_name} {last_name}".strip(),
+            'bio': bio,
+            'education': education,
+            'experience_years': experience_years,
+            'consultation_fee': decimal(fee),
+            'session_duration': session_duration,
+            'accepts_online_sessions': accepts_online,
+            'accepts_in_person_sessions': accepts_in_person,
+            'city': city,
+            'state': state,
+            'average_rating': rating(average_rating),
+            'total_reviews': total_reviews,
+            'specializations': specializations.get(pk, []),
+            'working_hours': schedule_templates[user_id].working_hours_data(),
+            'profile_picture_thumbnails': thumbnails,
+        })
+    return data
@@ -0,0 +1,81 @@
+# apps/professionals/geo.py
+
+import math
+import numpy as np
+
+# Búsqueda por proximidad de consultorios.
+# La BD filtra candidatos por celdas de una grilla fija y por bounding box (índices);
+# la distancia exacta (haversine) se calcula vectorizada con NumPy solo sobre esos candidatos.
+EARTH_RADIUS_KM = 6371.0088
+GRID_CELL_DEGREES = 0.1  # ~11 km de lado en latitud
+GRID_COLUMNS = int(round(360 / GRID_CELL_DEGREES))
+MAX_CELLS_PER_QUERY = 400  # por encima de esto basta con el bounding box
+
+
+def grid_cell(latitude, longitude):
+    """Celda de la grilla que contiene el punto (entero indexable)"""
+    row = int(math.floor((float(latitude) + 90) / GRID_CELL_DEGREES))
+    column = int(math.floor((float(longitude) + 180) / GRID_CELL_DEGREES)) % GRID_COLUMNS
+    return row * GRID_COLUMNS + column
+
+
+def bounding_box(latitude, longitude, radius_km):
+    """(min_lat, max_lat, min_lng, max_lng) que contiene el círculo de búsqueda"""
+    delta_lat = math.degrees(radius_km / EARTH_RADIUS_KM)
+    cos_lat = max(math.cos(math.radians(latitude)), 1e-6)
+    delta_lng = min(math.degrees(radius_km / (EARTH_RADIUS_KM * cos_lat)), 180)
+    return (
+        max(latitude - delta_lat, -90),
+        min(latitude + delta_lat, 90),
+        longitude - delta_lng,
+        longitude + delta_lng,
+    )
+
+
+def cells_in_box(min_lat, max_lat, min_lng, max_lng):
+    """Celdas que cubren el bounding box, o None si son demasiadas"""
+    first_row = int(math.floor((min_lat + 90) / GRID_CELL_DEGREES))
+    last_row = int(math.floor((max_lat + 90) / GRID_CELL_DEGREES))
+    first_column = int(math.floor((min_lng + 180) / GRID_CELL_DEGREES))
+    last_column = int(math.floor((max_lng + 180) / GRID_CELL_DEGREES))
+
+    rows = last_row - first_row + 1
+    columns = last_column - first_column + 1
+    if rows * columns > MAX_CELLS_PER_QUERY:
+        return None
+
+    return [
+        row * GRID_COLUMNS + column % GRID_COLUMNS
+        for row in range(first_row, last_row + 1)
+        for column in range(first_column, last_column + 1)
+    ]
+
+
+def haversine_km(latitude, longitude, latitudes, longitudes):
+    """Distancias en km desde un punto a arreglos de puntos (vectorizado)"""
+    lat1 = math.radians(latitude)
+    lng1 = math.radians(longitude)
+    lat2 = np.radians(latitudes)
+    lng2 = np.radians(longitudes)
+
+    a = (
+        np.sin((lat2 - lat1) / 2) ** 2 +
+        math.cos(lat1) * np.cos(lat2) * np.sin((lng2 - lng1) / 2) ** 2
+    )
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.clip(a, 0, 1)))
+
+
+def rank_by_distance(latitude, longitude, candidates, radius_km, limit):
+    """
+    candidates: lista de (id, lat, lng).
+    Devuelve ([(id, distancia_km)] ordenados por cercanía, total dentro del radio).
+    """
+    if not candidates:
+        return [], 0
+
+    data = np.asarray(candidates, dtype=np.float64)
+    distances = haversine_km(latitude, longitude, data[:, 1], data[:, 2])
+
+    inside = np.flatnonzero(distances <= radius_km)
+    order = inside[np.argsort(distances[inside], kind='stable')][:limit]
+    return [(int(data[i, 0]), float(distances[i])) for i in order], len(inside)
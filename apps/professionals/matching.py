@@ -0,0 +1,288 @@
+# apps/professionals/matching.py
+
+import threading
+import time
+from datetime import timedelta
+import numpy as np
+from django.conf import settings
+from django.utils import timezone
+from .catalog import get_specialization_catalogue
+from .models import DeletedProfessionalProfile, ProfessionalProfile
+
+# Ranking paciente–psicólogo sobre una matriz de características en memoria.
+# La matriz se construye una vez por worker y se actualiza de forma incremental
+# con los perfiles cuyo updated_at cambió y las marcas de perfiles borrados
+# (DeletedProfessionalProfile); el puntaje se calcula vectorizado
+# con NumPy sobre todas las filas. El próximo slot libre se calcula solo para
+# la preselección (shortlist) y se reutiliza durante SLOT_TTL segundos.
+WEIGHTS = {
+    'specializations': 0.40,
+    'rating': 0.20,
+    'fee': 0.15,
+    'next_slot': 0.25,
+}
+REFRESH_INTERVAL = getattr(settings, 'MATCHING_REFRESH_SECONDS', 2)
+WATERMARK_OVERLAP = timedelta(seconds=60)  # transacciones que confirmaron tarde
+SLOT_TTL = getattr(settings, 'MATCHING_SLOT_TTL_SECONDS', 60)
+SLOT_HORIZON_DAYS = 14
+SLOT_HALF_LIFE_HOURS = 72.0
+SHORTLIST_FACTOR = 5
+MIN_SHORTLIST = 100
+BATCH_SIZE = 1000
+
+PROFILE_FIELDS = (
+    'id', 'user_id', 'consultation_fee', 'average_rating',
+    'accepts_online_sessions', 'accepts_in_person_sessions',
+    'is_active', 'profile_completed', 'user__is_active', 'updated_at',
+)
+
+
+# Arreglos con una fila por perfil (se compactan al quitar perfiles borrados)
+ROW_ARRAYS = (
+    'profile_ids', 'user_ids', 'fee', 'rating', 'online', 'in_person',
+    'active', 'specializations', 'next_slot', 'slot_checked_at',
+)
+
+
+class MatchingIndex:
+    """
+    Matriz de características de todos los perfiles, una por worker.
+    Las consultas a la BD (actualización y próximos slots) se hacen fuera de
+    _lock; el lock solo protege la lectura y el reemplazo de los arreglos.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._refresh_lock = threading.Lock()
+        self.catalogue_version = None
+        self.watermark = None
+        self.deleted_watermark = None
+        self.checked_at = 0.0
+        self.size = 0
+        self.row_of = {}
+        self.columns = {}
+        self._allocate(0, 0)
+
+    def _allocate(self, rows, columns):
+        self.profile_ids = np.zeros(rows, dtype=np.int64)
+        self.user_ids = np.zeros(rows, dtype=np.int64)
+        self.fee = np.zeros(rows, dtype=np.float64)
+        self.rating = np.zeros(rows, dtype=np.float64)
+        self.online = np.zeros(rows, dtype=bool)
+        self.in_person = np.zeros(rows, dtype=bool)
+        self.active = np.zeros(rows, dtype=bool)
+        self.specializations = np.zeros((rows, columns), dtype=bool)
+        # Horas (epoch) del próximo slot libre; inf = sin slot en el horizonte
+        self.next_slot = np.full(rows, np.nan, dtype=np.float64)
+        self.slot_checked_at = np.zeros(rows, dtype=np.float64)
+
+    def _grow(self, rows):
+        capacity = len(self.profile_ids)
+        if rows <= capacity:
+            return
+        new_capacity = max(rows, capacity * 2, 64)
+        for name in ROW_ARRAYS:
+            array = getattr(self, name)
+            grown = np.zeros((new_capacity,) + array.shape[1:], dtype=array.dtype)
+            grown[:capacity] = array
+            setattr(self, name, grown)
+
+    # --- Actualización -------------------------------------------------
+
+    def refresh(self):
+        now = time.monotonic()
+        if now - self.checked_at < REFRESH_INTERVAL:
+            return
+
+        # Un solo hilo actualiza; los demás siguen rankeando con la matriz
+        # actual, salvo la primera vez, cuando todavía no hay matriz
+        if not self._refresh_lock.acquire(blocking=self.catalogue_version is None):
+            return
+        try:
+            if time.monotonic() - self.checked_at < REFRESH_INTERVAL:
+                return  # otro hilo actualizó mientras se esperaba
+
+            catalogue = get_specialization_catalogue()
+            rebuild = catalogue.version != self.catalogue_version
+            started_at = timezone.now()
+            changed = ProfessionalProfile.objects.all()
+            if not rebuild and self.watermark is not None:
+                changed = changed.filter(updated_at__gt=self.watermark - WATERMARK_OVERLAP)
+            rows = list(changed.values_list(*PROFILE_FIELDS))
+            pairs = self._specialization_pairs([row[0] for row in rows])
+            if rebuild:
+                # La carga completa no trae perfiles borrados: las marcas
+                # cuentan desde que empezó
+                deleted = [(None, started_at)]
+            else:
+                deleted = list(DeletedProfessionalProfile.objects.filter(
+                    deleted_at__gt=self.deleted_watermark - WATERMARK_OVERLAP
+                ).values_list('profile_id', 'deleted_at'))
+
+            with self._lock:
+                if rebuild:
+                    self._reset(catalogue)
+                self._apply(rows, pairs)
+                self._prune(deleted)
+            self.checked_at = now
+        finally:
+            self._refresh_lock.release()
+
+    def _reset(self, catalogue):
+        self.catalogue_version = catalogue.version
+        self.columns = {item['id']: column for column, item in enumerate(catalogue.items)}
+        self.row_of = {}
+        self.size = 0
+        self.watermark = None
+        self.deleted_watermark = None
+        self._allocate(0, len(self.columns))
+
+    def _specialization_pairs(self, profile_ids):
+        through = ProfessionalProfile.specializations.through.objects
+        pairs = []
+        for offset in range(0, len(profile_ids), BATCH_SIZE):
+            pairs.extend(through.filter(
+                professionalprofile_id__in=profile_ids[offset:offset + BATCH_SIZE]
+            ).values_list('professionalprofile_id', 'specialization_id'))
+        return pairs
+
+    def _apply(self, rows, pairs):
+        if not rows:
+            return
+
+        self._grow(self.size + len(rows))
+        touched = []
+        for (profile_id, user_id, fee, rating, online, in_person,
+             is_active, completed, user_active, updated_at) in rows:
+            row = self.row_of.get(profile_id)
+            if row is None:
+                row = self.size
+                self.row_of[profile_id] = row
+                self.size += 1
+            touched.append(row)
+
+            self.profile_ids[row] = profile_id
+            self.user_ids[row] = user_id
+            self.fee[row] = float(fee)
+            self.rating[row] = float(rating)
+            self.online[row] = online
+            self.in_person[row] = in_person
+            self.active[row] = is_active and completed and user_active
+            self.slot_checked_at[row] = 0.0
+            if self.watermark is None or updated_at > self.watermark:
+                self.watermark = updated_at
+
+        self.specializations[np.asarray(touched)] = False
+        for profile_id, specialization_id in pairs:
+            column = self.columns.get(specialization_id)
+            if column is not None:
+                self.specializations[self.row_of[profile_id], column] = True
+
+    def _prune(self, deleted):
+        """Quita las filas de los perfiles borrados [(profile_id, deleted_at)]"""
+        removed = set()
+        for profile_id, deleted_at in deleted:
+            if profile_id in self.row_of:
+                removed.add(profile_id)
+            if deleted_at is not None and (self.deleted_watermark is None or deleted_at > self.deleted_watermark):
+                self.deleted_watermark = deleted_at
+        if not removed:
+            return
+
+        size = self.size
+        keep = np.fromiter(
+            (int(profile_id) not in removed for profile_id in self.profile_ids[:size]),
+            dtype=bool, count=size
+        )
+        kept = int(keep.sum())
+        for name in ROW_ARRAYS:
+            array = getattr(self, name)
+            array[:kept] = array[:size][keep]
+        self.size = kept
+        self.row_of = {int(profile_id): row for row, profile_id in enumerate(self.profile_ids[:kept])}
+
+    def _next_slots(self, user_ids):
+        """Próximo slot libre (horas epoch, inf si no hay) de cada psicólogo; consulta la BD"""
+        from apps.appointments.schedule import next_free_slots
+
+        local_now = timezone.localtime().replace(tzinfo=None)
+        slots = next_free_slots(user_ids.tolist(), local_now, SLOT_HORIZON_DAYS)
+        return np.array([
+            np.inf if slots.get(int(user_id)) is None
+            else timezone.make_aware(slots[int(user_id)]).timestamp() / 3600
+            for user_id in user_ids
+        ], dtype=np.float64)
+
+    def _store_slots(self, profile_ids, next_slot, checked_at):
+        # Por id de perfil: una actualización concurrente pudo mover las filas
+        for profile_id, value in zip(profile_ids.tolist(), next_slot.tolist()):
+            row = self.row_of.get(profile_id)
+            if row is not None:
+                self.next_slot[row] = value
+                self.slot_checked_at[row] = checked_at
+
+    # --- Ranking -------------------------------------------------------
+
+    def rank(self, specialization_ids=(), max_fee=None, modality='any', limit=20):
+        """
+        Devuelve [(profile_id, puntaje, próximo_slot_epoch_horas)] ordenado por puntaje.
+        """
+        self.refresh()
+
+        with self._lock:
+            size = self.size
+            mask = self.active[:size].copy()
+            if max_fee is not None:
+                mask &= self.fee[:size] <= max_fee
+            if modality == 'online':
+                mask &= self.online[:size]
+            elif modality == 'in_person':
+                mask &= self.in_person[:size]
+
+            candidates = np.flatnonzero(mask)
+            if not len(candidates):
+                return []
+
+            columns = [self.columns[pk] for pk in specialization_ids if pk in self.columns]
+            if columns:
+                overlap = self.specializations[candidates][:, columns].sum(axis=1) / len(columns)
+            else:
+                overlap = np.ones(len(candidates))
+
+            fee = self.fee[candidates]
+            fee_ceiling = max_fee if max_fee else max(fee.max(), 1.0)
+            static_score = (
+                WEIGHTS['specializations'] * overlap +
+                WEIGHTS['rating'] * self.rating[candidates] / 5 +
+                WEIGHTS['fee'] * (1 - np.clip(fee / fee_ceiling, 0, 1))
+            )
+
+            # Preselección por puntaje estático; el slot solo se calcula para ella
+            shortlist_size = min(len(candidates), max(limit * SHORTLIST_FACTOR, MIN_SHORTLIST))
+            top = np.argpartition(-static_score, shortlist_size - 1)[:shortlist_size]
+            shortlist = candidates[top]
+            static_score = static_score[top]
+            profile_ids = self.profile_ids[shortlist]
+            user_ids = self.user_ids[shortlist]
+            next_slot = self.next_slot[shortlist]
+            now = time.time()
+            stale = now - self.slot_checked_at[shortlist] > SLOT_TTL
+
+        # Slots vencidos fuera del lock: las consultas no frenan a otros requests
+        if stale.any():
+            next_slot[stale] = self._next_slots(user_ids[stale])
+            with self._lock:
+                self._store_slots(profile_ids[stale], next_slot[stale], now)
+
+        hours_until = np.maximum(next_slot - now / 3600, 0)
+        slot_score = np.exp2(-hours_until / SLOT_HALF_LIFE_HOURS)  # inf -> 0
+        score = static_score + WEIGHTS['next_slot'] * slot_score
+
+        order = np.argsort(-score, kind='stable')[:limit]
+        return [
+            (int(profile_ids[i]), float(score[i]), float(next_slot[i]))
+            for i in order
+        ]
+
+
+matching_index = MatchingIndex()
@@ -0,0 +1,24 @@
+# Generated by Django 5.2.6 on 2026-10-19 01:35
+
+import django.core.validators
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('professionals', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='professionalprofile',
+            name='rating_sum',
+            field=models.PositiveIntegerField(default=0, help_text='Suma acumulada de calificaciones (para el promedio incremental)'),
+        ),
+        migrations.AlterField(
+            model_name='professionalprofile',
+            name='average_rating',
+            field=models.DecimalField(db_index=True, decimal_places=2, default=0.0, max_digits=3, validators=[django.core.validators.MinValueValidator(0), django.core.validators.MaxValueValidator(5)]),
+        ),
+    ]
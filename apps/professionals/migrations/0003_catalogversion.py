@@ -0,0 +1,26 @@
+# Generated by Django 5.2.6 on 2026-10-19 01:37
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('professionals', '0002_professionalprofile_rating_sum_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CatalogVersion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=50, unique=True)),
+                ('version', models.PositiveIntegerField(default=0)),
+            ],
+            options={
+                'verbose_name': 'Versión de catálogo',
+                'verbose_name_plural': 'Versiones de catálogos',
+                'db_table': 'catalog_versions',
+            },
+        ),
+    ]
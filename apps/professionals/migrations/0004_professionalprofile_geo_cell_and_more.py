@@ -0,0 +1,35 @@
+# Generated by Django 5.2.6 on 2026-10-19 01:38
+
+import django.core.validators
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('professionals', '0003_catalogversion'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='professionalprofile',
+            name='geo_cell',
+            field=models.IntegerField(blank=True, editable=False, help_text='Celda de la grilla geográfica (ver geo.py), calculada al guardar', null=True),
+        ),
+        migrations.AddField(
+            model_name='professionalprofile',
+            name='latitude',
+            field=models.DecimalField(blank=True, decimal_places=6, max_digits=9, null=True, validators=[django.core.validators.MinValueValidator(-90), django.core.validators.MaxValueValidator(90)]),
+        ),
+        migrations.AddField(
+            model_name='professionalprofile',
+            name='longitude',
+            field=models.DecimalField(blank=True, decimal_places=6, max_digits=9, null=True, validators=[django.core.validators.MinValueValidator(-180), django.core.validators.MaxValueValidator(180)]),
+        ),
+        migrations.AddIndex(
+            model_name='professionalprofile',
+            index=models.Index(fields=['geo_cell', 'latitude', 'longitude'], name='prof_geo_cell_idx'),
+        ),
+    ]
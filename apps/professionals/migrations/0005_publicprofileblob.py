@@ -0,0 +1,27 @@
+# Generated by Django 5.2.6 on 2026-10-19 02:46
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('professionals', '0004_professionalprofile_geo_cell_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PublicProfileBlob',
+            fields=[
+                ('profile', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='public_blob', serialize=False, to='professionals.professionalprofile')),
+                ('data', models.BinaryField()),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Perfil público pre-renderizado',
+                'verbose_name_plural': 'Perfiles públicos pre-renderizados',
+                'db_table': 'public_profile_blobs',
+            },
+        ),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 5.2.6 on 2026-10-19 03:11
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('professionals', '0005_publicprofileblob'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DeletedProfessionalProfile',
+            fields=[
+                ('profile_id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('deleted_at', models.DateTimeField(auto_now=True, db_index=True)),
+            ],
+            options={
+                'verbose_name': 'Perfil profesional borrado',
+                'verbose_name_plural': 'Perfiles profesionales borrados',
+                'db_table': 'deleted_professional_profiles',
+            },
+        ),
+    ]
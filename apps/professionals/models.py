@@ -1,8 +1,11 @@
 # apps/professionals/models.py
 
 from django.db import models
+from django.db.models import F, Value, DecimalField, FloatField
+from django.db.models.functions import Cast, Coalesce, NullIf, Now
 from django.contrib.auth import get_user_model
 from django.core.validators import MinValueValidator, MaxValueValidator
+from .geo import grid_cell
 
 User = get_user_model()
 
@@ -22,6 +25,29 @@ class Specialization(models.Model):
         return self.name
 
 
+class CatalogVersion(models.Model):
+    """
+    Versión de los catálogos que cada worker mantiene en memoria.
+    Se incrementa al modificar el catálogo para invalidar las copias locales.
+    """
+    name = models.CharField(max_length=50, unique=True)
+    version = models.PositiveIntegerField(default=0)
+    
+    class Meta:
+        db_table = 'catalog_versions'
+        verbose_name = 'Versión de catálogo'
+        verbose_name_plural = 'Versiones de catálogos'
+    
+    def __str__(self):
+        return f"{self.name} v{self.version}"
+    
+    @classmethod
+    def bump(cls, name):
+        updated = cls.objects.filter(name=name).update(version=F('version') + 1)
+        if not updated:
+            cls.objects.get_or_create(name=name, defaults={'version': 1})
+
+
 class ProfessionalProfile(models.Model):
     """
     Perfil profesional para psicólogos
@@ -57,15 +83,40 @@ class ProfessionalProfile(models.Model):
     office_address = models.TextField(blank=True)
     city = models.CharField(max_length=50, blank=True)
     state = models.CharField(max_length=50, blank=True, default="La Paz")
+    latitude = models.DecimalField(
+        max_digits=9,
+        decimal_places=6,
+        null=True,
+        blank=True,
+        validators=[MinValueValidator(-90), MaxValueValidator(90)]
+    )
+    longitude = models.DecimalField(
+        max_digits=9,
+        decimal_places=6,
+        null=True,
+        blank=True,
+        validators=[MinValueValidator(-180), MaxValueValidator(180)]
+    )
+    geo_cell = models.IntegerField(
+        null=True,
+        blank=True,
+        editable=False,
+        help_text="Celda de la grilla geográfica (ver geo.py), calculada al guardar"
+    )
     
     # Calificaciones y reseñas
     average_rating = models.DecimalField(
         max_digits=3, 
         decimal_places=2, 
         default=0.00,
-        validators=[MinValueValidator(0), MaxValueValidator(5)]
+        validators=[MinValueValidator(0), MaxValueValidator(5)],
+        db_index=True
     )
     total_reviews = models.PositiveIntegerField(default=0)
+    rating_sum = models.PositiveIntegerField(
+        default=0,
+        help_text="Suma acumulada de calificaciones (para el promedio incremental)"
+    )
     
     # Estado del perfil
     is_verified = models.BooleanField(default=False)
@@ -79,9 +130,55 @@ class ProfessionalProfile(models.Model):
         db_table = 'professional_profiles'
         verbose_name = 'Perfil Profesional'
         verbose_name_plural = 'Perfiles Profesionales'
+        indexes = [
+            models.Index(fields=['geo_cell', 'latitude', 'longitude'], name='prof_geo_cell_idx'),
+        ]
     
     def __str__(self):
         return f"Dr. {self.user.get_full_name()}"
+    
+    def save(self, *args, **kwargs):
+        # Mantener la celda geográfica sincronizada con las coordenadas
+        if self.latitude is not None and self.longitude is not None:
+            self.geo_cell = grid_cell(self.latitude, self.longitude)
+        else:
+            self.geo_cell = None
+        
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None:
+            # auto_now solo se guarda si está en update_fields; el índice de
+            # matching usa updated_at como marca de cambios
+            update_fields = set(update_fields) | {'updated_at'}
+            if {'latitude', 'longitude'} & update_fields:
+                update_fields.add('geo_cell')
+            kwargs['update_fields'] = update_fields
+        
+        super().save(*args, **kwargs)
+
+    @classmethod
+    def apply_rating(cls, user_id, rating_delta, count_delta=1):
+        """
+        Actualiza suma, total y promedio de calificaciones en un solo UPDATE
+        atómico con expresiones F, sin recalcular el AVG sobre todas las reseñas.
+        Debe llamarse dentro de la misma transacción que crea/borra la reseña.
+        """
+        new_sum = F('rating_sum') + rating_delta
+        new_total = F('total_reviews') + count_delta
+        average = Coalesce(
+            Cast(new_sum, FloatField()) / NullIf(new_total, Value(0)),
+            Value(0.0)
+        )
+        updated = cls.objects.filter(user_id=user_id).update(
+            rating_sum=new_sum,
+            total_reviews=new_total,
+            average_rating=Cast(average, DecimalField(max_digits=3, decimal_places=2)),
+            updated_at=Now()
+        )
+
+        # update() no emite post_save: regenerar el perfil público a mano
+        from .public_profiles import schedule_rebuild_for_user
+        schedule_rebuild_for_user(user_id)
+        return updated
 
 
 class WorkingHours(models.Model):
@@ -115,4 +212,44 @@ class WorkingHours(models.Model):
         unique_together = ['professional', 'day_of_week']
     
     def __str__(self):
-        return f"{self.professional} - {self.get_day_of_week_display()}: {self.start_time} - {self.end_time}"
\ No newline at end of file
+        return f"{self.professional} - {self.get_day_of_week_display()}: {self.start_time} - {self.end_time}"
+
+class PublicProfileBlob(models.Model):
+    """
+    JSON pre-renderizado del perfil público (ver public_profiles.py).
+    Vive en la base de datos para que todos los workers sirvan la misma versión;
+    la caché solo lo guarda por PUBLIC_PROFILE_CACHE_SECONDS.
+    """
+    profile = models.OneToOneField(
+        ProfessionalProfile,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='public_blob'
+    )
+    data = models.BinaryField()
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        db_table = 'public_profile_blobs'
+        verbose_name = 'Perfil público pre-renderizado'
+        verbose_name_plural = 'Perfiles públicos pre-renderizados'
+    
+    def __str__(self):
+        return f"Perfil público {self.profile_id}"
+
+
+class DeletedProfessionalProfile(models.Model):
+    """
+    Marca de un perfil borrado, para que el índice de matching de cada worker
+    (matching.py) quite la fila sin recorrer todos los perfiles.
+    """
+    profile_id = models.BigIntegerField(primary_key=True)
+    deleted_at = models.DateTimeField(auto_now=True, db_index=True)
+    
+    class Meta:
+        db_table = 'deleted_professional_profiles'
+        verbose_name = 'Perfil profesional borrado'
+        verbose_name_plural = 'Perfiles profesionales borrados'
+    
+    def __str__(self):
+        return f"Perfil borrado {self.profile_id}"
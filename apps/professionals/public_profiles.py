@@ -0,0 +1,81 @@
+# apps/professionals/public_profiles.py
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from rest_framework.renderers import JSONRenderer
+from .models import ProfessionalProfile, PublicProfileBlob
+from .serializers import ProfessionalPublicSerializer
+from apps.appointments.schedule import compile_template
+from config.replicas import primary_reads
+
+# JSON pre-renderizado de cada perfil público (CU-09).
+# La copia de referencia está en la tabla public_profile_blobs, compartida por
+# todos los workers; la caché (que puede ser local a cada proceso) solo la
+# guarda por PUBLIC_PROFILE_CACHE_SECONDS, así un cambio regenerado en otro
+# worker se ve como mucho tras ese tiempo.
+# Un valor vacío (b'') marca un perfil inexistente o no público,
+# para responder 404 sin tocar la base de datos.
+PUBLIC_PROFILE_KEY = 'professionals:public:{}'
+NOT_PUBLIC = b''
+CACHE_TIMEOUT = getattr(settings, 'PUBLIC_PROFILE_CACHE_SECONDS', 60)
+
+
+def _cache_key(profile_id):
+    return PUBLIC_PROFILE_KEY.format(profile_id)
+
+
+def public_profiles_queryset():
+    return ProfessionalProfile.objects.filter(
+        is_active=True,
+        profile_completed=True
+    ).select_related('user').prefetch_related('specializations')
+
+
+def rebuild_public_profile(profile_id):
+    """Regenera y guarda el JSON público de un perfil"""
+    # Desde la primaria: el JSON se guarda como la versión vigente
+    with primary_reads():
+        profile = public_profiles_queryset().filter(id=profile_id).first()
+    if profile is None:
+        blob = NOT_PUBLIC
+        PublicProfileBlob.objects.filter(profile_id=profile_id).delete()
+    else:
+        # Plantilla recién compilada: la invalidación de la caché de horarios
+        # puede ejecutarse después de esta regeneración en el mismo on_commit
+        serializer = ProfessionalPublicSerializer(
+            profile,
+            context={'schedule_templates': {profile.user_id: compile_template(profile.user_id)}}
+        )
+        blob = JSONRenderer().render(serializer.data)
+        PublicProfileBlob.objects.update_or_create(profile_id=profile_id, defaults={'data': blob})
+
+    cache.set(_cache_key(profile_id), blob, CACHE_TIMEOUT)
+    return blob
+
+
+def get_public_profile(profile_id):
+    """Bytes JSON del perfil público; b'' si no existe o no es público"""
+    blob = cache.get(_cache_key(profile_id))
+    if blob is not None:
+        return blob
+
+    # Una lectura por clave primaria; solo se regenera si todavía no hay fila
+    stored = PublicProfileBlob.objects.filter(profile_id=profile_id).values_list('data', flat=True).first()
+    if stored is None:
+        return rebuild_public_profile(profile_id)
+    blob = bytes(stored)
+    cache.set(_cache_key(profile_id), blob, CACHE_TIMEOUT)
+    return blob
+
+
+def schedule_rebuild(profile_ids):
+    """Regenera los perfiles indicados cuando la transacción actual confirme"""
+    for profile_id in set(profile_ids):
+        transaction.on_commit(lambda pk=profile_id: rebuild_public_profile(pk))
+
+
+def schedule_rebuild_for_user(user_id):
+    schedule_rebuild(
+        ProfessionalProfile.objects.filter(user_id=user_id).values_list('id', flat=True)
+    )
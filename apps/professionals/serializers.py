@@ -3,6 +3,8 @@
 from rest_framework import serializers
 from django.contrib.auth import get_user_model
 from .models import ProfessionalProfile, Specialization, WorkingHours
+from apps.appointments.schedule import get_template
+from apps.users.serializers import ProfilePictureThumbnailsField
 
 User = get_user_model()
 
@@ -18,11 +20,25 @@ class WorkingHoursSerializer(serializers.ModelSerializer):
         model = WorkingHours
         fields = ['id', 'day_of_week', 'day_name', 'start_time', 'end_time', 'is_active']
 
-class ProfessionalProfileSerializer(serializers.ModelSerializer):
+class ScheduleTemplateMixin:
+    """
+    working_hours se lee de la plantilla semanal compilada (apps/appointments/schedule.py).
+    Las vistas de listado pueden pasar context['schedule_templates'] = get_templates(...)
+    para resolver todas las plantillas en una sola lectura de caché.
+    """
+    def get_working_hours(self, obj):
+        template = self.context.get('schedule_templates', {}).get(obj.user_id)
+        if template is None:
+            template = get_template(obj.user_id)
+        return template.working_hours_data()
+
+
+class ProfessionalProfileSerializer(ScheduleTemplateMixin, serializers.ModelSerializer):
     specializations = SpecializationSerializer(many=True, read_only=True)
-    working_hours = WorkingHoursSerializer(many=True, read_only=True)
+    working_hours = serializers.SerializerMethodField()
     full_name = serializers.CharField(source='user.get_full_name', read_only=True)
     email = serializers.CharField(source='user.email', read_only=True)
+    profile_picture_thumbnails = ProfilePictureThumbnailsField(source='user.profile_picture')
     
     class Meta:
         model = ProfessionalProfile
@@ -31,8 +47,9 @@ class ProfessionalProfileSerializer(serializers.ModelSerializer):
             'education', 'experience_years', 'consultation_fee',
             'session_duration', 'accepts_online_sessions', 
             'accepts_in_person_sessions', 'office_address', 'city', 
-            'state', 'average_rating', 'total_reviews', 'is_verified',
-            'profile_completed', 'specializations', 'working_hours'
+            'state', 'latitude', 'longitude', 'average_rating', 'total_reviews', 'is_verified',
+            'profile_completed', 'specializations', 'working_hours',
+            'profile_picture_thumbnails'
         ]
         read_only_fields = ['average_rating', 'total_reviews', 'is_verified', 'profile_completed']
 
@@ -49,9 +66,19 @@ class ProfessionalProfileUpdateSerializer(serializers.ModelSerializer):
             'license_number', 'bio', 'education', 'experience_years',
             'consultation_fee', 'session_duration', 'accepts_online_sessions',
             'accepts_in_person_sessions', 'office_address', 'city', 'state',
-            'specialization_ids'
+            'latitude', 'longitude', 'specialization_ids'
         ]
     
+    def validate(self, attrs):
+        # Las coordenadas se envían juntas (o ninguna)
+        latitude = attrs.get('latitude', getattr(self.instance, 'latitude', None))
+        longitude = attrs.get('longitude', getattr(self.instance, 'longitude', None))
+        if (latitude is None) != (longitude is None):
+            raise serializers.ValidationError(
+                "Debe indicar latitud y longitud juntas"
+            )
+        return attrs
+    
     def create(self, validated_data):
         specialization_ids = validated_data.pop('specialization_ids', [])
         
@@ -91,12 +118,13 @@ class ProfessionalProfileUpdateSerializer(serializers.ModelSerializer):
 
 # apps/professionals/serializers.py
 
-class ProfessionalPublicSerializer(serializers.ModelSerializer):
+class ProfessionalPublicSerializer(ScheduleTemplateMixin, serializers.ModelSerializer):
     """Serializer para vista pública (sin datos sensibles)"""
     specializations = SpecializationSerializer(many=True, read_only=True)
-    working_hours = WorkingHoursSerializer(many=True, read_only=True)
+    working_hours = serializers.SerializerMethodField()
     full_name = serializers.CharField(source='user.get_full_name', read_only=True)
     user_id = serializers.ReadOnlyField(source='user.id') # <--- 1. AÑADE ESTA LÍNEA
+    profile_picture_thumbnails = ProfilePictureThumbnailsField(source='user.profile_picture')
 
     class Meta:
         model = ProfessionalProfile
@@ -104,5 +132,6 @@ class ProfessionalPublicSerializer(serializers.ModelSerializer):
             'id', 'user_id', 'full_name', 'bio', 'education', 'experience_years', # <-- 2. AÑADE 'user_id' AQUÍ
             'consultation_fee', 'session_duration', 'accepts_online_sessions',
             'accepts_in_person_sessions', 'city', 'state', 'average_rating',
-            'total_reviews', 'specializations', 'working_hours'
+            'total_reviews', 'specializations', 'working_hours',
+            'profile_picture_thumbnails'
         ]
\ No newline at end of file
@@ -0,0 +1,108 @@
+# apps/professionals/signals.py
+
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models.functions import Now
+from django.db.models.signals import post_save, pre_delete, post_delete, m2m_changed
+from django.dispatch import receiver
+from config.cache_tags import bump_tags_on_commit
+from .models import DeletedProfessionalProfile, ProfessionalProfile, Specialization, WorkingHours
+from .catalog import invalidate_specialization_catalogue
+from .public_profiles import schedule_rebuild, schedule_rebuild_for_user
+
+User = get_user_model()
+
+# Campos del usuario que aparecen en el perfil público (nombre y miniaturas)
+PUBLIC_USER_FIELDS = {'first_name', 'last_name', 'profile_picture'}
+
+# Campos del usuario que aparecen en respuestas cacheadas con la etiqueta 'users'
+# (nombres en reseñas, historiales y directorio, miniaturas del directorio)
+DISPLAY_USER_FIELDS = PUBLIC_USER_FIELDS | {'email'}
+
+
+@receiver(post_save, sender=ProfessionalProfile)
+@receiver(post_delete, sender=ProfessionalProfile)
+def profile_changed(sender, instance, **kwargs):
+    schedule_rebuild([instance.id])
+    bump_tags_on_commit(f'profile:{instance.id}', 'professionals')
+
+
+@receiver(post_delete, sender=ProfessionalProfile)
+def profile_deleted(sender, instance, **kwargs):
+    # Marca para el índice de matching; también llega con el borrado en cascada del usuario
+    DeletedProfessionalProfile.objects.update_or_create(profile_id=instance.id)
+
+
+@receiver(m2m_changed, sender=ProfessionalProfile.specializations.through)
+def profile_specializations_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+
+    if not reverse:
+        profile_ids = [instance.id]
+    elif pk_set:
+        # specialization.professionalprofile_set.add(...)
+        profile_ids = list(pk_set)
+    else:
+        return
+
+    # El M2M no toca updated_at; el índice de matching lo usa como marca de cambios
+    ProfessionalProfile.objects.filter(pk__in=profile_ids).update(updated_at=Now())
+    schedule_rebuild(profile_ids)
+    bump_tags_on_commit(*(f'profile:{profile_id}' for profile_id in profile_ids), 'professionals')
+
+
+@receiver(post_save, sender=Specialization)
+@receiver(pre_delete, sender=Specialization)
+def specialization_changed(sender, instance, created=False, **kwargs):
+    # pre_delete: las filas M2M se borran en cascada sin emitir m2m_changed
+    if created:
+        return
+    schedule_rebuild(
+        instance.professionalprofile_set.values_list('id', flat=True)
+    )
+
+
+@receiver(post_save, sender=Specialization)
+@receiver(post_delete, sender=Specialization)
+def specialization_catalogue_changed(sender, **kwargs):
+    transaction.on_commit(invalidate_specialization_catalogue)
+    bump_tags_on_commit('specializations')
+
+
+@receiver(post_save, sender=WorkingHours)
+@receiver(post_delete, sender=WorkingHours)
+def working_hours_changed(sender, instance, **kwargs):
+    schedule_rebuild([instance.professional_id])
+    bump_tags_on_commit(f'profile:{instance.professional_id}', 'professionals')
+
+
+@receiver(post_save, sender=User)
+def user_name_changed(sender, instance, created, update_fields=None, **kwargs):
+    if created or instance.user_type != 'professional':
+        return
+    # Ej. el login solo actualiza last_login
+    if update_fields is not None and not PUBLIC_USER_FIELDS & set(update_fields):
+        return
+    schedule_rebuild_for_user(instance.id)
+
+
+@receiver(post_save, sender=User)
+def user_activation_changed(sender, instance, created, update_fields=None, **kwargs):
+    if created or instance.user_type != 'professional':
+        return
+    if update_fields is not None and 'is_active' not in update_fields:
+        return
+    # El índice de matching ve los perfiles por updated_at
+    ProfessionalProfile.objects.filter(user_id=instance.id).update(updated_at=Now())
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def user_display_changed(sender, instance, created=False, update_fields=None, **kwargs):
+    if created:
+        return
+    if update_fields is not None and not DISPLAY_USER_FIELDS & set(update_fields):
+        return
+    # Cambios de nombre son raros: una sola etiqueta para todo lo que muestra usuarios
+    bump_tags_on_commit('users')
@@ -1,3 +1,250 @@
+# apps/professionals/tests.py
+
+import json
+from decimal import Decimal
+from unittest import mock
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+from . import catalog, public_profiles
+from .geo import grid_cell, haversine_km
+from .matching import MatchingIndex
+from .models import CatalogVersion, ProfessionalProfile, PublicProfileBlob, Specialization
+
+User = get_user_model()
+
+
+def create_professional(email='psico@example.com', first_name='Ana', **profile_fields):
+    user = User.objects.create_user(
+        email=email, first_name=first_name, last_name='Paz', user_type='professional'
+    )
+    fields = {
+        'license_number': f'LIC-{email}',
+        'bio': 'Bio',
+        'education': 'Psicología',
+        'experience_years': 5,
+        'consultation_fee': Decimal('150.00'),
+        'profile_completed': True,
+    }
+    fields.update(profile_fields)
+    return ProfessionalProfile.objects.create(user=user, **fields)
+
+
+class PublicProfileBlobTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.profile = create_professional()
+
+    def url(self, profile_id=None):
+        return f'/api/professionals/{profile_id or self.profile.id}/'
+
+    def test_blob_is_stored_in_database(self):
+        blob = PublicProfileBlob.objects.get(profile=self.profile)
+        self.assertEqual(json.loads(bytes(blob.data))['id'], self.profile.id)
+
+    def test_other_worker_reads_blob_from_database_without_rebuilding(self):
+        cache.clear()  # caché local de otro worker, vacía
+        with mock.patch.object(public_profiles, 'rebuild_public_profile') as rebuild:
+            with self.assertNumQueries(1):
+                response = APIClient().get(self.url())
+        rebuild.assert_not_called()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['bio'], 'Bio')
+
+    def test_edit_is_visible_once_local_cache_expires(self):
+        APIClient().get(self.url())
+        with self.captureOnCommitCallbacks(execute=True):
+            self.profile.bio = 'Nueva bio'
+            self.profile.save()
+
+        cache.clear()  # expira la copia de otro worker
+        self.assertEqual(APIClient().get(self.url()).json()['bio'], 'Nueva bio')
+
+    def test_cache_entries_have_bounded_timeout(self):
+        cache.clear()
+        with mock.patch.object(public_profiles.cache, 'set') as cache_set:
+            public_profiles.get_public_profile(self.profile.id)
+            public_profiles.get_public_profile(999999)
+        for call in cache_set.call_args_list:
+            self.assertEqual(call.args[2], public_profiles.CACHE_TIMEOUT)
+
+    def test_picture_change_rebuilds_blob(self):
+        user = self.profile.user
+        with self.captureOnCommitCallbacks(execute=True):
+            user.profile_picture = 'profile_pictures/' + 'a' * 32 + '.webp'
+            user.save(update_fields=['profile_picture'])
+
+        thumbnails = APIClient().get(self.url()).json()['profile_picture_thumbnails']
+        self.assertEqual(set(thumbnails), {'64', '256'})
+
+    def test_unpublished_profile_returns_404_and_drops_blob(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.profile.profile_completed = False
+            self.profile.save()
+
+        self.assertFalse(PublicProfileBlob.objects.filter(profile=self.profile).exists())
+        self.assertEqual(APIClient().get(self.url()).status_code, 404)
+        self.assertEqual(APIClient().get(self.url(999999)).status_code, 404)
+
+
+class SpecializationCatalogueTests(TestCase):
+    def setUp(self):
+        catalog._catalogue = None
+        with self.captureOnCommitCallbacks(execute=True):
+            Specialization.objects.create(name='Ansiedad')
+
+    def test_served_from_memory_between_version_checks(self):
+        catalog.get_specialization_catalogue()
+        with self.assertNumQueries(0):
+            catalogue = catalog.get_specialization_catalogue()
+        self.assertEqual([item['name'] for item in catalogue.items], ['Ansiedad'])
+
+    def test_local_change_reloads_immediately(self):
+        catalog.get_specialization_catalogue()
+        with self.captureOnCommitCallbacks(execute=True):
+            Specialization.objects.create(name='Depresión')
+        names = {item['name'] for item in catalog.get_specialization_catalogue().items}
+        self.assertEqual(names, {'Ansiedad', 'Depresión'})
+
+    def test_change_from_other_worker_reloads_after_version_check(self):
+        catalog.get_specialization_catalogue()
+        # Otro worker: fila nueva (sin señales en este proceso) y versión subida
+        Specialization.objects.bulk_create([Specialization(name='Pareja')])
+        CatalogVersion.bump(catalog.SPECIALIZATIONS_CATALOG)
+
+        self.assertEqual(len(catalog.get_specialization_catalogue().items), 1)
+        catalog._checked_at = 0.0  # pasó CHECK_INTERVAL
+        self.assertEqual(len(catalog.get_specialization_catalogue().items), 2)
+
+    def test_resolve_ids_matches_icontains(self):
+        catalogue = catalog.get_specialization_catalogue()
+        expected = list(Specialization.objects.filter(name__icontains='sie').values_list('id', flat=True))
+        self.assertEqual(catalogue.resolve_ids('SIE'), expected)
+
+    def test_etag_returns_304(self):
+        client = APIClient()
+        response = client.get('/api/professionals/specializations/')
+        self.assertEqual(response.status_code, 200)
+        response = client.get('/api/professionals/specializations/', HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, 304)
+
+
+class NearbyProfessionalsTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        # La Paz (centro), Sopocachi (~1,5 km), El Alto (~6,5 km), Cochabamba (~230 km)
+        self.center = create_professional('centro@example.com', latitude='-16.495500', longitude='-68.133600')
+        self.near = create_professional('sopocachi@example.com', latitude='-16.508000', longitude='-68.127000')
+        self.el_alto = create_professional('alto@example.com', latitude='-16.520000', longitude='-68.190000')
+        self.far = create_professional('cbba@example.com', latitude='-17.389500', longitude='-66.156800')
+        create_professional(
+            'online@example.com', latitude='-16.496000', longitude='-68.134000',
+            accepts_in_person_sessions=False
+        )
+
+    def search(self, **params):
+        response = APIClient().get('/api/professionals/nearby/', {'lat': -16.4955, 'lng': -68.1336, **params})
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def test_ranks_by_distance_within_radius(self):
+        data = self.search(radius_km=5)
+        self.assertEqual([p['id'] for p in data['professionals']], [self.center.id, self.near.id])
+        self.assertEqual(data['professionals'][0]['distance_km'], 0.0)
+
+    def test_radius_crossing_grid_cells(self):
+        # El Alto cae en otra celda de la grilla que el centro
+        self.assertNotEqual(grid_cell(-16.52, -68.19), grid_cell(-16.4955, -68.1336))
+        data = self.search(radius_km=10)
+        self.assertEqual(data['count'], 3)
+        self.assertIn(self.el_alto.id, [p['id'] for p in data['professionals']])
+
+    def test_online_only_profiles_excluded_by_default(self):
+        self.assertEqual(self.search(radius_km=1)['count'], 1)
+        self.assertEqual(self.search(radius_km=1, accepts_in_person='false')['count'], 2)
+
+    def test_limit_keeps_total_count(self):
+        data = self.search(radius_km=10, limit=1)
+        self.assertEqual((data['count'], len(data['professionals'])), (3, 1))
+
+    def test_invalid_coordinates(self):
+        response = APIClient().get('/api/professionals/nearby/', {'lat': 100, 'lng': 0})
+        self.assertEqual(response.status_code, 400)
+
+    def test_haversine(self):
+        distances = haversine_km(0, 0, [0, 0], [0, 1])
+        self.assertAlmostEqual(float(distances[0]), 0)
+        self.assertAlmostEqual(float(distances[1]), 111.195, places=2)
+
+
+class MatchingIndexTests(TestCase):
+    def setUp(self):
+        catalog._catalogue = None
+        with self.captureOnCommitCallbacks(execute=True):
+            self.anxiety = Specialization.objects.create(name='Ansiedad')
+        self.match = create_professional('match@example.com', consultation_fee=Decimal('200.00'))
+        self.match.specializations.add(self.anxiety)
+        self.other = create_professional('other@example.com', consultation_fee=Decimal('100.00'))
+        self.index = MatchingIndex()
+
+    def ranked_ids(self, **params):
+        self.index.checked_at = 0.0  # forzar la actualización
+        return [profile_id for profile_id, _, _ in self.index.rank(**params)]
+
+    def test_specialization_overlap_ranks_first(self):
+        self.assertEqual(self.ranked_ids(specialization_ids=[self.anxiety.id]), [self.match.id, self.other.id])
+        self.assertEqual(self.ranked_ids(max_fee=150), [self.other.id])
+
+    def test_deleted_profile_is_pruned(self):
+        self.ranked_ids()
+        self.other.delete()
+        self.assertEqual(self.ranked_ids(), [self.match.id])
+        self.assertNotIn(self.other.id, self.index.row_of)
+        self.assertEqual(self.index.size, 1)
+
+    def test_deactivation_is_seen_through_updated_at(self):
+        self.ranked_ids()
+        # Solo el campo: save() agrega updated_at, la señal del usuario lo sube
+        self.other.is_active = False
+        self.other.save(update_fields=['is_active'])
+        user = self.match.user
+        user.is_active = False
+        user.save(update_fields=['is_active'])
+        self.assertEqual(self.ranked_ids(), [])
+
+    def test_refresh_reads_only_changes(self):
+        self.ranked_ids()
+        self.other.user.delete()
+        self.index.checked_at = 0.0
+        with CaptureQueriesContext(connection) as queries:
+            self.index.refresh()
+        self.assertNotIn(self.other.id, self.index.row_of)
+        for query in queries.captured_queries:
+            if 'FROM "professional_profiles"' in query['sql']:
+                self.assertIn('"updated_at" >', query['sql'])
+            elif 'FROM "deleted_professional_profiles"' in query['sql']:
+                self.assertIn('"deleted_at" >', query['sql'])
+
+    def test_compaction_keeps_rows_consistent(self):
+        self.ranked_ids()
+        self.match.delete()
+        self.other.specializations.add(self.anxiety)
+        self.assertEqual(self.ranked_ids(specialization_ids=[self.anxiety.id]), [self.other.id])
+        row = self.index.row_of[self.other.id]
+        self.assertTrue(self.index.specializations[row, self.index.columns[self.anxiety.id]])
+
+    def test_slots_are_computed_outside_the_lock(self):
+        held = []
+
+        def next_free_slots(user_ids, now, horizon_days):
+            held.append(self.index._lock.locked())
+            return {}
 
-# Create your tests here.
+        with mock.patch('apps.appointments.schedule.next_free_slots', side_effect=next_free_slots):
+            ranked = self.index.rank()
+        self.assertEqual(held, [False])
+        self.assertEqual({next_slot for _, _, next_slot in ranked}, {float('inf')})
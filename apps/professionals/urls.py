@@ -9,6 +9,8 @@ urlpatterns = [
     
     # CU-08: Buscar y Filtrar Profesionales
     path('', views.list_professionals, name='list_professionals'),
+    path('nearby/', views.nearby_professionals, name='nearby_professionals'),
+    path('match/', views.match_professionals, name='match_professionals'),
     
     # CU-09: Ver Perfil Público Profesional
     path('<int:professional_id>/', views.professional_public_detail, name='professional_detail'),
@@ -1,17 +1,31 @@
 # apps/professionals/views.py
 
 from rest_framework import status, permissions
-from rest_framework.decorators import api_view, permission_classes
+from rest_framework.decorators import api_view, permission_classes, authentication_classes, throttle_classes
 from rest_framework.response import Response
+from django.http import HttpResponse
+from django.utils.cache import patch_cache_control
 from django.shortcuts import get_object_or_404
 from django.contrib.auth import get_user_model
+from django.conf import settings
 from django.db.models import Q
-from .models import ProfessionalProfile, Specialization
+from django.utils import timezone
+from datetime import datetime
+import math
+from .models import ProfessionalProfile
+from .catalog import get_specialization_catalogue
+from .fast_serializers import serialize_directory
+from .geo import bounding_box, cells_in_box, rank_by_distance
+from .matching import matching_index
+from .public_profiles import get_public_profile
+from apps.appointments.schedule import get_templates
+from apps.authentication.throttles import scoped_throttles
+from config.cache_tags import cache_by_tags
+from config.replicas import use_replica
 from .serializers import (
     ProfessionalProfileSerializer,
     ProfessionalProfileUpdateSerializer,
-    ProfessionalPublicSerializer,
-    SpecializationSerializer
+    ProfessionalPublicSerializer
 )
 
 User = get_user_model()
@@ -121,6 +135,8 @@ def professional_profile_detail(request):
 
 @api_view(['GET'])
 @permission_classes([permissions.AllowAny])
+@throttle_classes(scoped_throttles('professionals'))
+@cache_by_tags('professionals', 'specializations', 'users')
 def list_professionals(request):
     """
     CU-08: Buscar y Filtrar Profesionales
@@ -141,7 +157,9 @@ def list_professionals(request):
     
     # Aplicar filtros
     if specialization:
-        profiles = profiles.filter(specializations__name__icontains=specialization)
+        # Nombre -> IDs resuelto en memoria, sin JOIN contra specializations
+        specialization_ids = get_specialization_catalogue().resolve_ids(specialization)
+        profiles = profiles.filter(specializations__id__in=specialization_ids).distinct()
     
     if city:
         profiles = profiles.filter(city__icontains=city)
@@ -167,42 +185,199 @@ def list_professionals(request):
             Q(user__last_name__icontains=search)
         )
     
-    serializer = ProfessionalPublicSerializer(profiles, many=True)
+    # Filas planas en lugar de ProfessionalPublicSerializer (misma salida, ver fast_serializers.py)
+    professionals = serialize_directory(profiles)
     return Response({
-        'count': profiles.count(),
-        'professionals': serializer.data
+        'count': len(professionals),
+        'professionals': professionals
     }, status=status.HTTP_200_OK)
 
 @api_view(['GET'])
 @permission_classes([permissions.AllowAny])
-def professional_public_detail(request, professional_id):
+@throttle_classes(scoped_throttles('professionals'))
+@use_replica
+def nearby_professionals(request):
     """
-    CU-09: Ver Perfil Público Profesional
-    Vista pública de un psicólogo específico
+    Buscar psicólogos cercanos (consulta presencial)
+    
+    Query params:
+    - lat, lng: coordenadas del paciente (requeridos)
+    - radius_km: radio de búsqueda (por defecto 10, máximo 50)
+    - specialization: nombre de especialidad (opcional)
+    - accepts_in_person: 'false' para incluir perfiles solo en línea (por defecto solo presencial)
+    - limit: cantidad de resultados (por defecto 20, máximo 100)
+    """
+    try:
+        latitude = float(request.query_params['lat'])
+        longitude = float(request.query_params['lng'])
+    except (KeyError, ValueError):
+        return Response({
+            'error': 'Debe proporcionar lat y lng numéricos'
+        }, status=status.HTTP_400_BAD_REQUEST)
+
+    if not (-90 <= latitude <= 90 and -180 <= longitude <= 180):
+        return Response({
+            'error': 'Coordenadas fuera de rango'
+        }, status=status.HTTP_400_BAD_REQUEST)
+
+    try:
+        radius_km = min(float(request.query_params.get('radius_km', 10)), 50)
+        limit = min(int(request.query_params.get('limit', 20)), 100)
+    except ValueError:
+        return Response({
+            'error': 'radius_km y limit deben ser numéricos'
+        }, status=status.HTTP_400_BAD_REQUEST)
+
+    profiles = ProfessionalProfile.objects.filter(
+        is_active=True,
+        profile_completed=True
+    )
+
+    if request.query_params.get('accepts_in_person', 'true').lower() != 'false':
+        profiles = profiles.filter(accepts_in_person_sessions=True)
+
+    specialization = request.query_params.get('specialization')
+    if specialization:
+        specialization_ids = get_specialization_catalogue().resolve_ids(specialization)
+        profiles = profiles.filter(specializations__id__in=specialization_ids).distinct()
+
+    # 1) Candidatos por índice: celdas de la grilla + bounding box
+    min_lat, max_lat, min_lng, max_lng = bounding_box(latitude, longitude, radius_km)
+    profiles = profiles.filter(latitude__range=(min_lat, max_lat))
+    if -180 <= min_lng and max_lng <= 180:
+        profiles = profiles.filter(longitude__range=(min_lng, max_lng))
+    cells = cells_in_box(min_lat, max_lat, min_lng, max_lng)
+    if cells is not None:
+        profiles = profiles.filter(geo_cell__in=cells)
+
+    candidates = list(profiles.values_list('id', 'latitude', 'longitude'))
+
+    # 2) Distancia exacta vectorizada y ranking
+    ranked, total = rank_by_distance(latitude, longitude, candidates, radius_km, limit)
+
+    by_id = ProfessionalProfile.objects.select_related('user').prefetch_related(
+        'specializations'
+    ).in_bulk([profile_id for profile_id, _ in ranked])
+    templates = get_templates(profile.user_id for profile in by_id.values())
+
+    results = []
+    for profile_id, distance in ranked:
+        data = ProfessionalPublicSerializer(
+            by_id[profile_id],
+            context={'schedule_templates': templates}
+        ).data
+        data['distance_km'] = round(distance, 2)
+        results.append(data)
+
+    return Response({
+        'count': total,
+        'radius_km': radius_km,
+        'professionals': results
+    }, status=status.HTTP_200_OK)
+
+@api_view(['GET'])
+@permission_classes([permissions.IsAuthenticated])
+def match_professionals(request):
     """
+    Recomendación de psicólogos para el paciente
+    
+    Query params:
+    - specializations: ids de especialidad separados por coma (opcional)
+    - max_fee: tarifa máxima (opcional)
+    - modality: 'online', 'in_person' o 'any' (por defecto)
+    - limit: cantidad de resultados (por defecto 20, máximo 50)
+    
+    El puntaje combina coincidencia de especialidades, calificación, tarifa
+    y cercanía del próximo horario libre (ver matching.py).
+    """
+    params = request.query_params
     try:
-        profile = get_object_or_404(
-            ProfessionalProfile.objects.filter(
-                is_active=True,
-                profile_completed=True
-            ),
-            id=professional_id
+        specialization_ids = [
+            int(pk) for pk in params.get('specializations', '').split(',') if pk.strip()
+        ]
+        max_fee = float(params['max_fee']) if params.get('max_fee') else None
+        limit = max(min(int(params.get('limit', 20)), 50), 1)
+    except ValueError:
+        return Response({
+            'error': 'specializations, max_fee y limit deben ser numéricos'
+        }, status=status.HTTP_400_BAD_REQUEST)
+
+    modality = params.get('modality', 'any')
+    if modality not in ('online', 'in_person', 'any'):
+        return Response({
+            'error': "modality debe ser 'online', 'in_person' o 'any'"
+        }, status=status.HTTP_400_BAD_REQUEST)
+
+    ranked = matching_index.rank(specialization_ids, max_fee, modality, limit)
+
+    by_id = ProfessionalProfile.objects.select_related('user').prefetch_related(
+        'specializations'
+    ).in_bulk([profile_id for profile_id, _, _ in ranked])
+    templates = get_templates(profile.user_id for profile in by_id.values())
+
+    results = []
+    for profile_id, score, next_slot in ranked:
+        profile = by_id.get(profile_id)
+        if profile is None:  # eliminado después de la última actualización del índice
+            continue
+        data = ProfessionalPublicSerializer(
+            profile,
+            context={'schedule_templates': templates}
+        ).data
+        data['match_score'] = round(score, 4)
+        data['next_available_slot'] = (
+            datetime.fromtimestamp(
+                next_slot * 3600, tz=timezone.get_current_timezone()
+            ).isoformat()
+            if math.isfinite(next_slot) else None
         )
-        
-        serializer = ProfessionalPublicSerializer(profile)
-        return Response(serializer.data, status=status.HTTP_200_OK)
-        
-    except ProfessionalProfile.DoesNotExist:
+        results.append(data)
+
+    return Response({
+        'count': len(results),
+        'professionals': results
+    }, status=status.HTTP_200_OK)
+
+@api_view(['GET'])
+@authentication_classes([])
+@permission_classes([permissions.AllowAny])
+@use_replica
+def professional_public_detail(request, professional_id):
+    """
+    CU-09: Ver Perfil Público Profesional
+    Vista pública de un psicólogo específico.
+    Sirve el JSON pre-renderizado en caché (ver public_profiles.py),
+    sin consultas ni serializers en el camino caliente.
+    """
+    blob = get_public_profile(professional_id)
+    if not blob:
         return Response({
             'error': 'Profesional no encontrado'
         }, status=status.HTTP_404_NOT_FOUND)
 
+    return HttpResponse(blob, content_type='application/json')
+
 @api_view(['GET'])
+@authentication_classes([])
 @permission_classes([permissions.AllowAny])
+@use_replica
 def list_specializations(request):
     """
     Listar todas las especialidades disponibles
+    Se sirve desde el catálogo en memoria con caché HTTP de larga duración.
     """
-    specializations = Specialization.objects.all()
-    serializer = SpecializationSerializer(specializations, many=True)
-    return Response(serializer.data, status=status.HTTP_200_OK)
\ No newline at end of file
+    catalogue = get_specialization_catalogue()
+    etag = f'"specializations-{catalogue.version}"'
+
+    if request.META.get('HTTP_IF_NONE_MATCH') == etag:
+        response = HttpResponse(status=status.HTTP_304_NOT_MODIFIED)
+    else:
+        response = Response(list(catalogue.items), status=status.HTTP_200_OK)
+
+    response['ETag'] = etag
+    patch_cache_control(
+        response,
+        public=True,
+        max_age=settings.SPECIALIZATIONS_CACHE_MAX_AGE
+    )
+    return response
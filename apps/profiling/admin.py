@@ -0,0 +1,53 @@
+# apps/profiling/admin.py
+
+from django.contrib import admin
+from django.http import HttpResponse
+from django.shortcuts import get_object_or_404
+from django.urls import path, reverse
+from django.utils.html import format_html
+from .models import RequestProfile
+
+class RequestProfileAdmin(admin.ModelAdmin):
+    list_display = ('path', 'method', 'status_code', 'duration_ms', 'queries', 'user', 'created_at')
+    list_filter = ('method', 'status_code')
+    search_fields = ('path', 'user__email')
+    exclude = ('stats', 'summary')
+    readonly_fields = (
+        'user', 'method', 'path', 'query_string', 'status_code',
+        'duration_ms', 'queries', 'db_ms', 'created_at', 'download', 'summary_display',
+    )
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def get_urls(self):
+        urls = [
+            path(
+                '<int:pk>/download/',
+                self.admin_site.admin_view(self.download_view),
+                name='profiling_requestprofile_download',
+            ),
+        ]
+        return urls + super().get_urls()
+
+    def download_view(self, request, pk):
+        if not self.has_view_permission(request):
+            return HttpResponse(status=403)
+        profile = get_object_or_404(RequestProfile, pk=pk)
+        response = HttpResponse(bytes(profile.stats), content_type='application/octet-stream')
+        response['Content-Disposition'] = f'attachment; filename="request-{profile.pk}.prof"'
+        return response
+
+    def download(self, obj):
+        url = reverse('admin:profiling_requestprofile_download', args=[obj.pk])
+        return format_html('<a href="{}">request-{}.prof</a> (pstats / snakeviz)', url, obj.pk)
+    download.short_description = 'Archivo pstats'
+
+    def summary_display(self, obj):
+        return format_html('<pre style="font-size: 12px">{}</pre>', obj.summary)
+    summary_display.short_description = 'Resumen (tiempo acumulado)'
+
+admin.site.register(RequestProfile, RequestProfileAdmin)
@@ -0,0 +1,138 @@
+# apps/profiling/middleware.py
+
+import cProfile
+import io
+import marshal
+import pstats
+import threading
+import time
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from rest_framework.exceptions import APIException
+from rest_framework.request import Request
+from rest_framework.settings import api_settings
+from config import instrumentation
+from .models import RequestProfile
+
+# Perfilado a pedido: un usuario staff agrega el header `X-Profile: 1` o el
+# parámetro `?_profile=1` y ese request corre bajo cProfile; el perfil queda
+# en RequestProfile (admin) y la respuesta trae `X-Profile-Id`.
+# Sin el header/parámetro el costo es buscar una clave en META y una subcadena
+# en el query string.
+ENABLED = getattr(settings, 'PROFILING_ENABLED', True)
+KEEP = getattr(settings, 'PROFILING_KEEP', 100)
+TOP_FUNCTIONS = getattr(settings, 'PROFILING_TOP_FUNCTIONS', 60)
+
+HEADER = 'HTTP_X_PROFILE'
+QUERY_PARAM = '_profile='
+
+# cProfile es uno por hilo y solo se perfila un request a la vez por proceso
+_lock = threading.Lock()
+
+
+def requested(request):
+    return HEADER in request.META or QUERY_PARAM in request.META.get('QUERY_STRING', '')
+
+
+def staff_user(request):
+    """
+    El usuario staff que pide el perfil, o None. La autenticación de DRF corre
+    en la vista, así que aquí se usa la misma (sesión o tokens).
+    """
+    user = getattr(request, 'user', None)
+    if user is None or not user.is_authenticated:
+        drf_request = Request(
+            request, authenticators=[auth() for auth in api_settings.DEFAULT_AUTHENTICATION_CLASSES]
+        )
+        try:
+            user = drf_request.user
+        except APIException:
+            return None
+    if user.is_authenticated and user.is_staff:
+        return user
+    return None
+
+
+def save_profile(request, response, user, profiler, elapsed, metrics):
+    stats = pstats.Stats(profiler)
+    summary = io.StringIO()
+    stats.stream = summary
+    stats.sort_stats('cumulative').print_stats(TOP_FUNCTIONS)
+
+    profile = RequestProfile.objects.create(
+        user_id=user.pk,
+        method=request.method,
+        path=request.path[:500],
+        query_string=request.META.get('QUERY_STRING', ''),
+        status_code=response.status_code,
+        duration_ms=round(elapsed * 1000, 2),
+        queries=metrics.queries,
+        db_ms=round(metrics.db_time * 1000, 2),
+        summary=summary.getvalue(),
+        stats=marshal.dumps(stats.stats),  # Formato de pstats.dump_stats
+    )
+    stale = RequestProfile.objects.order_by('-created_at').values_list('pk', flat=True)[KEEP:]
+    RequestProfile.objects.filter(pk__in=list(stale)).delete()
+    return profile
+
+
+class ProfilingMiddleware:
+    """
+    Va después de AuthenticationMiddleware. Bajo ASGI las vistas async se
+    perfilan en el hilo del event loop: pueden aparecer otras corutinas que
+    corrían en paralelo y no aparece el trabajo enviado a hilos (sync_to_async).
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        instrumentation.install()
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        if not (ENABLED and requested(request)):
+            return self.get_response(request)
+        user = staff_user(request)
+        if user is None or not _lock.acquire(blocking=False):
+            return self.get_response(request)
+        try:
+            profiler = cProfile.Profile()
+            with instrumentation.measure('profile') as metrics:
+                start = time.perf_counter()
+                profiler.enable()
+                try:
+                    response = self.get_response(request)
+                finally:
+                    profiler.disable()
+                elapsed = time.perf_counter() - start
+        finally:
+            _lock.release()
+        profile = save_profile(request, response, user, profiler, elapsed, metrics)
+        response['X-Profile-Id'] = str(profile.pk)
+        return response
+
+    async def __acall__(self, request):
+        if not (ENABLED and requested(request)):
+            return await self.get_response(request)
+        user = await sync_to_async(staff_user)(request)
+        if user is None or not _lock.acquire(blocking=False):
+            return await self.get_response(request)
+        try:
+            profiler = cProfile.Profile()
+            with instrumentation.measure('profile') as metrics:
+                start = time.perf_counter()
+                profiler.enable()
+                try:
+                    response = await self.get_response(request)
+                finally:
+                    profiler.disable()
+                elapsed = time.perf_counter() - start
+        finally:
+            _lock.release()
+        profile = await sync_to_async(save_profile)(request, response, user, profiler, elapsed, metrics)
+        response['X-Profile-Id'] = str(profile.pk)
+        return response
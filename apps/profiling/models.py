@@ -0,0 +1,40 @@
+# apps/profiling/models.py
+
+from django.conf import settings
+from django.db import models
+
+
+class RequestProfile(models.Model):
+    """
+    Perfil de cProfile de un request puntual, pedido por un usuario staff
+    (ver apps/profiling/middleware.py). `stats` es el mismo formato que
+    pstats.dump_stats: se descarga desde el admin y se abre con pstats/snakeviz.
+    """
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.SET_NULL,
+        null=True,
+        related_name='request_profiles'
+    )
+    method = models.CharField(max_length=10)
+    path = models.CharField(max_length=500)
+    query_string = models.TextField(blank=True)
+    status_code = models.PositiveSmallIntegerField()
+
+    duration_ms = models.FloatField()
+    queries = models.PositiveIntegerField(default=0)
+    db_ms = models.FloatField(default=0)
+
+    summary = models.TextField()  # Funciones más costosas por tiempo acumulado
+    stats = models.BinaryField()
+
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        db_table = 'request_profiles'
+        ordering = ['-created_at']
+        verbose_name = 'Perfil de request'
+        verbose_name_plural = 'Perfiles de requests'
+
+    def __str__(self):
+        return f"{self.method} {self.path} ({self.duration_ms:.0f} ms)"
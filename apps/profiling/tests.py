@@ -0,0 +1,69 @@
+# apps/profiling/tests.py
+
+import marshal
+from unittest import mock
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+from . import middleware
+from .models import RequestProfile
+
+User = get_user_model()
+
+
+def create_user(email='admin@example.com', **fields):
+    return User.objects.create_user(email=email, first_name='Ana', last_name='Paz', **fields)
+
+
+class ProfilingMiddlewareTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.staff = create_user(is_staff=True)
+        self.client = APIClient()
+        self.client.force_login(self.staff)
+
+    def test_profile_requested_by_header_is_saved(self):
+        response = self.client.get('/api/users/me/', HTTP_X_PROFILE='1')
+        self.assertEqual(response.status_code, 200)
+
+        profile = RequestProfile.objects.get(pk=response['X-Profile-Id'])
+        self.assertEqual((profile.user, profile.method, profile.path), (self.staff, 'GET', '/api/users/me/'))
+        self.assertGreater(profile.queries, 0)
+        self.assertIn('cumulative', profile.summary)
+        # Mismo formato que pstats.dump_stats
+        stats = marshal.loads(bytes(profile.stats))
+        self.assertTrue(any(function == 'me' for _, _, function in stats))
+
+    def test_query_param_with_token_authentication(self):
+        token = Token.objects.create(user=self.staff)
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f'Token {token.key}')
+        response = client.get('/api/users/me/?_profile=1')
+        self.assertTrue(RequestProfile.objects.filter(pk=response['X-Profile-Id']).exists())
+
+    def test_not_profiled_without_request_or_for_non_staff(self):
+        self.assertNotIn('X-Profile-Id', self.client.get('/api/users/me/'))
+
+        client = APIClient()
+        client.force_login(create_user('paciente@example.com'))
+        self.assertNotIn('X-Profile-Id', client.get('/api/users/me/', HTTP_X_PROFILE='1'))
+        self.assertFalse(RequestProfile.objects.exists())
+
+    def test_keeps_only_latest_profiles(self):
+        with mock.patch.object(middleware, 'KEEP', 2):
+            ids = [self.client.get('/api/users/me/', HTTP_X_PROFILE='1')['X-Profile-Id'] for _ in range(3)]
+        self.assertEqual(
+            sorted(RequestProfile.objects.values_list('pk', flat=True)), sorted(map(int, ids[1:]))
+        )
+
+    def test_admin_download_is_pstats_file(self):
+        self.staff.is_superuser = True
+        self.staff.save()
+        profile_id = self.client.get('/api/users/me/', HTTP_X_PROFILE='1')['X-Profile-Id']
+
+        response = self.client.get(f'/admin/profiling/requestprofile/{profile_id}/download/')
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(f'request-{profile_id}.prof', response['Content-Disposition'])
+        self.assertEqual(response.content, bytes(RequestProfile.objects.get(pk=profile_id).stats))
@@ -0,0 +1,275 @@
+# apps/users/management/commands/bench_endpoints.py
+
+import json
+import math
+import platform
+import statistics
+import time
+from datetime import date, timedelta
+from unittest import mock
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client
+from django.test.utils import (
+    CaptureQueriesContext,
+    override_settings,
+    setup_test_environment,
+    teardown_test_environment,
+)
+from django.utils import timezone
+from apps.authentication.authentication import issue_access_token
+from apps.authentication.throttles import SlidingWindowThrottle
+from apps.professionals.models import ProfessionalProfile
+
+User = get_user_model()
+
+DATASET_PASSWORD = 'password123'
+
+
+def next_weekday():
+    """Próximo día hábil (la búsqueda rechaza fechas pasadas)"""
+    day = date.today() + timedelta(days=1)
+    while day.weekday() > 4:
+        day += timedelta(days=1)
+    return day.isoformat()
+
+
+# nombre, método, ruta, usuario autenticado, cuerpo, iteraciones máximas (None: --iterations)
+BENCHMARKS = [
+    ('search_available_psychologists', 'get',
+     lambda ctx: f'/api/appointments/search-psychologists/?date={next_weekday()}', 'patient', None, None),
+    ('get_psychologist_schedule', 'get',
+     lambda ctx: f'/api/appointments/psychologist/{ctx["profile_id"]}/schedule/', 'patient', None, None),
+    ('list_professionals', 'get',
+     lambda ctx: '/api/professionals/', 'patient', None, None),
+    ('list_professionals_filtered', 'get',
+     lambda ctx: '/api/professionals/?city=La Paz&max_fee=250&min_rating=3', 'patient', None, None),
+    ('appointments_list', 'get',
+     lambda ctx: '/api/appointments/appointments/', 'professional', None, None),
+    ('appointments_history', 'get',
+     lambda ctx: '/api/appointments/appointments/history/', 'professional', None, None),
+    # El hash de la contraseña domina: pocas iteraciones
+    ('login', 'post',
+     lambda ctx: '/api/auth/login/', None,
+     lambda ctx: {'email': ctx['patient'].email, 'password': DATASET_PASSWORD}, 10),
+]
+
+
+def percentile(values, p):
+    """Percentil por rango más cercano sobre valores ordenados"""
+    index = max(0, math.ceil(p / 100 * len(values)) - 1)
+    return values[index]
+
+
+class Command(BaseCommand):
+    help = (
+        'Benchmark de endpoints sobre una BD de prueba con dataset sintético: '
+        'percentiles de latencia y consultas por request, en JSON. '
+        'Con --baseline marca regresiones respecto a una corrida anterior.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, default=50, help='Requests medidos por endpoint')
+        parser.add_argument('--warmup', type=int, default=5, help='Requests previos sin medir (cachés calientes)')
+        parser.add_argument('--patients', type=int, default=2000)
+        parser.add_argument('--psychologists', type=int, default=100)
+        parser.add_argument('--appointments', type=int, default=20000)
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--only', help='Endpoints a medir, separados por coma')
+        parser.add_argument('--output', default='benchmark_results.json', help='Archivo JSON de resultados')
+        parser.add_argument('--baseline', help='JSON de una corrida anterior para comparar')
+        parser.add_argument(
+            '--tolerance',
+            type=float,
+            default=0.2,
+            help='Aumento relativo de p95 tolerado antes de marcar regresión'
+        )
+        parser.add_argument(
+            '--min-delta-ms',
+            type=float,
+            default=2.0,
+            help='Aumento absoluto de p95 por debajo del cual no se marca regresión (ruido)'
+        )
+        parser.add_argument('--keepdb', action='store_true', help='Conservar la BD de prueba entre corridas')
+        parser.add_argument(
+            '--response-cache',
+            action='store_true',
+            help='Servir desde la caché de respuestas (cache_by_tags); por defecto se mide la vista'
+        )
+
+    def handle(self, *args, **options):
+        benchmarks = BENCHMARKS
+        if options['only']:
+            names = {name.strip() for name in options['only'].split(',')}
+            unknown = names - {benchmark[0] for benchmark in BENCHMARKS}
+            if unknown:
+                raise CommandError(f'Endpoints desconocidos: {", ".join(sorted(unknown))}')
+            benchmarks = [benchmark for benchmark in BENCHMARKS if benchmark[0] in names]
+
+        baseline = None
+        if options['baseline']:
+            with open(options['baseline'], encoding='utf-8') as baseline_file:
+                baseline = json.load(baseline_file)
+
+        dataset = {
+            'patients': options['patients'],
+            'psychologists': options['psychologists'],
+            'appointments': options['appointments'],
+            'seed': options['seed'],
+        }
+
+        # BD de prueba y caché local propia: no se tocan los datos ni la caché compartida.
+        # Sin --response-cache, pasado el calentamiento se medirían aciertos de
+        # cache_by_tags (sin consultas) y no las vistas
+        setup_test_environment()
+        old_name = connection.creation.create_test_db(
+            verbosity=0, autoclobber=True, serialize=False, keepdb=options['keepdb']
+        )
+        try:
+            with override_settings(CACHES={'default': {
+                'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+                'LOCATION': 'bench-endpoints',
+            }}, CACHE_TAGS_ENABLED=options['response_cache']), mock.patch.object(SlidingWindowThrottle, 'allow_request', return_value=True):
+                context = self.seed(dataset)
+                results = {
+                    benchmark[0]: self.measure(benchmark, context, options)
+                    for benchmark in benchmarks
+                }
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0, keepdb=options['keepdb'])
+            teardown_test_environment()
+
+        report = {
+            'meta': {
+                'created_at': timezone.now().isoformat(),
+                'database': connection.vendor,
+                'python': platform.python_version(),
+                'debug': settings.DEBUG,
+                'iterations': options['iterations'],
+                'warmup': options['warmup'],
+                'response_cache': options['response_cache'],
+                'dataset': dataset,
+            },
+            'results': results,
+        }
+        with open(options['output'], 'w', encoding='utf-8') as output:
+            json.dump(report, output, indent=2)
+
+        self.print_results(results, baseline)
+        self.stdout.write(f'Resultados en {options["output"]}')
+
+        if baseline is not None:
+            if baseline.get('meta', {}).get('response_cache', False) != options['response_cache']:
+                self.stdout.write(self.style.WARNING(
+                    'La línea base se midió con otro --response-cache: la comparación no es válida'
+                ))
+            regressions = self.compare(results, baseline, options['tolerance'], options['min_delta_ms'])
+            if regressions:
+                raise CommandError(f'{len(regressions)} regresiones: {", ".join(regressions)}')
+            self.stdout.write(self.style.SUCCESS('✅ Sin regresiones respecto a la línea base'))
+        else:
+            self.stdout.write(self.style.SUCCESS('✅ Benchmark completado'))
+
+    def seed(self, dataset):
+        existing = User.objects.filter(email__endswith='@gen.example.com')
+        if not existing.exists():
+            self.stdout.write('Generando dataset...')
+            call_command(
+                'generate_dataset',
+                patients=dataset['patients'],
+                psychologists=dataset['psychologists'],
+                appointments=dataset['appointments'],
+                seed=dataset['seed'],
+                password=DATASET_PASSWORD,
+                stdout=self.stdout,
+            )
+
+        patient = User.objects.get(email='patient0@gen.example.com')
+        professional = User.objects.get(email='psychologist0@gen.example.com')
+        return {
+            'patient': patient,
+            'professional': professional,
+            'profile_id': ProfessionalProfile.objects.get(user=professional).id,
+            'tokens': {
+                'patient': issue_access_token(patient),
+                'professional': issue_access_token(professional),
+            },
+        }
+
+    def measure(self, benchmark, context, options):
+        name, method, path, user, body, max_iterations = benchmark
+        headers = {}
+        if user:
+            headers['authorization'] = f'Bearer {context["tokens"][user]}'
+        client = Client(headers=headers)
+        url = path(context)
+        kwargs = {}
+        if body:
+            kwargs = {'data': body(context), 'content_type': 'application/json'}
+
+        iterations = options['iterations']
+        if max_iterations:
+            iterations = min(iterations, max_iterations)
+
+        for _ in range(options['warmup']):
+            getattr(client, method)(url, **kwargs)
+
+        latencies = []
+        queries = []
+        status_codes = set()
+        for _ in range(iterations):
+            with CaptureQueriesContext(connection) as captured:
+                start = time.perf_counter()
+                response = getattr(client, method)(url, **kwargs)
+                latencies.append((time.perf_counter() - start) * 1000)
+            queries.append(len(captured))
+            status_codes.add(response.status_code)
+
+        if status_codes - {200}:
+            self.stdout.write(self.style.WARNING(f'{name}: respuestas {sorted(status_codes)}'))
+
+        latencies.sort()
+        return {
+            'iterations': iterations,
+            'status': sorted(status_codes),
+            'p50_ms': round(percentile(latencies, 50), 3),
+            'p95_ms': round(percentile(latencies, 95), 3),
+            'p99_ms': round(percentile(latencies, 99), 3),
+            'mean_ms': round(statistics.fmean(latencies), 3),
+            'queries': int(statistics.median(queries)),
+            'max_queries': max(queries),
+        }
+
+    def print_results(self, results, baseline):
+        base = (baseline or {}).get('results', {})
+        self.stdout.write(f'{"endpoint":34} {"p50":>9} {"p95":>9} {"p99":>9} {"queries":>8}')
+        for name, result in results.items():
+            line = (
+                f'{name:34} {result["p50_ms"]:>7.1f}ms {result["p95_ms"]:>7.1f}ms '
+                f'{result["p99_ms"]:>7.1f}ms {result["queries"]:>8}'
+            )
+            if name in base:
+                line += f'   (base p95 {base[name]["p95_ms"]:.1f}ms, {base[name]["queries"]} consultas)'
+            self.stdout.write(line)
+
+    def compare(self, results, baseline, tolerance, min_delta_ms):
+        regressions = []
+        for name, base in baseline.get('results', {}).items():
+            result = results.get(name)
+            if result is None:
+                continue
+            delta = result['p95_ms'] - base['p95_ms']
+            if delta > min_delta_ms and result['p95_ms'] > base['p95_ms'] * (1 + tolerance):
+                regressions.append(name)
+                self.stdout.write(self.style.ERROR(
+                    f'{name}: p95 {base["p95_ms"]:.1f}ms -> {result["p95_ms"]:.1f}ms'
+                ))
+            elif result['queries'] > base['queries']:
+                regressions.append(name)
+                self.stdout.write(self.style.ERROR(
+                    f'{name}: consultas {base["queries"]} -> {result["queries"]}'
+                ))
+        return regressions
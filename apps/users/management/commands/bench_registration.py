@@ -0,0 +1,80 @@
+# apps/users/management/commands/bench_registration.py
+
+import time
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+from apps.users.serializers import PatientRegistrationSerializer
+
+User = get_user_model()
+
+
+class Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = 'Registros por segundo: pipeline de registro vs. flujo anterior (los datos se descartan)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--count', type=int, default=10, help='Registros por variante')
+
+    def handle(self, *args, **options):
+        count = options['count']
+        for label, register in (
+            ('Flujo anterior (6 exists, INSERT + UPDATE)', self.legacy),
+            ('Pipeline (1 consulta de unicidad, 1 hash, 1 INSERT)', self.pipeline),
+        ):
+            elapsed, queries = self.measure(register, count)
+            self.stdout.write(
+                f'{label}: {count / elapsed:.2f} registros/s, '
+                f'{queries / count:.1f} consultas por registro'
+            )
+
+        self.stdout.write(self.style.SUCCESS('✅ Benchmark completado'))
+
+    def measure(self, register, count):
+        try:
+            with transaction.atomic():
+                with CaptureQueriesContext(connection) as queries:
+                    start = time.perf_counter()
+                    for i in range(count):
+                        register(self.payload(i))
+                    elapsed = time.perf_counter() - start
+                raise Rollback()
+        except Rollback:
+            pass
+        return elapsed, len(queries)
+
+    def payload(self, i):
+        return {
+            'email': f'bench-registro-{i}@example.com',
+            'username': f'bench-registro-{i}',
+            'first_name': 'Bench',
+            'last_name': 'Registro',
+            'ci': f'{9000000 + i}',
+            'phone': '7000000',
+            'gender': 'F',
+            'address': 'N/A',
+            'date_of_birth': '1990-01-01',
+            'password': 'bench-registro-123',
+            'password_confirm': 'bench-registro-123',
+        }
+
+    def pipeline(self, data):
+        serializer = PatientRegistrationSerializer(data=data)
+        serializer.is_valid(raise_exception=True)
+        serializer.save()
+
+    def legacy(self, data):
+        # Lo que hacían los serializers antes de registration.py: UniqueValidator
+        # de DRF más validate_<campo> por cada campo único
+        data = dict(data)
+        for field in ('ci', 'email', 'username') * 2:
+            User.objects.filter(**{field: data[field]}).exists()
+        data.pop('password_confirm')
+        password = data.pop('password')
+        user = User.objects.create_user(user_type='patient', **data)
+        user.set_password(password)
+        user.save()
@@ -0,0 +1,342 @@
+# apps/users/management/commands/generate_dataset.py
+
+import random
+import time
+from datetime import date, datetime, timedelta
+from decimal import Decimal, ROUND_HALF_UP
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.cache import cache
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+from apps.appointments.models import Appointment, PsychologistAvailability, Review
+from apps.appointments.schedule import TEMPLATE_KEY
+from apps.professionals.geo import grid_cell
+from apps.professionals.models import ProfessionalProfile, Specialization, WorkingHours
+from apps.professionals.public_profiles import PUBLIC_PROFILE_KEY
+from apps.users.models import PatientProfile
+from config.cache_tags import bump_tags
+
+User = get_user_model()
+
+FIRST_NAMES = [
+    'Ana', 'Carlos', 'María', 'José', 'Lucía', 'Juan', 'Sofía', 'Luis', 'Valeria', 'Diego',
+    'Camila', 'Jorge', 'Daniela', 'Miguel', 'Gabriela', 'Andrés', 'Paola', 'Fernando',
+    'Natalia', 'Ricardo', 'Carla', 'Sergio', 'Mariana', 'Pablo', 'Verónica', 'Marco',
+]
+LAST_NAMES = [
+    'Quispe', 'Mamani', 'Flores', 'Rojas', 'Vargas', 'Gutiérrez', 'Choque', 'Fernández',
+    'López', 'Pérez', 'García', 'Rodríguez', 'Condori', 'Torrez', 'Morales', 'Sánchez',
+    'Romero', 'Castro', 'Ramírez', 'Aguilar', 'Mendoza', 'Cruz', 'Gonzales', 'Ortiz',
+]
+CITIES = [
+    ('La Paz', 'La Paz', -16.5000, -68.1500),
+    ('El Alto', 'La Paz', -16.5040, -68.1630),
+    ('Santa Cruz de la Sierra', 'Santa Cruz', -17.7833, -63.1821),
+    ('Cochabamba', 'Cochabamba', -17.3895, -66.1568),
+    ('Sucre', 'Chuquisaca', -19.0196, -65.2619),
+    ('Tarija', 'Tarija', -21.5355, -64.7296),
+]
+# Bloques semanales (weekday, inicio, fin) en horas; como create_availability
+SCHEDULES = [
+    [(day, 8, 12) for day in range(5)],
+    [(day, 14, 18) for day in range(5)],
+    [(day, 16, 20) for day in range(1, 6)],
+    [(day, 9, 13) for day in range(5)] + [(5, 9, 12)],
+]
+SESSION_DURATIONS = [45, 60, 60, 60]
+FEES = [Decimal('150.00'), Decimal('200.00'), Decimal('250.00'), Decimal('300.00')]
+PAST_STATUSES = ['completed'] * 8 + ['cancelled', 'no_show']
+FUTURE_STATUSES = ['confirmed'] * 3 + ['pending'] * 2 + ['cancelled']
+PATIENT_ATTEMPTS = 20  # pacientes al azar probados por slot antes de dejarlo libre
+
+
+class Command(BaseCommand):
+    help = (
+        'Genera un dataset sintético a escala (pacientes, psicólogos con disponibilidad, '
+        'citas sin solapamientos y reseñas) con bulk_create y semilla fija'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--patients', type=int, default=1000)
+        parser.add_argument('--psychologists', type=int, default=50)
+        parser.add_argument('--appointments', type=int, default=10000)
+        parser.add_argument('--weeks', type=int, default=12, help='Semanas de agenda (mitad pasadas, mitad futuras)')
+        parser.add_argument('--review-rate', type=float, default=0.3, help='Fracción de citas completadas con reseña')
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--batch-size', type=int, default=5000)
+        parser.add_argument('--prefix', default='gen', help='Prefijo de emails/usernames generados')
+        parser.add_argument('--password', default='password123', help='Contraseña de todos los usuarios generados')
+        parser.add_argument('--clear', action='store_true', help='Borrar antes los datos con el mismo prefijo')
+
+    def handle(self, *args, **options):
+        self.rng = random.Random(options['seed'])
+        self.batch_size = options['batch_size']
+        self.prefix = options['prefix']
+        self.email_domain = f'{self.prefix}.example.com'
+
+        generated = User.objects.filter(email__endswith=f'@{self.email_domain}')
+        if options['clear']:
+            self.timed('Borrado', self.clear, generated)
+        elif generated.exists():
+            raise CommandError(
+                f'Ya hay usuarios @{self.email_domain}: usa --clear o cambia --prefix'
+            )
+
+        specializations = list(Specialization.objects.values_list('id', flat=True))
+        if not specializations:
+            call_command('create_specializations', stdout=self.stdout)
+            specializations = list(Specialization.objects.values_list('id', flat=True))
+
+        # Un solo hash para todos: el dataset no mide el costo del hashing
+        self.password_hash = make_password(options['password'])
+
+        patient_ids = self.timed('Pacientes', self.create_patients, options['patients'])
+        psychologists = self.timed(
+            'Psicólogos', self.create_psychologists, options['psychologists'], specializations
+        )
+        if not patient_ids or not psychologists:
+            self.stdout.write(self.style.WARNING('Sin pacientes o psicólogos no se generan citas'))
+        else:
+            created = self.timed(
+                'Citas', self.create_appointments,
+                patient_ids, psychologists, options['appointments'],
+                options['weeks'], options['review_rate']
+            )
+            if created < options['appointments']:
+                self.stdout.write(self.style.WARNING(
+                    'Las agendas no tienen más slots libres: aumenta --weeks o --psychologists'
+                ))
+
+        # Los IDs pueden reutilizarse tras --clear (SQLite): descartar plantillas y perfiles cacheados
+        cache.delete_many(
+            [TEMPLATE_KEY.format(user_id) for user_id in psychologists] +
+            [PUBLIC_PROFILE_KEY.format(profile_id) for profile_id, *_ in psychologists.values()]
+        )
+        # bulk_create no dispara señales: invalidar las respuestas de cache_by_tags
+        bump_tags(
+            'professionals',
+            *(f'profile:{profile_id}' for profile_id, *_ in psychologists.values()),
+            *(f'appointments:user:{user_id}' for user_id in [*patient_ids, *psychologists])
+        )
+        self.stdout.write(self.style.SUCCESS('✅ Dataset generado'))
+
+    def timed(self, label, func, *args):
+        start = time.perf_counter()
+        result = func(*args)
+        elapsed = time.perf_counter() - start
+        count = result if isinstance(result, int) else len(result)
+        self.stdout.write(f'{label}: {count} en {elapsed:.1f}s ({count / elapsed if elapsed else 0:.0f}/s)')
+        return result
+
+    def batches(self, items):
+        batch = []
+        for item in items:
+            batch.append(item)
+            if len(batch) >= self.batch_size:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+
+    def clear(self, generated):
+        user_ids = list(generated.values_list('id', flat=True))
+        deleted = 0
+        for offset in range(0, len(user_ids), self.batch_size):
+            batch = user_ids[offset:offset + self.batch_size]
+            with transaction.atomic():
+                Review.objects.filter(psychologist_id__in=batch).delete()
+                Appointment.objects.filter(psychologist_id__in=batch).delete()
+                Appointment.objects.filter(patient_id__in=batch).delete()
+                deleted += User.objects.filter(id__in=batch).delete()[1].get(User._meta.label, 0)
+        return deleted
+
+    def user(self, kind, index, user_type):
+        rng = self.rng
+        first_name = rng.choice(FIRST_NAMES)
+        last_name = f'{rng.choice(LAST_NAMES)} {rng.choice(LAST_NAMES)}'
+        return User(
+            email=f'{kind}{index}@{self.email_domain}',
+            username=f'{self.prefix}_{kind}{index}',
+            password=self.password_hash,
+            first_name=first_name,
+            last_name=last_name,
+            user_type=user_type,
+            # CI de 10 dígitos, por tipo de usuario, fuera del rango de cédulas reales
+            ci=str((9 if user_type == 'patient' else 8) * 10 ** 9 + index),
+            phone=str(rng.randint(6000000, 7999999)),
+            gender=rng.choice('MF'),
+            date_of_birth=date(1950, 1, 1) + timedelta(days=rng.randint(0, 365 * 55)),
+        )
+
+    def create_patients(self, count):
+        patient_ids = []
+        for batch in self.batches(self.user('patient', i, 'patient') for i in range(count)):
+            with transaction.atomic():
+                users = User.objects.bulk_create(batch)
+                PatientProfile.objects.bulk_create([
+                    PatientProfile(user=user, occupation='', how_found_us='dataset') for user in users
+                ])
+            patient_ids.extend(user.id for user in users)
+        return patient_ids
+
+    def create_psychologists(self, count, specializations):
+        """{user_id: (profile_id, session_duration, fee, bloques, acepta_online)}"""
+        rng = self.rng
+        psychologists = {}
+        for batch in self.batches(self.user('psychologist', i, 'professional') for i in range(count)):
+            with transaction.atomic():
+                users = User.objects.bulk_create(batch)
+                profiles = []
+                for user in users:
+                    city, state, latitude, longitude = rng.choice(CITIES)
+                    latitude = Decimal(f'{latitude + rng.uniform(-0.08, 0.08):.6f}')
+                    longitude = Decimal(f'{longitude + rng.uniform(-0.08, 0.08):.6f}')
+                    profiles.append(ProfessionalProfile(
+                        user=user,
+                        license_number=f'{self.prefix.upper()}-{user.username}',
+                        bio='Psicólogo clínico con enfoque integrativo.',
+                        education='Licenciatura en Psicología',
+                        experience_years=rng.randint(1, 30),
+                        consultation_fee=rng.choice(FEES),
+                        session_duration=rng.choice(SESSION_DURATIONS),
+                        accepts_online_sessions=rng.random() < 0.8,
+                        accepts_in_person_sessions=True,
+                        city=city,
+                        state=state,
+                        latitude=latitude,
+                        longitude=longitude,
+                        # save() no se ejecuta con bulk_create
+                        geo_cell=grid_cell(latitude, longitude),
+                        is_verified=rng.random() < 0.7,
+                        profile_completed=True,
+                    ))
+                profiles = ProfessionalProfile.objects.bulk_create(profiles)
+
+                through = ProfessionalProfile.specializations.through
+                links, availability, working_hours = [], [], []
+                for user, profile in zip(users, profiles):
+                    for specialization_id in rng.sample(specializations, k=min(len(specializations), rng.randint(1, 3))):
+                        links.append(through(professionalprofile_id=profile.id, specialization_id=specialization_id))
+                    blocks = rng.choice(SCHEDULES)
+                    for weekday, start, end in blocks:
+                        start_time = datetime.min.replace(hour=start).time()
+                        end_time = datetime.min.replace(hour=end).time()
+                        availability.append(PsychologistAvailability(
+                            psychologist=user, weekday=weekday, start_time=start_time, end_time=end_time
+                        ))
+                        working_hours.append(WorkingHours(
+                            professional=profile, day_of_week=weekday, start_time=start_time, end_time=end_time
+                        ))
+                    psychologists[user.id] = (
+                        profile.id, profile.session_duration, profile.consultation_fee, blocks,
+                        profile.accepts_online_sessions
+                    )
+                through.objects.bulk_create(links)
+                PsychologistAvailability.objects.bulk_create(availability)
+                WorkingHours.objects.bulk_create(working_hours)
+        return psychologists
+
+    def week_slots(self, duration, blocks):
+        """(weekday, minuto de inicio) de cada sesión que entra en los bloques de la semana"""
+        slots = []
+        for weekday, start, end in blocks:
+            minute = start * 60
+            while minute + duration <= end * 60:
+                slots.append((weekday, minute))
+                minute += duration
+        return slots
+
+    def planned_appointments(self, patient_ids, psychologists, total, weeks):
+        """
+        Citas sin solapamientos: por psicólogo se eligen índices distintos de su
+        capacidad (semanas × slots semanales), sin consultar la BD. El paciente
+        se elige entre los que no tienen otra cita a esa hora.
+        """
+        rng = self.rng
+        busy = {}  # (patient_id, fecha) -> [(inicio, fin)] en minutos
+        today = date.today()
+        first_monday = today - timedelta(days=today.weekday()) - timedelta(weeks=weeks // 2)
+        user_ids = list(psychologists)
+        per_psychologist, extra = divmod(total, len(user_ids))
+
+        for position, user_id in enumerate(user_ids):
+            profile_id, duration, fee, blocks, accepts_online = psychologists[user_id]
+            slots = self.week_slots(duration, blocks)
+            capacity = len(slots) * weeks
+            wanted = min(capacity, per_psychologist + (1 if position < extra else 0))
+            for index in sorted(rng.sample(range(capacity), wanted)):
+                week, slot = divmod(index, len(slots))
+                weekday, minute = slots[slot]
+                appointment_date = first_monday + timedelta(weeks=week, days=weekday)
+                patient_id = self.free_patient(patient_ids, busy, appointment_date, minute, minute + duration)
+                if patient_id is None:
+                    continue
+                start = datetime.combine(appointment_date, datetime.min.time()) + timedelta(minutes=minute)
+                past = appointment_date < today
+                yield Appointment(
+                    patient_id=patient_id,
+                    psychologist_id=user_id,
+                    appointment_date=appointment_date,
+                    start_time=start.time(),
+                    end_time=(start + timedelta(minutes=duration)).time(),
+                    appointment_type='online' if accepts_online and rng.random() < 0.4 else 'in_person',
+                    status=rng.choice(PAST_STATUSES if past else FUTURE_STATUSES),
+                    consultation_fee=fee,
+                    is_paid=past,
+                )
+
+    def free_patient(self, patient_ids, busy, appointment_date, start, end):
+        """Paciente al azar sin otra cita que se solape; None si no se encuentra"""
+        for _ in range(PATIENT_ATTEMPTS):
+            patient_id = self.rng.choice(patient_ids)
+            sessions = busy.setdefault((patient_id, appointment_date), [])
+            if all(end <= other_start or other_end <= start for other_start, other_end in sessions):
+                sessions.append((start, end))
+                return patient_id
+        return None
+
+    def create_appointments(self, patient_ids, psychologists, total, weeks, review_rate):
+        rng = self.rng
+        created = 0
+        ratings = {}  # user_id -> [suma, total]
+        for batch in self.batches(self.planned_appointments(patient_ids, psychologists, total, weeks)):
+            with transaction.atomic():
+                appointments = Appointment.objects.bulk_create(batch)
+                reviews = []
+                for appointment in appointments:
+                    if appointment.status == 'completed' and rng.random() < review_rate:
+                        rating = rng.choices([1, 2, 3, 4, 5], weights=[1, 1, 3, 6, 9])[0]
+                        reviews.append(Review(
+                            appointment=appointment,
+                            patient_id=appointment.patient_id,
+                            psychologist_id=appointment.psychologist_id,
+                            rating=rating,
+                        ))
+                        totals = ratings.setdefault(appointment.psychologist_id, [0, 0])
+                        totals[0] += rating
+                        totals[1] += 1
+                # bulk_create no dispara las señales de Review: los agregados se escriben al final
+                Review.objects.bulk_create(reviews)
+            created += len(appointments)
+
+        profiles = []
+        now = timezone.now()
+        for user_id, (rating_sum, total_reviews) in ratings.items():
+            profiles.append(ProfessionalProfile(
+                id=psychologists[user_id][0],
+                rating_sum=rating_sum,
+                total_reviews=total_reviews,
+                # Mismo redondeo que reconcile_ratings: sin desvíos en datos recién generados
+                average_rating=(Decimal(rating_sum) / total_reviews).quantize(
+                    Decimal('0.01'), rounding=ROUND_HALF_UP
+                ),
+                # bulk_update no toca auto_now; el índice de matching lo usa como marca de cambios
+                updated_at=now,
+            ))
+        ProfessionalProfile.objects.bulk_update(
+            profiles, ['rating_sum', 'total_reviews', 'average_rating', 'updated_at'], batch_size=self.batch_size
+        )
+        return created
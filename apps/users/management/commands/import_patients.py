@@ -0,0 +1,214 @@
+# apps/users/management/commands/import_patients.py
+
+import csv
+import json
+import os
+import time
+from itertools import islice
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand, CommandError
+from django.db import IntegrityError, transaction
+from django.db.models import Q
+from rest_framework import serializers
+from apps.authentication.hashing import create_pool
+from apps.users.models import PatientProfile
+from apps.users.registration import UNIQUE_FIELDS, create_user_with_hash
+from apps.users.serializers import PatientImportSerializer, PatientProfileSerializer
+
+User = get_user_model()
+
+PROFILE_COLUMNS = set(PatientProfileSerializer.Meta.fields) - {'profile_completed'}
+
+
+def read_rows(path, encoding):
+    """Genera (línea, fila) sin cargar el archivo en memoria"""
+    with open(path, newline='', encoding=encoding) as csv_file:
+        reader = csv.DictReader(csv_file)
+        for row in reader:
+            yield reader.line_num, row
+
+
+def chunks(rows, size):
+    while True:
+        chunk = list(islice(rows, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+class Command(BaseCommand):
+    help = (
+        'Importa pacientes desde un CSV: valida por lotes, hashea contraseñas en un pool '
+        'de procesos e inserta con bulk_create. Las filas con error van a un archivo de rechazos.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('csv_path', help='CSV con encabezados (email, first_name, last_name, ci, ...)')
+        parser.add_argument('--chunk-size', type=int, default=500, help='Filas por lote')
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=os.cpu_count() or 1,
+            help='Procesos para hashear contraseñas'
+        )
+        parser.add_argument('--rejects', help='CSV de rechazos (por defecto <csv>.rejects.csv)')
+        parser.add_argument('--encoding', default='utf-8-sig')
+        parser.add_argument('--dry-run', action='store_true', help='Solo validar, sin hashear ni insertar')
+
+    def handle(self, *args, **options):
+        path = options['csv_path']
+        if not os.path.exists(path):
+            raise CommandError(f'No existe el archivo {path}')
+
+        self.rejects_path = options['rejects'] or f'{path}.rejects.csv'
+        self.rejects_file = self.rejects_writer = None
+        self.seen = {field: set() for field in UNIQUE_FIELDS}
+        self.user_serializer = PatientImportSerializer()
+        self.profile_serializer = PatientProfileSerializer()
+
+        created = rejected = total = 0
+        start = time.perf_counter()
+        executor = None
+        if not options['dry_run'] and options['workers'] > 1:
+            executor = create_pool(options['workers'])
+
+        try:
+            for chunk in chunks(read_rows(path, options['encoding']), options['chunk_size']):
+                total += len(chunk)
+                accepted = self.validate_chunk(chunk)
+                rejected += len(chunk) - len(accepted)
+                if accepted and not options['dry_run']:
+                    self.hash_passwords(accepted, executor)
+                    inserted = self.insert(accepted)
+                    created += inserted
+                    rejected += len(accepted) - inserted
+                else:
+                    created += len(accepted)
+
+                elapsed = time.perf_counter() - start
+                self.stdout.write(f'{total} filas procesadas ({total / elapsed:.0f} filas/s)')
+        finally:
+            if executor is not None:
+                executor.shutdown()
+            if self.rejects_file is not None:
+                self.rejects_file.close()
+
+        elapsed = time.perf_counter() - start
+        action = 'válidos' if options['dry_run'] else 'importados'
+        self.stdout.write(self.style.SUCCESS(
+            f'✅ {created} pacientes {action}, {rejected} rechazados de {total} filas '
+            f'en {elapsed:.1f}s ({total / elapsed if elapsed else 0:.0f} filas/s)'
+        ))
+        if rejected:
+            self.stdout.write(self.style.WARNING(f'Rechazos en {self.rejects_path}'))
+
+    def validate_chunk(self, chunk):
+        """Valida cada fila y la unicidad del lote (una consulta); devuelve las aceptadas"""
+        candidates = []
+        for line, row in chunk:
+            if None in row:
+                self.reject(line, row, {'non_field_errors': ['La fila tiene más columnas que el encabezado']})
+                continue
+            values = {key: value.strip() for key, value in row.items() if value and value.strip()}
+            user_values = {key: value for key, value in values.items() if key not in PROFILE_COLUMNS}
+            profile_values = {key: value for key, value in values.items() if key in PROFILE_COLUMNS}
+            try:
+                user_data = self.user_serializer.run_validation(user_values)
+                profile_data = self.profile_serializer.run_validation(profile_values)
+            except serializers.ValidationError as exc:
+                self.reject(line, row, exc.detail)
+                continue
+
+            user_data['email'] = User.objects.normalize_email(user_data['email'])
+            user_data.setdefault('username', user_data['email'].split('@')[0])
+            candidates.append((line, row, user_data, profile_data))
+
+        existing = self.existing_values(candidates)
+        accepted = []
+        for line, row, user_data, profile_data in candidates:
+            errors = {}
+            for field, message in UNIQUE_FIELDS.items():
+                value = user_data.get(field)
+                if value and (value in existing[field] or value in self.seen[field]):
+                    errors[field] = [message]
+            if errors:
+                self.reject(line, row, errors)
+                continue
+            for field in self.seen:
+                if user_data.get(field):
+                    self.seen[field].add(user_data[field])
+            accepted.append((line, row, user_data, profile_data))
+        return accepted
+
+    def existing_values(self, candidates):
+        existing = {field: set() for field in UNIQUE_FIELDS}
+        lookups = {
+            field: [data[field] for _, _, data, _ in candidates if data.get(field)]
+            for field in existing
+        }
+        condition = Q()
+        for field, values in lookups.items():
+            if values:
+                condition |= Q(**{f'{field}__in': values})
+        if not condition:
+            return existing
+        for email, ci, username in User.objects.filter(condition).values_list('email', 'ci', 'username'):
+            existing['email'].add(email)
+            existing['ci'].add(ci)
+            existing['username'].add(username)
+        return existing
+
+    def hash_passwords(self, accepted, executor):
+        passwords = [user_data.pop('password', None) for _, _, user_data, _ in accepted]
+        if executor is None:
+            hashes = map(make_password, passwords)
+        else:
+            hashes = executor.map(make_password, passwords, chunksize=max(1, len(passwords) // 16))
+        for (_, _, user_data, _), password_hash in zip(accepted, hashes):
+            user_data['password'] = password_hash
+
+    def insert(self, accepted):
+        """bulk_create del lote; si otro proceso registró alguno de los datos, fila por fila"""
+        try:
+            with transaction.atomic():
+                users = User.objects.bulk_create([
+                    User(user_type='patient', **user_data) for _, _, user_data, _ in accepted
+                ])
+                PatientProfile.objects.bulk_create([
+                    PatientProfile(user=user, **profile_data)
+                    for user, (_, _, _, profile_data) in zip(users, accepted)
+                ])
+            return len(users)
+        except IntegrityError:
+            pass
+
+        inserted = 0
+        for line, row, user_data, profile_data in accepted:
+            data = dict(user_data, user_type='patient')
+            password_hash = data.pop('password')
+            try:
+                with transaction.atomic():
+                    user = create_user_with_hash(data, password_hash)
+                    PatientProfile.objects.create(user=user, **profile_data)
+            except serializers.ValidationError as exc:
+                self.reject(line, row, exc.detail)
+                continue
+            except IntegrityError as exc:
+                # Restricción que no es de unicidad de email/ci/username
+                self.reject(line, row, {'non_field_errors': [str(exc)]})
+                continue
+            inserted += 1
+        return inserted
+
+    def reject(self, line, row, errors):
+        if self.rejects_writer is None:
+            self.rejects_file = open(self.rejects_path, 'w', newline='', encoding='utf-8')
+            fieldnames = ['line', 'errors'] + [key for key in row if key is not None]
+            self.rejects_writer = csv.DictWriter(self.rejects_file, fieldnames=fieldnames, extrasaction='ignore')
+            self.rejects_writer.writeheader()
+        self.rejects_writer.writerow({
+            **{key: value for key, value in row.items() if key is not None},
+            'line': line,
+            'errors': json.dumps(errors, ensure_ascii=False),
+        })
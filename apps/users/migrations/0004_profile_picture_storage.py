@@ -0,0 +1,19 @@
+# Generated by Django 5.2.6 on 2026-10-19 02:13
+
+import apps.users.pictures
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0003_alter_customuser_managers'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='customuser',
+            name='profile_picture',
+            field=models.ImageField(blank=True, null=True, storage=apps.users.pictures.picture_storage, upload_to='profile_pictures/', verbose_name='Foto de perfil'),
+        ),
+    ]
@@ -3,6 +3,7 @@
 from django.contrib.auth.models import AbstractUser, BaseUserManager
 from django.db import models
 from django.core.validators import RegexValidator
+from .pictures import picture_storage
 
 class CustomUserManager(BaseUserManager):
     """
@@ -88,6 +89,7 @@ class CustomUser(AbstractUser):
     # Campos opcionales
     profile_picture = models.ImageField(
         upload_to='profile_pictures/', 
+        storage=picture_storage,
         blank=True, 
         null=True,
         verbose_name='Foto de perfil'
@@ -0,0 +1,177 @@
+# apps/users/pictures.py
+
+import hashlib
+import io
+import re
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.files.storage import FileSystemStorage
+from django.core.files.uploadhandler import FileUploadHandler
+from django.http.multipartparser import MultiPartParserError
+from django.urls import reverse
+from PIL import Image, ImageOps
+from rest_framework import serializers
+
+# Fotos de perfil: al subirse se validan con Pillow, se corrige la orientación,
+# se limitan a MAX_DIMENSION y se re-codifican (sin EXIF) en PICTURE_FORMAT.
+# El archivo se guarda como profile_pictures/<sha256>.<ext>: el nombre depende
+# solo del contenido, así la misma imagen se guarda una vez y las URLs nunca
+# cambian de contenido (caché de un año, immutable).
+# Las miniaturas (THUMBNAIL_SIZES, cuadradas) se generan la primera vez que se
+# piden y quedan en profile_pictures/thumbs/; su nombre se cachea.
+PICTURE_DIR = 'profile_pictures'
+THUMBNAIL_SIZES = tuple(getattr(settings, 'PROFILE_PICTURE_THUMBNAIL_SIZES', (64, 256)))
+PICTURE_FORMAT = getattr(settings, 'PROFILE_PICTURE_FORMAT', 'WEBP')
+MAX_DIMENSION = getattr(settings, 'PROFILE_PICTURE_MAX_DIMENSION', 1024)
+MAX_PIXELS = getattr(settings, 'PROFILE_PICTURE_MAX_PIXELS', 40_000_000)
+QUALITY = 85
+EXTENSIONS = {'WEBP': 'webp', 'JPEG': 'jpg'}
+CONTENT_TYPES = {'webp': 'image/webp', 'jpg': 'image/jpeg'}
+CACHE_CONTROL = 'public, max-age=31536000, immutable'
+
+_NAME_RE = re.compile(rf'^{PICTURE_DIR}/(?P<digest>[0-9a-f]{{32}})\.(?:webp|jpg)$')
+_DIGEST_RE = re.compile(r'^[0-9a-f]{32}$')
+
+
+class PictureNotFound(Exception):
+    """No existe la imagen original para ese digest, o el tamaño no está permitido"""
+
+
+class ContentAddressedStorage(FileSystemStorage):
+    """MEDIA_ROOT, pero un nombre existente ya tiene el mismo contenido: no se reescribe ni se renombra"""
+
+    def get_available_name(self, name, max_length=None):
+        return name
+
+    def _save(self, name, content):
+        if self.exists(name):
+            return name
+        # Si otro request escribe el mismo nombre a la vez, el contenido es idéntico
+        return super()._save(name, content)
+
+
+_storage = ContentAddressedStorage(allow_overwrite=True)
+
+
+def picture_storage():
+    return _storage
+
+
+class SizeLimitedUploadHandler(FileUploadHandler):
+    """
+    Corta la subida en cuanto un archivo supera FILE_UPLOAD_MAX_SIZE, sin leer
+    (ni escribir a disco) el resto del cuerpo. Va primero en FILE_UPLOAD_HANDLERS.
+    """
+
+    def handle_raw_input(self, input_data, META, content_length, boundary, encoding=None):
+        self.max_size = settings.FILE_UPLOAD_MAX_SIZE
+        # Campos que no son archivos: como mucho DATA_UPLOAD_MAX_MEMORY_SIZE
+        limit = self.max_size + (settings.DATA_UPLOAD_MAX_MEMORY_SIZE or 0)
+        if content_length and content_length > limit:
+            raise MultiPartParserError(self.error_message())
+
+    def new_file(self, *args, **kwargs):
+        super().new_file(*args, **kwargs)
+        self.received = 0
+
+    def receive_data_chunk(self, raw_data, start):
+        self.received += len(raw_data)
+        if self.received > self.max_size:
+            raise MultiPartParserError(self.error_message())
+        return raw_data
+
+    def file_complete(self, file_size):
+        return None
+
+    def error_message(self):
+        if self.max_size >= 1024 * 1024:
+            return f'El archivo supera el tamaño máximo de {self.max_size // (1024 * 1024)} MB'
+        return f'El archivo supera el tamaño máximo de {self.max_size // 1024} KB'
+
+
+def _encode(image, image_format=PICTURE_FORMAT):
+    if image.mode not in ('RGB', 'RGBA'):
+        has_alpha = 'A' in image.getbands() or 'transparency' in image.info
+        image = image.convert('RGBA' if has_alpha else 'RGB')
+    if image_format == 'JPEG' and image.mode == 'RGBA':
+        background = Image.new('RGB', image.size, 'white')
+        background.paste(image, mask=image.getchannel('A'))
+        image = background
+
+    buffer = io.BytesIO()
+    image.save(buffer, format=image_format, quality=QUALITY)
+    return buffer.getvalue()
+
+
+def process_picture(uploaded):
+    """
+    Valida y normaliza una imagen subida. Devuelve un ContentFile con nombre
+    <sha256>.<ext> para asignar a profile_picture (upload_to agrega el directorio).
+    """
+    try:
+        uploaded.seek(0)
+        image = Image.open(uploaded)
+        if image.width * image.height > MAX_PIXELS:
+            raise serializers.ValidationError('La imagen tiene demasiados píxeles')
+        image = ImageOps.exif_transpose(image)
+        image.thumbnail((MAX_DIMENSION, MAX_DIMENSION), Image.Resampling.LANCZOS)
+        content = _encode(image)
+    except (OSError, ValueError, Image.DecompressionBombError):
+        raise serializers.ValidationError('El archivo no es una imagen válida')
+
+    digest = hashlib.sha256(content).hexdigest()[:32]
+    return ContentFile(content, name=f'{digest}.{EXTENSIONS[PICTURE_FORMAT]}')
+
+
+def picture_digest(name):
+    """Digest de un nombre guardado por process_picture, o None (sin foto o subida anterior)"""
+    match = _NAME_RE.match(name or '')
+    return match.group('digest') if match else None
+
+
+def thumbnail_urls(name):
+    """{'64': url, '256': url} para el nombre de profile_picture, o None"""
+    digest = picture_digest(name)
+    if digest is None:
+        return None
+    return {
+        str(size): reverse('profile_picture_thumbnail', args=[digest, size])
+        for size in THUMBNAIL_SIZES
+    }
+
+
+def _original_name(digest):
+    for extension in EXTENSIONS.values():
+        name = f'{PICTURE_DIR}/{digest}.{extension}'
+        if _storage.exists(name):
+            return name
+    raise PictureNotFound()
+
+
+def get_thumbnail(digest, size):
+    """Nombre en storage de la miniatura; la genera si no existe"""
+    if size not in THUMBNAIL_SIZES or not _DIGEST_RE.match(digest):
+        raise PictureNotFound()
+
+    cache_key = f'pictures:thumb:{digest}:{size}'
+    name = cache.get(cache_key)
+    if name:
+        return name
+
+    extension = EXTENSIONS[PICTURE_FORMAT]
+    name = f'{PICTURE_DIR}/thumbs/{digest}_{size}.{extension}'
+    if not _storage.exists(name):
+        with _storage.open(_original_name(digest)) as original:
+            image = Image.open(original)
+            image.load()
+        thumbnail = ImageOps.fit(image, (size, size), Image.Resampling.LANCZOS)
+        name = _storage.save(name, ContentFile(_encode(thumbnail)))
+
+    # El contenido de un digest no cambia: sin expiración
+    cache.set(cache_key, name, None)
+    return name
+
+
+def content_type(name):
+    return CONTENT_TYPES.get(name.rsplit('.', 1)[-1], 'application/octet-stream')
@@ -0,0 +1,114 @@
+# apps/users/registration.py
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.db import IntegrityError, transaction
+from django.db.models import Q
+from rest_framework import serializers
+from rest_framework.validators import UniqueValidator
+
+User = get_user_model()
+
+# Registro de usuarios: unicidad de email, ci y username en una sola consulta,
+# contraseña hasheada una vez y un solo INSERT. Si dos registros concurrentes
+# pasan la validación, la restricción UNIQUE de la BD decide y el IntegrityError
+# se traduce a los mismos errores por campo que la validación.
+UNIQUE_FIELDS = {
+    'email': 'Este email ya está registrado',
+    'ci': 'Esta cédula ya está registrada',
+    'username': 'Este nombre de usuario ya existe',
+}
+
+
+def unique_conflicts(attrs):
+    """Errores por campo para los valores de attrs que ya existen (una consulta)"""
+    lookups = {field: attrs[field] for field in UNIQUE_FIELDS if attrs.get(field)}
+    if not lookups:
+        return {}
+
+    condition = Q()
+    for field, value in lookups.items():
+        condition |= Q(**{field: value})
+
+    errors = {}
+    for row in User.objects.filter(condition).values(*lookups):
+        for field, value in lookups.items():
+            if row[field] == value:
+                errors[field] = [UNIQUE_FIELDS[field]]
+    return errors
+
+
+def create_user_with_hash(data, password_hash):
+    """
+    Crea el usuario con la contraseña ya hasheada: un solo INSERT.
+    Lanza ValidationError con errores por campo si otro registro ganó la carrera.
+    """
+    data = dict(data)
+    data['email'] = User.objects.normalize_email(data['email'])
+    if not data.get('username'):
+        data['username'] = data['email'].split('@')[0]
+
+    user = User(**data)
+    user.password = password_hash
+    try:
+        with transaction.atomic():
+            user.save(force_insert=True)
+    except IntegrityError:
+        # La fila que causó el conflicto ya está confirmada: se busca cuál es
+        errors = unique_conflicts(data)
+        if not errors:
+            raise
+        raise serializers.ValidationError(errors)
+    return user
+
+
+class WithoutUniqueValidatorsMixin:
+    """
+    Quita los UniqueValidator que DRF agrega a cada campo único de un
+    ModelSerializer (una consulta por campo); la unicidad se verifica aparte.
+    """
+
+    def get_fields(self):
+        fields = super().get_fields()
+        for name in UNIQUE_FIELDS:
+            if name in fields:
+                fields[name].validators = [
+                    validator for validator in fields[name].validators
+                    if not isinstance(validator, UniqueValidator)
+                ]
+        return fields
+
+
+class RegistrationSerializerMixin(WithoutUniqueValidatorsMixin):
+    """
+    Para ModelSerializer de registro (campos password y password_confirm).
+    La unicidad se verifica con unique_conflicts en validate().
+    """
+
+    def validate(self, attrs):
+        attrs = super().validate(attrs)
+        if attrs['password'] != attrs['password_confirm']:
+            raise serializers.ValidationError("Las contraseñas no coinciden")
+        errors = unique_conflicts(attrs)
+        if errors:
+            raise serializers.ValidationError(errors)
+        return attrs
+
+    def user_data(self, validated_data):
+        data = dict(validated_data)
+        data.pop('password_confirm')
+        data.pop('password')
+        data['user_type'] = 'patient'  # Solo pacientes se registran por la app
+        return data
+
+    def create(self, validated_data):
+        return create_user_with_hash(
+            self.user_data(validated_data), make_password(validated_data['password'])
+        )
+
+    def save_with_password_hash(self, password_hash):
+        """
+        Como save(), con la contraseña ya hasheada fuera del request (ver hashing.py)
+        """
+        self.instance = create_user_with_hash(self.user_data(self.validated_data), password_hash)
+        return self.instance
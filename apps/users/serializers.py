@@ -3,10 +3,30 @@
 from rest_framework import serializers
 from django.contrib.auth import get_user_model
 from .models import PatientProfile
+from .pictures import process_picture, thumbnail_urls
+from .registration import RegistrationSerializerMixin, WithoutUniqueValidatorsMixin
 from datetime import date
 
 User = get_user_model()
 
+
+class ProfilePictureThumbnailsField(serializers.ReadOnlyField):
+    """
+    URLs de las miniaturas de la foto de perfil por tamaño: {'64': url, '256': url}.
+    None si no hay foto (o es anterior a pictures.py). Se arman sin consultar el storage.
+    """
+    def __init__(self, **kwargs):
+        kwargs.setdefault('source', 'profile_picture')
+        super().__init__(**kwargs)
+
+    def to_representation(self, value):
+        urls = thumbnail_urls(value.name if value else None)
+        request = self.context.get('request')
+        if urls and request is not None:
+            urls = {size: request.build_absolute_uri(url) for size, url in urls.items()}
+        return urls
+
+
 class UserProfileSerializer(serializers.ModelSerializer):
     """
     Serializer para actualizar perfil básico del usuario - CU-05
@@ -21,6 +41,12 @@ class UserProfileSerializer(serializers.ModelSerializer):
         )
         read_only_fields = ('email', 'username', 'user_type', 'ci')  # CI no se puede cambiar una vez creado
     
+    def validate_profile_picture(self, value):
+        """Re-codifica la imagen y le da un nombre según su contenido (pictures.py)"""
+        if not value:
+            return value
+        return process_picture(value)
+    
     def validate_date_of_birth(self, value):
         """Validar que la fecha de nacimiento sea lógica"""
         today = date.today()
@@ -64,6 +90,7 @@ class UserDetailSerializer(serializers.ModelSerializer):
     patient_profile = PatientProfileSerializer(read_only=True)
     full_name = serializers.SerializerMethodField()
     age = serializers.ReadOnlyField()
+    profile_picture_thumbnails = ProfilePictureThumbnailsField()
     
     class Meta:
         model = User
@@ -71,7 +98,7 @@ class UserDetailSerializer(serializers.ModelSerializer):
             'id', 'email', 'username', 'first_name', 'last_name', 
             'full_name', 'user_type', 'ci', 'phone', 'gender',
             'address', 'date_of_birth', 'age', 'profile_picture', 
-            'is_verified', 'is_active_patient', 'date_joined', 
+            'profile_picture_thumbnails', 'is_verified', 'is_active_patient', 'date_joined', 
             'patient_profile'
         )
         read_only_fields = (
@@ -83,7 +110,7 @@ class UserDetailSerializer(serializers.ModelSerializer):
         return obj.get_full_name()
 
 
-class PatientRegistrationSerializer(serializers.ModelSerializer):
+class PatientRegistrationSerializer(RegistrationSerializerMixin, serializers.ModelSerializer):
     """
     Serializer específico para registro de pacientes - CU-01
     """
@@ -99,21 +126,6 @@ class PatientRegistrationSerializer(serializers.ModelSerializer):
             'password', 'password_confirm'
         )
     
-    def validate(self, attrs):
-        if attrs['password'] != attrs['password_confirm']:
-            raise serializers.ValidationError("Las contraseñas no coinciden")
-        return attrs
-    
-    def validate_ci(self, value):
-        if User.objects.filter(ci=value).exists():
-            raise serializers.ValidationError("Esta cédula ya está registrada")
-        return value
-    
-    def validate_email(self, value):
-        if User.objects.filter(email=value).exists():
-            raise serializers.ValidationError("Este email ya está registrado")
-        return value
-    
     def validate_date_of_birth(self, value):
         today = date.today()
         age = today.year - value.year - ((today.month, today.day) < (value.month, value.day))
@@ -124,17 +136,22 @@ class PatientRegistrationSerializer(serializers.ModelSerializer):
             raise serializers.ValidationError("Edad no válida")
         
         return value
+
+
+class PatientImportSerializer(WithoutUniqueValidatorsMixin, serializers.ModelSerializer):
+    """
+    Fila de importación masiva de pacientes (import_patients). La unicidad se
+    verifica por lote; sin contraseña el paciente la define con el reset.
+    """
+    password = serializers.CharField(write_only=True, min_length=8, required=False)
     
-    def create(self, validated_data):
-        validated_data.pop('password_confirm')
-        password = validated_data.pop('password')
-        validated_data['user_type'] = 'patient'  # Forzar tipo paciente
-        
-        user = User.objects.create_user(**validated_data)
-        user.set_password(password)
-        user.save()
-        
-        return user
+    class Meta:
+        model = User
+        fields = (
+            'email', 'username', 'first_name', 'last_name', 'ci',
+            'phone', 'gender', 'address', 'date_of_birth', 'password'
+        )
+        extra_kwargs = {'username': {'required': False}}
 
 
 class PatientCompleteProfileSerializer(serializers.ModelSerializer):
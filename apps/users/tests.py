@@ -1,3 +1,474 @@
-from django.test import TestCase
+# apps/users/tests.py
 
-# Create your tests here.
+import csv
+import io
+import json
+import os
+import shutil
+import tempfile
+from datetime import date, time, timedelta
+from decimal import Decimal
+from unittest import mock
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import CommandError, call_command
+from django.db import IntegrityError
+from django.test import TestCase, override_settings
+from PIL import Image
+from rest_framework import serializers
+from rest_framework.test import APIClient
+from apps.appointments.models import Appointment, PsychologistAvailability, Review
+from apps.authentication.serializers import UserRegistrationSerializer
+from apps.professionals.models import ProfessionalProfile, Specialization
+from . import pictures
+from apps.authentication import hashing
+from .management.commands import bench_endpoints, import_patients
+from .models import PatientProfile
+from .registration import create_user_with_hash, unique_conflicts
+
+User = get_user_model()
+
+
+def registration_data(**fields):
+    data = {
+        'email': 'ana@example.com',
+        'username': 'ana',
+        'first_name': 'Ana',
+        'last_name': 'Paz',
+        'ci': '1234567',
+        'password': 'Clave-segura-123',
+        'password_confirm': 'Clave-segura-123',
+    }
+    data.update(fields)
+    return data
+
+
+class RegistrationTests(TestCase):
+    def setUp(self):
+        self.existing = User.objects.create_user(
+            email='luis@example.com', first_name='Luis', last_name='Rojas', ci='7654321', username='luis'
+        )
+
+    def test_register_inserts_once_with_usable_password(self):
+        response = APIClient().post('/api/auth/register/', registration_data(), format='json')
+
+        self.assertEqual(response.status_code, 201, response.content)
+        user = User.objects.get(email='ana@example.com')
+        self.assertEqual((user.username, user.user_type), ('ana', 'patient'))
+        self.assertTrue(user.check_password('Clave-segura-123'))
+
+    def test_uniqueness_checked_in_one_query(self):
+        serializer = UserRegistrationSerializer(data=registration_data(
+            email='luis@example.com', ci='7654321', username='luis'
+        ))
+        with self.assertNumQueries(1):
+            self.assertFalse(serializer.is_valid())
+        self.assertEqual(set(serializer.errors), {'email', 'ci', 'username'})
+        self.assertEqual(serializer.errors['ci'], ['Esta cédula ya está registrada'])
+
+    def test_only_conflicting_fields_are_reported(self):
+        errors = unique_conflicts({'email': 'nueva@example.com', 'ci': '7654321', 'username': 'otro'})
+        self.assertEqual(list(errors), ['ci'])
+        self.assertEqual(unique_conflicts({'email': 'nueva@example.com'}), {})
+
+    def test_race_maps_integrity_error_to_field_errors(self):
+        # Validó antes de que se confirmara el otro registro
+        data = registration_data(email='luis@example.com', username='otro')
+        data.pop('password')
+        data.pop('password_confirm')
+        with self.assertRaises(serializers.ValidationError) as raised:
+            create_user_with_hash(data, make_password('x'))
+        self.assertEqual(raised.exception.detail, {'email': ['Este email ya está registrado']})
+        self.assertEqual(User.objects.count(), 1)
+
+    def test_duplicate_registration_returns_field_errors(self):
+        response = APIClient().post(
+            '/api/auth/register/', registration_data(email='luis@example.com'), format='json'
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json(), {'email': ['Este email ya está registrado']})
+
+
+def image_file(size=(2000, 1000), image_format='PNG', name='foto.png', color='red'):
+    buffer = io.BytesIO()
+    Image.new('RGB', size, color).save(buffer, format=image_format)
+    return SimpleUploadedFile(name, buffer.getvalue(), content_type=f'image/{image_format.lower()}')
+
+
+class ProfilePictureTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        settings_override = override_settings(MEDIA_ROOT=media_root)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+        self.user = User.objects.create_user(email='ana@example.com', first_name='Ana', last_name='Paz')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def upload(self, file):
+        return self.client.patch('/api/users/profile/', {'profile_picture': file}, format='multipart')
+
+    def test_process_picture_resizes_and_names_by_content(self):
+        processed = pictures.process_picture(image_file())
+        self.assertRegex(processed.name, r'^[0-9a-f]{32}\.webp$')
+        image = Image.open(io.BytesIO(processed.read()))
+        self.assertEqual((image.format, image.size), ('WEBP', (1024, 512)))
+        self.assertEqual(pictures.process_picture(image_file()).name, processed.name)
+
+    def test_invalid_image_is_rejected(self):
+        response = self.upload(SimpleUploadedFile('foto.png', b'no es una imagen', content_type='image/png'))
+        self.assertEqual(response.status_code, 400)
+
+    @override_settings(FILE_UPLOAD_MAX_SIZE=1024)
+    def test_upload_over_size_limit_is_rejected(self):
+        response = self.upload(image_file(size=(400, 400), image_format='BMP', name='foto.bmp'))
+        self.assertEqual(response.status_code, 400)
+        self.user.refresh_from_db()
+        self.assertFalse(self.user.profile_picture)
+
+    def test_upload_exposes_thumbnail_urls_generated_lazily(self):
+        response = self.upload(image_file())
+        self.assertEqual(response.status_code, 200, response.content)
+        self.user.refresh_from_db()
+        digest = pictures.picture_digest(self.user.profile_picture.name)
+        self.assertIsNotNone(digest)
+
+        urls = response.json()['user']['profile_picture_thumbnails']
+        self.assertEqual(set(urls), {'64', '256'})
+        self.assertFalse(pictures.picture_storage().exists(f'profile_pictures/thumbs/{digest}_64.webp'))
+
+        thumbnail = APIClient().get(urls['64'])
+        self.assertEqual(thumbnail.status_code, 200)
+        self.assertEqual(thumbnail['Cache-Control'], pictures.CACHE_CONTROL)
+        self.assertEqual(thumbnail['Content-Type'], 'image/webp')
+        image = Image.open(io.BytesIO(b''.join(thumbnail.streaming_content)))
+        self.assertEqual(image.size, (64, 64))
+        self.assertTrue(pictures.picture_storage().exists(f'profile_pictures/thumbs/{digest}_64.webp'))
+
+    def test_unknown_thumbnail_returns_404(self):
+        digest = '0' * 32
+        self.assertEqual(APIClient().get(f'/api/users/pictures/{digest}/64/').status_code, 404)
+        self.upload(image_file())
+        self.user.refresh_from_db()
+        digest = pictures.picture_digest(self.user.profile_picture.name)
+        self.assertEqual(APIClient().get(f'/api/users/pictures/{digest}/100/').status_code, 404)
+
+
+class MeBootstrapTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.patient = User.objects.create_user(email='luis@example.com', first_name='Luis', last_name='Rojas')
+        PatientProfile.objects.create(user=self.patient, emergency_contact_name='Rosa')
+        self.psychologist = User.objects.create_user(
+            email='psico@example.com', first_name='Ana', last_name='Paz', user_type='professional'
+        )
+        profile = ProfessionalProfile.objects.create(
+            user=self.psychologist,
+            license_number='LIC-1',
+            bio='Bio',
+            education='Psicología',
+            experience_years=5,
+            consultation_fee=Decimal('150.00'),
+        )
+        profile.specializations.add(Specialization.objects.create(name='Ansiedad'))
+
+    def appointment(self, days, status='pending', hour=10):
+        return Appointment.objects.create(
+            patient=self.patient,
+            psychologist=self.psychologist,
+            appointment_date=date.today() + timedelta(days=days),
+            start_time=time(hour, 0),
+            end_time=time(hour + 1, 0),
+            status=status,
+        )
+
+    def me(self, user, **params):
+        client = APIClient()
+        client.force_authenticate(user)
+        response = client.get('/api/users/me/', params)
+        self.assertEqual(response.status_code, 200, response.content)
+        return response.json()
+
+    def test_patient_sections_and_counts(self):
+        self.appointment(3, 'confirmed')
+        self.appointment(1)
+        completed = self.appointment(-7, 'completed')
+        self.appointment(-14, 'completed', hour=12)
+        Review.objects.create(
+            appointment=completed, patient=self.patient, psychologist=self.psychologist, rating=5
+        )
+
+        data = self.me(self.patient)
+        self.assertEqual(set(data), {'user', 'profile', 'upcoming_appointments', 'counts'})
+        self.assertEqual(data['profile']['emergency_contact_name'], 'Rosa')
+        self.assertEqual(
+            [item['appointment_date'] for item in data['upcoming_appointments']],
+            [str(date.today() + timedelta(days=days)) for days in (1, 3)]
+        )
+        self.assertEqual(data['counts'], {
+            'upcoming_appointments': 2, 'pending_confirmations': 0, 'pending_reviews': 1
+        })
+
+    def test_professional_profile_and_pending_confirmations(self):
+        self.appointment(1)
+        data = self.me(self.psychologist)
+        self.assertEqual(data['profile']['license_number'], 'LIC-1')
+        self.assertEqual(data['counts']['pending_confirmations'], 1)
+
+    def test_query_budget_does_not_grow_with_appointments(self):
+        self.appointment(1)
+        self.me(self.psychologist)  # plantilla de horarios en caché
+        with self.assertNumQueries(5):
+            self.me(self.psychologist)
+        for days in range(2, 8):
+            self.appointment(days)
+        with self.assertNumQueries(5):
+            self.me(self.psychologist)
+
+    def test_sparse_sections(self):
+        with self.assertNumQueries(1):
+            data = self.me(self.patient, include='counts')
+        self.assertEqual(list(data), ['counts'])
+
+    def test_unknown_section_returns_400(self):
+        client = APIClient()
+        client.force_authenticate(self.patient)
+        response = client.get('/api/users/me/', {'include': 'user,mensajes'})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('mensajes', response.json()['error'])
+
+
+class ImportPatientsTests(TestCase):
+    columns = ['email', 'first_name', 'last_name', 'ci', 'emergency_contact_name']
+
+    def setUp(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory, ignore_errors=True)
+        self.path = os.path.join(directory, 'pacientes.csv')
+
+    def write(self, rows):
+        with open(self.path, 'w', newline='', encoding='utf-8') as csv_file:
+            writer = csv.writer(csv_file)
+            writer.writerow(self.columns)
+            writer.writerows(rows)
+
+    def patient_rows(self, count, start=0):
+        return [
+            [f'p{i}@example.com', 'Ana', 'Paz', str(1000000 + i), 'Rosa']
+            for i in range(start, start + count)
+        ]
+
+    def run_import(self, chunk_size=500):
+        out = io.StringIO()
+        call_command('import_patients', self.path, chunk_size=chunk_size, workers=1, stdout=out)
+        return out.getvalue()
+
+    def rejects(self):
+        with open(f'{self.path}.rejects.csv', newline='', encoding='utf-8') as csv_file:
+            return {int(row['line']): json.loads(row['errors']) for row in csv.DictReader(csv_file)}
+
+    def test_imports_in_chunks(self):
+        self.write(self.patient_rows(7))
+        output = self.run_import(chunk_size=3)
+
+        self.assertIn('✅ 7 pacientes importados, 0 rechazados de 7 filas', output)
+        self.assertEqual(output.count('filas procesadas'), 3)
+        self.assertEqual(PatientProfile.objects.filter(user__user_type='patient').count(), 7)
+        self.assertFalse(os.path.exists(f'{self.path}.rejects.csv'))
+
+    def test_invalid_rows_and_duplicates_within_file_are_rejected(self):
+        rows = self.patient_rows(2)
+        rows.append(['p0@example.com', 'Otra', 'Paz', '2000000', ''])  # email repetido
+        rows.append(['p9@example.com', 'Ana', 'Paz', '1000001', ''])   # ci repetido
+        rows.append(['no-es-email', 'Ana', 'Paz', '3000000', ''])
+        self.write(rows)
+
+        output = self.run_import(chunk_size=2)
+        self.assertIn('✅ 2 pacientes importados, 3 rechazados de 5 filas', output)
+        rejects = self.rejects()
+        self.assertEqual(set(rejects), {4, 5, 6})
+        self.assertEqual(rejects[4], {
+            'email': ['Este email ya está registrado'],
+            'username': ['Este nombre de usuario ya existe'],
+        })
+        self.assertEqual(rejects[5], {'ci': ['Esta cédula ya está registrada']})
+        self.assertIn('email', rejects[6])
+
+    def test_existing_user_is_rejected(self):
+        User.objects.create_user(email='p1@example.com', first_name='Luis', last_name='Rojas')
+        self.write(self.patient_rows(2))
+        self.assertIn('✅ 1 pacientes importados, 1 rechazados', self.run_import())
+        self.assertEqual(list(self.rejects()), [3])
+
+    def test_race_falls_back_to_row_by_row_insert(self):
+        self.write(self.patient_rows(3))
+        # Otro proceso insertó p1 después de validar el lote
+        User.objects.create_user(email='p1@example.com', first_name='Luis', last_name='Rojas')
+        original = import_patients.create_user_with_hash
+
+        def create_user_with_hash(data, password_hash):
+            if data['email'] == 'p2@example.com':
+                raise IntegrityError('CHECK constraint failed')
+            return original(data, password_hash)
+
+        no_existing = {field: set() for field in import_patients.UNIQUE_FIELDS}
+        with mock.patch.object(import_patients.Command, 'existing_values', return_value=no_existing), \
+                mock.patch.object(import_patients, 'create_user_with_hash', create_user_with_hash):
+            output = self.run_import()
+
+        self.assertIn('✅ 1 pacientes importados, 2 rechazados de 3 filas', output)
+        self.assertTrue(PatientProfile.objects.filter(user__email='p0@example.com').exists())
+        self.assertEqual(User.objects.count(), 2)
+        rejects = self.rejects()
+        self.assertIn('email', rejects[3])
+        self.assertEqual(rejects[4], {'non_field_errors': ['CHECK constraint failed']})
+
+
+class GenerateDatasetTests(TestCase):
+    options = {'patients': 20, 'psychologists': 4, 'appointments': 150, 'weeks': 4, 'batch_size': 40}
+
+    def generate(self, **options):
+        out = io.StringIO()
+        call_command('generate_dataset', stdout=out, **{**self.options, **options})
+        return out.getvalue()
+
+    def snapshot(self):
+        return list(Appointment.objects.order_by(
+            'psychologist__email', 'appointment_date', 'start_time'
+        ).values_list('psychologist__email', 'patient__email', 'appointment_date', 'start_time', 'status'))
+
+    def test_generates_requested_counts_in_batches(self):
+        self.assertIn('✅ Dataset generado', self.generate())
+        self.assertEqual(User.objects.filter(user_type='patient').count(), 20)
+        self.assertEqual(PatientProfile.objects.count(), 20)
+        self.assertEqual(ProfessionalProfile.objects.count(), 4)
+        self.assertEqual(Appointment.objects.count(), 150)
+
+    def test_appointments_fit_availability_without_overlaps(self):
+        self.generate()
+        blocks = {}
+        for availability in PsychologistAvailability.objects.all():
+            blocks.setdefault((availability.psychologist_id, availability.weekday), []).append(
+                (availability.start_time, availability.end_time)
+            )
+        booked = {}
+        for appointment in Appointment.objects.all():
+            day_blocks = blocks[(appointment.psychologist_id, appointment.appointment_date.weekday())]
+            self.assertTrue(any(
+                start <= appointment.start_time and appointment.end_time <= end for start, end in day_blocks
+            ))
+            booked.setdefault((appointment.psychologist_id, appointment.appointment_date), []).append(
+                (appointment.start_time, appointment.end_time)
+            )
+        for sessions in booked.values():
+            sessions.sort()
+            for (_, previous_end), (next_start, _) in zip(sessions, sessions[1:]):
+                self.assertLessEqual(previous_end, next_start)
+
+    def test_patients_are_not_double_booked(self):
+        # Pocos pacientes: sin el control se solaparían citas con distintos psicólogos
+        self.generate(patients=3, appointments=200)
+        booked = {}
+        for appointment in Appointment.objects.all():
+            booked.setdefault((appointment.patient_id, appointment.appointment_date), []).append(
+                (appointment.start_time, appointment.end_time)
+            )
+        for sessions in booked.values():
+            sessions.sort()
+            for (_, previous_end), (next_start, _) in zip(sessions, sessions[1:]):
+                self.assertLessEqual(previous_end, next_start)
+
+    def test_same_seed_generates_same_dataset(self):
+        self.generate()
+        first = self.snapshot()
+        self.generate(clear=True)
+        self.assertEqual(self.snapshot(), first)
+        self.generate(clear=True, seed=7)
+        self.assertNotEqual(self.snapshot(), first)
+
+    def test_rating_aggregates_match_reviews(self):
+        self.generate(review_rate=1.0)
+        self.assertTrue(Review.objects.exists())
+        for profile in ProfessionalProfile.objects.all():
+            ratings = list(Review.objects.filter(psychologist_id=profile.user_id).values_list('rating', flat=True))
+            self.assertEqual((profile.rating_sum, profile.total_reviews), (sum(ratings), len(ratings)))
+
+        out = io.StringIO()
+        call_command('reconcile_ratings', dry_run=True, stdout=out)
+        self.assertIn('0 perfiles con desvío', out.getvalue())
+
+    def test_cached_responses_are_invalidated(self):
+        client = APIClient()
+        client.force_authenticate(User.objects.create_user(email='ana@example.com', first_name='Ana', last_name='Paz'))
+        self.assertEqual(client.get('/api/professionals/').json()['count'], 0)
+        self.generate(appointments=0)
+        self.assertEqual(client.get('/api/professionals/').json()['count'], 4)
+
+    def test_existing_prefix_requires_clear(self):
+        self.generate(appointments=0)
+        with self.assertRaises(CommandError):
+            self.generate()
+
+
+class BenchEndpointsTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.command = bench_endpoints.Command(stdout=io.StringIO())
+
+    def result(self, p95_ms, queries):
+        return {'p95_ms': p95_ms, 'queries': queries}
+
+    def test_percentile_nearest_rank(self):
+        values = list(range(1, 101))
+        self.assertEqual(bench_endpoints.percentile(values, 50), 50)
+        self.assertEqual(bench_endpoints.percentile(values, 95), 95)
+        self.assertEqual(bench_endpoints.percentile([7], 99), 7)
+
+    def test_compare_flags_latency_and_query_regressions(self):
+        baseline = {'results': {
+            'lento': self.result(10.0, 3),
+            'ruido': self.result(1.0, 3),
+            'consultas': self.result(10.0, 3),
+            'estable': self.result(10.0, 3),
+            'eliminado': self.result(10.0, 3),
+        }}
+        results = {
+            'lento': self.result(15.0, 3),
+            'ruido': self.result(2.5, 3),  # +150 %, pero por debajo de min_delta_ms
+            'consultas': self.result(10.0, 4),
+            'estable': self.result(11.0, 3),
+        }
+        regressions = self.command.compare(results, baseline, tolerance=0.2, min_delta_ms=2.0)
+        self.assertEqual(regressions, ['lento', 'consultas'])
+
+    def test_unknown_endpoint_is_rejected(self):
+        with self.assertRaises(CommandError):
+            call_command('bench_endpoints', only='no_existe', stdout=io.StringIO())
+
+    def test_measures_every_endpoint_on_seeded_dataset(self):
+        context = self.command.seed({'patients': 10, 'psychologists': 3, 'appointments': 40, 'seed': 42})
+        options = {'iterations': 3, 'warmup': 1}
+        with mock.patch.object(hashing, 'HASHING_WORKERS', 0), override_settings(CACHE_TAGS_ENABLED=False):
+            results = {
+                benchmark[0]: self.command.measure(benchmark, context, options)
+                for benchmark in bench_endpoints.BENCHMARKS
+            }
+        for name, result in results.items():
+            self.assertEqual(result['status'], [200], name)
+            self.assertEqual(result['iterations'], 3)
+            self.assertLessEqual(result['p50_ms'], result['p99_ms'])
+            self.assertGreater(result['queries'], 0, name)
+
+    def test_response_cache_is_bypassed_unless_requested(self):
+        context = self.command.seed({'patients': 10, 'psychologists': 3, 'appointments': 40, 'seed': 42})
+        benchmark = next(item for item in bench_endpoints.BENCHMARKS if item[0] == 'list_professionals')
+        options = {'iterations': 2, 'warmup': 1}
+        with override_settings(CACHE_TAGS_ENABLED=False):
+            cold = self.command.measure(benchmark, context, options)
+        warm = self.command.measure(benchmark, context, options)
+        self.assertGreater(cold['queries'], warm['queries'])
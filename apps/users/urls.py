@@ -3,6 +3,9 @@ from django.urls import path
 from . import views
 
 urlpatterns = [
+    # Arranque de la app: usuario, perfil, próximas citas y contadores
+    path('me/', views.me, name='me'),
+    
     # CU-05: Gestionar Perfil Personal
     path('profile/', views.user_profile_detail, name='user_profile_detail'),
     
@@ -14,4 +17,11 @@ urlpatterns = [
     
     # Eliminar cuenta
     path('delete-account/', views.delete_account, name='delete_account'),
+    
+    # Miniaturas de fotos de perfil (generadas bajo demanda)
+    path(
+        'pictures/<str:digest>/<int:size>/',
+        views.profile_picture_thumbnail,
+        name='profile_picture_thumbnail'
+    ),
 ]
\ No newline at end of file
@@ -1,8 +1,16 @@
 # apps/users/views.py
 
-from rest_framework import status, permissions
-from rest_framework.decorators import api_view, permission_classes
+from rest_framework import exceptions, status, permissions
+from rest_framework.decorators import api_view, authentication_classes, permission_classes
 from rest_framework.response import Response
+from django.contrib.auth import get_user_model
+from django.db.models import Count, Q
+from django.http import FileResponse
+from django.utils import timezone
+from apps.appointments.models import Appointment
+from apps.appointments.serializers import AppointmentSerializer
+from apps.professionals.serializers import ProfessionalProfileSerializer
+from . import pictures
 from .models import PatientProfile
 from .serializers import (
     UserDetailSerializer, 
@@ -11,6 +19,12 @@ from .serializers import (
     PatientCompleteProfileSerializer
 )
 
+User = get_user_model()
+
+ME_SECTIONS = ('user', 'profile', 'upcoming_appointments', 'counts')
+ME_UPCOMING_LIMIT = 10
+ACTIVE_STATUSES = ['pending', 'confirmed']
+
 @api_view(['GET', 'PUT', 'PATCH'])
 @permission_classes([permissions.IsAuthenticated])
 def user_profile_detail(request):
@@ -109,4 +123,101 @@ def delete_account(request):
     request.user.is_active = False
     request.user.save()
     
-    return Response({'message': 'Cuenta desactivada'}, status=status.HTTP_200_OK)
\ No newline at end of file
+    return Response({'message': 'Cuenta desactivada'}, status=status.HTTP_200_OK)
+
+@api_view(['GET'])
+@authentication_classes([])
+@permission_classes([permissions.AllowAny])
+def profile_picture_thumbnail(request, digest, size):
+    """
+    Miniatura de una foto de perfil; se genera la primera vez que se pide.
+    La URL depende del contenido (digest), así que se cachea por un año.
+    """
+    try:
+        name = pictures.get_thumbnail(digest, size)
+    except pictures.PictureNotFound:
+        return Response({'error': 'Imagen no encontrada'}, status=status.HTTP_404_NOT_FOUND)
+    
+    response = FileResponse(
+        pictures.picture_storage().open(name), content_type=pictures.content_type(name)
+    )
+    response['Cache-Control'] = pictures.CACHE_CONTROL
+    return response
+
+@api_view(['GET'])
+@permission_classes([permissions.IsAuthenticated])
+def me(request):
+    """
+    Datos de arranque de la app en un solo request: user, profile (paciente o
+    profesional), upcoming_appointments y counts.
+    ?include=user,counts devuelve solo esas secciones.
+    Consultas fijas, sin importar cuántas citas haya: usuario con su perfil (1),
+    especialidades si es profesional (1), próximas citas (1) y contadores (1).
+    Los horarios del profesional salen de la plantilla compilada en caché
+    (más la lectura de su versión, 1).
+    """
+    include = request.query_params.get('include')
+    if include:
+        sections = {section.strip() for section in include.split(',') if section.strip()}
+        unknown = sections - set(ME_SECTIONS)
+        if unknown:
+            return Response({
+                'error': f'Secciones no válidas: {", ".join(sorted(unknown))}',
+                'valid_sections': ME_SECTIONS
+            }, status=status.HTTP_400_BAD_REQUEST)
+    else:
+        sections = set(ME_SECTIONS)
+    
+    user_id = request.user.id
+    today = timezone.localdate()
+    context = {'request': request}
+    data = {}
+    
+    if sections & {'user', 'profile'}:
+        user = User.objects.select_related(
+            'patient_profile', 'professional_profile'
+        ).prefetch_related(
+            'professional_profile__specializations'
+        ).filter(pk=user_id).first()
+        if user is None:
+            # Token de acceso firmado de un usuario ya borrado (vale hasta expirar)
+            raise exceptions.AuthenticationFailed('Usuario inactivo o eliminado.')
+        
+        if 'user' in sections:
+            data['user'] = UserDetailSerializer(user, context=context).data
+        
+        if 'profile' in sections:
+            profile = None
+            if user.user_type == 'patient' and hasattr(user, 'patient_profile'):
+                profile = PatientProfileSerializer(user.patient_profile, context=context).data
+            elif user.user_type == 'professional' and hasattr(user, 'professional_profile'):
+                profile = ProfessionalProfileSerializer(user.professional_profile, context=context).data
+            data['profile'] = profile
+    
+    mine = Q(patient_id=user_id) | Q(psychologist_id=user_id)
+    
+    if 'upcoming_appointments' in sections:
+        appointments = Appointment.objects.filter(
+            mine,
+            appointment_date__gte=today,
+            status__in=ACTIVE_STATUSES
+        ).select_related('patient', 'psychologist').order_by(
+            'appointment_date', 'start_time'
+        )[:ME_UPCOMING_LIMIT]
+        data['upcoming_appointments'] = AppointmentSerializer(appointments, many=True).data
+    
+    if 'counts' in sections:
+        # No hay mensajes persistidos: se cuenta lo que espera una acción del usuario
+        data['counts'] = Appointment.objects.filter(mine).aggregate(
+            upcoming_appointments=Count('id', filter=Q(
+                appointment_date__gte=today, status__in=ACTIVE_STATUSES
+            )),
+            pending_confirmations=Count('id', filter=Q(
+                psychologist_id=user_id, status='pending'
+            )),
+            pending_reviews=Count('id', filter=Q(
+                patient_id=user_id, status='completed', review__isnull=True
+            )),
+        )
+    
+    return Response(data, status=status.HTTP_200_OK)
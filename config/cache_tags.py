@@ -0,0 +1,120 @@
+# config/cache_tags.py
+
+import functools
+import hashlib
+import time
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.http import HttpResponse
+from rest_framework.response import Response
+from .replicas import _request_from, primary_reads
+
+# Caché de respuestas de vistas invalidada por etiquetas.
+# Cada vista declara de qué etiquetas depende ('profile:{psychologist_id}',
+# 'specializations', ...); cada etiqueta tiene una versión en la caché y la
+# clave de la respuesta incluye las versiones actuales. Las señales de los
+# modelos suben la versión al confirmar la transacción (bump_tags_on_commit) y
+# las respuestas viejas simplemente dejan de encontrarse.
+# Funciona con cualquier backend de caché de Django (locmem, Redis, ...).
+# CACHE_TAGS_ENABLED = False ejecuta siempre la vista (se lee en cada request
+# para que bench_endpoints pueda medir las vistas con override_settings).
+TAG_VERSION_KEY = 'tags:v:{}'
+VIEW_KEY = 'view:{}:{}'
+DEFAULT_TIMEOUT = getattr(settings, 'CACHE_TAGS_DEFAULT_TIMEOUT', 300)
+
+
+def _new_version():
+    # Si la versión se pierde (evicción) la nueva no coincide con ninguna anterior
+    return time.time_ns()
+
+
+def tag_versions(tags):
+    """{etiqueta: versión} con una lectura de caché"""
+    keys = {tag: TAG_VERSION_KEY.format(tag) for tag in tags}
+    found = cache.get_many(list(keys.values()))
+    versions = {}
+    for tag, key in keys.items():
+        version = found.get(key)
+        if version is None:
+            cache.add(key, _new_version(), None)
+            version = cache.get(key)
+        versions[tag] = version
+    return versions
+
+
+def bump_tags(*tags):
+    for tag in set(tags):
+        key = TAG_VERSION_KEY.format(tag)
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.set(key, _new_version(), None)
+
+
+def bump_tags_on_commit(*tags):
+    """Desde señales: si se subiera antes del commit, otro request podría cachear el dato viejo"""
+    transaction.on_commit(lambda: bump_tags(*tags))
+
+
+def _cache_key(name, request, tags, per_user):
+    versions = tag_versions(tags)
+    parts = [request.build_absolute_uri(), request.accepted_media_type]
+    parts += [f'{tag}={versions[tag]}' for tag in tags]
+    if per_user:
+        parts.append(str(request.user.pk))
+    return VIEW_KEY.format(name, hashlib.sha256('\n'.join(parts).encode()).hexdigest()[:32])
+
+
+def cache_by_tags(*tags, timeout=DEFAULT_TIMEOUT, per_user=False):
+    """
+    Cachea el JSON de una vista de DRF (función o método de ViewSet) hasta que
+    cambie alguna de sus etiquetas o pase `timeout`. Va debajo de @api_view /
+    @action: autenticación, permisos y throttling corren siempre. Los misses
+    leen de la primaria, así que estas vistas no llevan @use_replica. Las etiquetas se formatean con los kwargs de la URL y {user}.
+    per_user: la respuesta depende del usuario autenticado.
+    Solo GET con renderer JSON y respuestas 200.
+    """
+    def decorator(view):
+        name = f'{view.__module__}.{view.__qualname__}'
+
+        @functools.wraps(view)
+        def wrapper(*args, **kwargs):
+            if not getattr(settings, 'CACHE_TAGS_ENABLED', True):
+                return view(*args, **kwargs)
+            request = _request_from(args)
+            renderer = getattr(request, 'accepted_renderer', None)
+            if request.method != 'GET' or renderer is None or renderer.format != 'json':
+                return view(*args, **kwargs)
+
+            user_id = request.user.pk if request.user.is_authenticated else None
+            resolved = [tag.format(user=user_id, **kwargs) for tag in tags]
+            key = _cache_key(name, request, resolved, per_user)
+            cached = cache.get(key)
+            if cached is not None:
+                return _response(*cached)
+
+            # Desde la primaria: la respuesta queda bajo las versiones recién leídas
+            with primary_reads():
+                response = view(*args, **kwargs)
+            if not isinstance(response, Response) or response.status_code != 200:
+                return response
+
+            content = renderer.render(
+                response.data,
+                request.accepted_media_type,
+                {'request': request, 'response': response}
+            )
+            headers = [(header, value) for header, value in response.items() if header != 'Content-Type']
+            cached = (content, renderer.media_type, headers)
+            cache.set(key, cached, timeout)
+            return _response(*cached)
+        return wrapper
+    return decorator
+
+
+def _response(content, content_type, headers):
+    response = HttpResponse(content, content_type=content_type)
+    for header, value in headers:
+        response[header] = value
+    return response
@@ -0,0 +1,15 @@
+# config/caches.py
+
+from django.conf import settings
+
+# Backends cuyo contenido es propio de cada proceso: lo que un worker guarda o
+# invalida ahí no lo ven los demás (ej. LocMemCache en desarrollo).
+LOCAL_CACHE_BACKENDS = (
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+)
+
+
+def shared_cache():
+    """True si la caché por defecto es compartida entre workers (Redis, Memcached, BD)"""
+    return settings.CACHES['default']['BACKEND'] not in LOCAL_CACHE_BACKENDS
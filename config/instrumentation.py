@@ -0,0 +1,180 @@
+# config/instrumentation.py
+
+import functools
+import json
+import logging
+import random
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from django.conf import settings
+from django.db import connections
+from django.db.backends.signals import connection_created
+from rest_framework.serializers import BaseSerializer
+
+# Métricas por request (o por mensaje de WebSocket): consultas SQL, tiempo en BD,
+# tiempo serializando y tiempo total de la vista. Solo se miden los requests
+# muestreados (INSTRUMENTATION_SAMPLE_RATE); en el resto el costo es leer un
+# ContextVar por consulta.
+# Las métricas viajan en un ContextVar, así llegan también a los hilos de
+# sync_to_async / database_sync_to_async.
+SAMPLE_RATE = getattr(settings, 'INSTRUMENTATION_SAMPLE_RATE', 0.0)
+SERVER_TIMING = getattr(settings, 'INSTRUMENTATION_SERVER_TIMING', settings.DEBUG)
+LOG_ENABLED = getattr(settings, 'INSTRUMENTATION_LOG', True)
+
+logger = logging.getLogger('config.instrumentation')
+
+_current = ContextVar('request_metrics', default=None)
+
+
+class RequestMetrics:
+    __slots__ = (
+        'name', 'parent', 'start', 'queries', 'db_time', 'serializer_time', 'total_time', 'listeners'
+    )
+
+    def __init__(self, name, parent=None):
+        self.name = name
+        # Medición que envuelve a esta (p. ej. un test alrededor del request): también ve las consultas
+        self.parent = parent
+        self.start = time.perf_counter()
+        self.queries = 0
+        self.db_time = 0.0
+        self.serializer_time = 0.0
+        self.total_time = None
+        # Funciones (sql, duración) que quieren ver cada consulta
+        self.listeners = []
+
+    def finish(self):
+        self.total_time = time.perf_counter() - self.start
+
+    def record_query(self, sql, duration):
+        self.queries += 1
+        self.db_time += duration
+        for listener in self.listeners:
+            listener(sql, duration)
+        if self.parent is not None:
+            self.parent.record_query(sql, duration)
+
+    def as_dict(self):
+        return {
+            'queries': self.queries,
+            'db_ms': round(self.db_time * 1000, 2),
+            'serializer_ms': round(self.serializer_time * 1000, 2),
+            'view_ms': round((self.total_time or 0) * 1000, 2),
+        }
+
+    def server_timing(self):
+        return ', '.join([
+            f'db;dur={self.db_time * 1000:.2f};desc="{self.queries} queries"',
+            f'serializer;dur={self.serializer_time * 1000:.2f}',
+            f'view;dur={(self.total_time or 0) * 1000:.2f}',
+        ])
+
+
+def current_metrics():
+    """Métricas del request en curso, o None si no se está midiendo"""
+    return _current.get()
+
+
+def should_sample():
+    return SAMPLE_RATE >= 1 or (SAMPLE_RATE > 0 and random.random() < SAMPLE_RATE)
+
+
+def _record_query(execute, sql, params, many, context):
+    metrics = _current.get()
+    if metrics is None:
+        return execute(sql, params, many, context)
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        metrics.record_query(sql, time.perf_counter() - start)
+
+
+def _add_wrapper(connection):
+    if _record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_record_query)
+
+
+def _on_connection_created(sender, connection, **kwargs):
+    _add_wrapper(connection)
+
+
+@contextmanager
+def measure(name):
+    """Mide el bloque y deja las métricas en el contexto"""
+    metrics = RequestMetrics(name, _current.get())
+    token = _current.set(metrics)
+    try:
+        yield metrics
+    finally:
+        metrics.finish()
+        _current.reset(token)
+
+
+def log_metrics(metrics, **fields):
+    if LOG_ENABLED:
+        logger.info(json.dumps({'event': metrics.name, **fields, **metrics.as_dict()}))
+
+
+def _timed_serializer_data(data_property):
+    fget = data_property.fget
+
+    @functools.wraps(fget)
+    def data(self):
+        metrics = _current.get()
+        # Solo la primera evaluación del serializer de nivel superior (luego usa _data)
+        if metrics is None or hasattr(self, '_data'):
+            return fget(self)
+        start = time.perf_counter()
+        try:
+            return fget(self)
+        finally:
+            metrics.serializer_time += time.perf_counter() - start
+
+    return property(data)
+
+
+_installed = False
+
+
+def install():
+    """
+    Registra _record_query como execute_wrapper de cada conexión, de forma
+    permanente: bajo ASGI requests concurrentes pueden compartir el objeto de
+    conexión, y un `with connection.execute_wrapper()` por request contaría
+    doble o se quitaría a mitad de otro request. Sin métricas en el contexto
+    el wrapper solo lee el ContextVar.
+    También mide serializer.data de DRF (los anidados corren dentro del de nivel superior).
+    """
+    global _installed
+    if _installed:
+        return
+    _installed = True
+    connection_created.connect(_on_connection_created)
+    for connection in connections.all(initialized_only=True):
+        _add_wrapper(connection)
+    BaseSerializer.data = _timed_serializer_data(BaseSerializer.data)
+
+
+def instrument_consumer(handler):
+    """
+    Para métodos async de consumers de Channels: mide cada mensaje como un
+    request (sin Server-Timing, solo la línea de log).
+    """
+    install()
+
+    @functools.wraps(handler)
+    async def wrapper(self, *args, **kwargs):
+        if not should_sample():
+            return await handler(self, *args, **kwargs)
+        with measure('websocket') as metrics:
+            result = await handler(self, *args, **kwargs)
+        log_metrics(
+            metrics,
+            consumer=type(self).__name__,
+            handler=handler.__name__,
+            path=self.scope.get('path'),
+        )
+        return result
+    return wrapper
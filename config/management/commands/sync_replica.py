@@ -0,0 +1,34 @@
+# config/management/commands/sync_replica.py
+
+import sqlite3
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections
+from config.replicas import REPLICA, replica_configured
+
+
+class Command(BaseCommand):
+    help = (
+        'Copia la BD primaria SQLite a la réplica SQLite (DATABASE_REPLICA_URL). '
+        'Simula la replicación para probar el router de réplica en local.'
+    )
+
+    def handle(self, *args, **options):
+        if not replica_configured():
+            raise CommandError('No hay réplica configurada (DATABASE_REPLICA_URL)')
+
+        primary = connections[DEFAULT_DB_ALIAS].settings_dict
+        replica = connections[REPLICA].settings_dict
+        if primary['ENGINE'] != replica['ENGINE'] or connections[REPLICA].vendor != 'sqlite':
+            raise CommandError('sync_replica solo copia entre bases SQLite; en otros motores use la replicación del servidor')
+
+        connections[REPLICA].close()
+        source = sqlite3.connect(primary['NAME'])
+        target = sqlite3.connect(replica['NAME'])
+        try:
+            # Copia consistente aunque la primaria esté en uso
+            source.backup(target)
+        finally:
+            target.close()
+            source.close()
+
+        self.stdout.write(self.style.SUCCESS(f'✅ Réplica actualizada: {primary["NAME"]} -> {replica["NAME"]}'))
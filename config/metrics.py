@@ -0,0 +1,385 @@
+# config/metrics.py
+
+import fcntl
+import functools
+import hmac
+import json
+import os
+import re
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.base import BaseCache
+from django.http import HttpResponse, HttpResponseForbidden
+
+# Métricas en formato de texto de Prometheus (GET /metrics).
+# Cada hilo escribe solo en su propio "shard" (dicts sin locks); al exportar se
+# suman los shards del proceso. Con METRICS_DIR cada worker vuelca su snapshot
+# a <METRICS_DIR>/<pid>.json cada METRICS_FLUSH_SECONDS y /metrics suma los
+# archivos de todos los workers. Los contadores e histogramas de un worker
+# muerto se suman a retired.json y su archivo se borra: si el pid se reutiliza,
+# el proceso nuevo no pisa (ni hace retroceder) lo acumulado por el anterior.
+# Los gauges solo cuentan para procesos vivos.
+METRICS_DIR = getattr(settings, 'METRICS_DIR', '')
+FLUSH_SECONDS = getattr(settings, 'METRICS_FLUSH_SECONDS', 5)
+METRICS_TOKEN = getattr(settings, 'METRICS_TOKEN', '')
+RETIRED_FILE = 'retired.json'
+LOCK_FILE = 'metrics.lock'
+_WORKER_FILE = re.compile(r'^\d+\.json$')
+# Distingue este proceso de uno anterior con el mismo pid
+_STARTED = time.time_ns()
+
+# Buckets de latencia en segundos
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+METRICS = {
+    'http_request_duration_seconds': ('histogram', 'Latencia de requests HTTP por ruta'),
+    'http_requests_total': ('counter', 'Requests HTTP por ruta, método y status'),
+    'db_queries_total': ('counter', 'Consultas SQL por ruta'),
+    'cache_requests_total': ('counter', 'Lecturas de la caché de Django por resultado (hit/miss)'),
+    'cache_hit_ratio': ('gauge', 'Hits sobre lecturas totales de la caché de Django'),
+    'chat_websocket_connections': ('gauge', 'Conexiones WebSocket abiertas en ChatConsumer'),
+    'appointment_bookings_total': ('counter', 'Intentos de reserva de citas por resultado (created/conflict)'),
+}
+
+
+class Shard:
+    __slots__ = ('counters', 'gauges', 'histograms')
+
+    def __init__(self):
+        self.counters = {}
+        self.gauges = {}
+        # clave -> [conteo por bucket..., conteo +Inf, suma]
+        self.histograms = {}
+
+
+_shards = []
+_local = threading.local()
+
+
+def _shard():
+    shard = getattr(_local, 'shard', None)
+    if shard is None:
+        shard = _local.shard = Shard()
+        _shards.append(shard)
+    return shard
+
+
+def _key(name, labels):
+    return (name, tuple(sorted(labels.items())))
+
+
+def inc(name, value=1, **labels):
+    counters = _shard().counters
+    key = _key(name, labels)
+    counters[key] = counters.get(key, 0) + value
+
+
+def gauge_add(name, value, **labels):
+    gauges = _shard().gauges
+    key = _key(name, labels)
+    gauges[key] = gauges.get(key, 0) + value
+
+
+def observe(name, value, **labels):
+    histograms = _shard().histograms
+    key = _key(name, labels)
+    entry = histograms.get(key)
+    if entry is None:
+        entry = histograms[key] = [0] * (len(BUCKETS) + 2)
+    entry[bisect_left(BUCKETS, value)] += 1
+    entry[-1] += value
+
+
+def snapshot():
+    """Suma de los shards del proceso"""
+    counters, gauges, histograms = {}, {}, {}
+    for shard in list(_shards):
+        for key, value in shard.counters.copy().items():
+            counters[key] = counters.get(key, 0) + value
+        for key, value in shard.gauges.copy().items():
+            gauges[key] = gauges.get(key, 0) + value
+        for key, entry in shard.histograms.copy().items():
+            total = histograms.setdefault(key, [0] * len(entry))
+            for index, value in enumerate(list(entry)):
+                total[index] += value
+    return counters, gauges, histograms
+
+
+# --- Agregación entre workers ---
+
+def _dump(metrics):
+    return [[name, list(map(list, labels)), value] for (name, labels), value in metrics.items()]
+
+
+def _load(rows, into, add):
+    for name, labels, value in rows:
+        key = (name, tuple(map(tuple, labels)))
+        into[key] = add(into[key], value) if key in into else value
+
+
+def _add_entries(left, right):
+    return [a + b for a, b in zip(left, right)]
+
+
+def _read(path):
+    try:
+        with open(path, encoding='utf-8') as source:
+            return json.load(source)
+    except (OSError, ValueError):
+        return None
+
+
+def _write(path, data):
+    """Reemplazo atómico: quien lee ve el archivo anterior o el nuevo"""
+    temporary = f'{path}.tmp'
+    with open(temporary, 'w', encoding='utf-8') as output:
+        json.dump(data, output)
+    os.replace(temporary, path)
+
+
+@contextmanager
+def _directory_lock():
+    """Entre procesos: mover archivos a retired.json y leerlos no se solapan"""
+    with open(os.path.join(METRICS_DIR, LOCK_FILE), 'a') as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+def _retire(path, data):
+    """Suma contadores e histogramas del archivo de un worker terminado a retired.json y lo borra"""
+    retired_path = os.path.join(METRICS_DIR, RETIRED_FILE)
+    retired = _read(retired_path) or {'counters': [], 'histograms': []}
+    counters, histograms = {}, {}
+    for rows in (retired['counters'], data['counters']):
+        _load(rows, counters, lambda a, b: a + b)
+    for rows in (retired['histograms'], data['histograms']):
+        _load(rows, histograms, _add_entries)
+    _write(retired_path, {'counters': _dump(counters), 'histograms': _dump(histograms)})
+    os.remove(path)
+
+
+_flush_lock = threading.Lock()
+_next_flush = 0.0
+_own_file_checked = False
+
+
+def flush():
+    """Escribe el snapshot del proceso en METRICS_DIR"""
+    global _own_file_checked
+    if not METRICS_DIR:
+        return
+    counters, gauges, histograms = snapshot()
+    os.makedirs(METRICS_DIR, exist_ok=True)
+    path = os.path.join(METRICS_DIR, f'{os.getpid()}.json')
+    data = {
+        'pid': os.getpid(),
+        'started': _STARTED,
+        'counters': _dump(counters),
+        'gauges': _dump(gauges),
+        'histograms': _dump(histograms),
+    }
+    if _own_file_checked:
+        _write(path, data)
+        return
+    with _directory_lock():
+        # Archivo de un proceso anterior con este pid que nadie retiró
+        previous = _read(path)
+        if previous is not None and previous.get('started') != _STARTED:
+            _retire(path, previous)
+        _write(path, data)
+    _own_file_checked = True
+
+
+def maybe_flush():
+    """Llamado al final de cada request: vuelca como mucho cada FLUSH_SECONDS"""
+    global _next_flush
+    if not METRICS_DIR or time.monotonic() < _next_flush:
+        return
+    if not _flush_lock.acquire(blocking=False):
+        return
+    try:
+        _next_flush = time.monotonic() + FLUSH_SECONDS
+        flush()
+    finally:
+        _flush_lock.release()
+
+
+def _alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def collect():
+    """Snapshot de este proceso más los archivos del resto de workers y lo retirado"""
+    counters, gauges, histograms = snapshot()
+    if not METRICS_DIR or not os.path.isdir(METRICS_DIR):
+        return counters, gauges, histograms
+
+    own = f'{os.getpid()}.json'
+    with _directory_lock():
+        for filename in os.listdir(METRICS_DIR):
+            if not _WORKER_FILE.match(filename) or filename == own:
+                continue
+            path = os.path.join(METRICS_DIR, filename)
+            data = _read(path)
+            if data is None:
+                continue
+            if not _alive(data['pid']):
+                _retire(path, data)
+                continue
+            _load(data['counters'], counters, lambda a, b: a + b)
+            _load(data['histograms'], histograms, _add_entries)
+            _load(data['gauges'], gauges, lambda a, b: a + b)
+
+        retired = _read(os.path.join(METRICS_DIR, RETIRED_FILE))
+        if retired is not None:
+            _load(retired['counters'], counters, lambda a, b: a + b)
+            _load(retired['histograms'], histograms, _add_entries)
+    return counters, gauges, histograms
+
+
+# --- Formato de texto de Prometheus ---
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _labels(labels, extra=()):
+    pairs = list(labels) + list(extra)
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in pairs) + '}'
+
+
+def _number(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def render():
+    counters, gauges, histograms = collect()
+
+    hits = misses = 0
+    for (name, labels), value in counters.items():
+        if name == 'cache_requests_total':
+            if dict(labels).get('result') == 'hit':
+                hits += value
+            else:
+                misses += value
+    if hits + misses:
+        gauges[('cache_hit_ratio', ())] = hits / (hits + misses)
+
+    by_name = {}
+    for source in (counters, gauges):
+        for (name, labels), value in source.items():
+            by_name.setdefault(name, []).append((labels, value))
+
+    lines = []
+    for name, (kind, description) in METRICS.items():
+        lines.append(f'# HELP {name} {description}')
+        lines.append(f'# TYPE {name} {kind}')
+        if kind == 'histogram':
+            for (metric, labels), entry in sorted(histograms.items()):
+                if metric != name:
+                    continue
+                cumulative = 0
+                for bound, count in zip(BUCKETS, entry):
+                    cumulative += count
+                    lines.append(f'{name}_bucket{_labels(labels, [("le", bound)])} {cumulative}')
+                cumulative += entry[len(BUCKETS)]
+                lines.append(f'{name}_bucket{_labels(labels, [("le", "+Inf")])} {cumulative}')
+                lines.append(f'{name}_sum{_labels(labels)} {_number(entry[-1])}')
+                lines.append(f'{name}_count{_labels(labels)} {cumulative}')
+        else:
+            for labels, value in sorted(by_name.get(name, [])):
+                lines.append(f'{name}{_labels(labels)} {_number(value)}')
+    return '\n'.join(lines) + '\n'
+
+
+def metrics_view(request):
+    """
+    GET /metrics para el scraper de Prometheus. Vista de Django (no DRF): el
+    formato es texto plano. Con METRICS_TOKEN exige `Authorization: Bearer <token>`;
+    sin él solo responde con DEBUG (las rutas y volúmenes no son públicos).
+    """
+    if METRICS_TOKEN:
+        expected = f'Bearer {METRICS_TOKEN}'
+        if not hmac.compare_digest(request.headers.get('Authorization', ''), expected):
+            return HttpResponseForbidden('Token de métricas inválido')
+    elif not settings.DEBUG:
+        return HttpResponseForbidden('Métricas deshabilitadas: configura METRICS_TOKEN')
+    maybe_flush()
+    return HttpResponse(render(), content_type='text/plain; version=0.0.4; charset=utf-8')
+
+
+# --- Caché de Django ---
+
+_MISSING = object()
+
+
+def _counted_get(get):
+    @functools.wraps(get)
+    def wrapper(key, default=None, version=None):
+        value = get(key, _MISSING, version=version)
+        if value is _MISSING:
+            inc('cache_requests_total', result='miss')
+            return default
+        inc('cache_requests_total', result='hit')
+        return value
+    return wrapper
+
+
+def _counted_get_many(get_many):
+    @functools.wraps(get_many)
+    def wrapper(keys, version=None):
+        keys = list(keys)
+        found = get_many(keys, version=version)
+        inc('cache_requests_total', len(found), result='hit')
+        inc('cache_requests_total', len(keys) - len(found), result='miss')
+        return found
+    return wrapper
+
+
+def _count_reads(cache):
+    """Envuelve get/get_many de esta instancia (no de la clase: otros alias no cuentan)"""
+    if getattr(cache, '_counted_reads', False):
+        return cache
+    cache._counted_reads = True
+    cache.get = _counted_get(cache.get)
+    # BaseCache.get_many llama a get(): solo se envuelve si el backend tiene el suyo
+    if type(cache).get_many is not BaseCache.get_many:
+        cache.get_many = _counted_get_many(cache.get_many)
+    return cache
+
+
+_installed = False
+
+
+def install():
+    """
+    Cuenta hits/misses de la caché por defecto. CacheHandler crea una instancia
+    por hilo: se envuelve la del hilo actual y cada una que se cree después.
+    """
+    global _installed
+    if _installed:
+        return
+    _installed = True
+    create_connection = caches.create_connection
+
+    def create_counted_connection(alias):
+        cache = create_connection(alias)
+        return _count_reads(cache) if alias == 'default' else cache
+
+    caches.create_connection = create_counted_connection
+    _count_reads(caches['default'])
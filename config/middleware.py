@@ -0,0 +1,178 @@
+# config/middleware.py
+
+import time
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from whitenoise.middleware import WhiteNoiseMiddleware
+from django.core.exceptions import MiddlewareNotUsed
+from . import instrumentation, metrics, nplusone, replicas
+
+
+class AsyncWhiteNoiseMiddleware(WhiteNoiseMiddleware):
+    """
+    WhiteNoise con soporte async.
+    WhiteNoiseMiddleware es solo sync: bajo ASGI obliga a Django a ejecutar toda
+    la cadena (y las vistas async) en el hilo sync compartido, y una vista que
+    espera un hash de contraseña bloquea al resto de requests.
+    """
+    async_capable = True
+
+    def __init__(self, get_response=None, *args, **kwargs):
+        super().__init__(get_response, *args, **kwargs)
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        return super().__call__(request)
+
+    async def __acall__(self, request):
+        if self.autorefresh:
+            static_file = await sync_to_async(self.find_file)(request.path_info)
+        else:
+            static_file = self.files.get(request.path_info)
+        if static_file is not None:
+            return await sync_to_async(self.serve)(static_file, request)
+        return await self.get_response(request)
+
+
+class MetricsMiddleware:
+    """
+    Latencia, status y consultas SQL por ruta para /metrics (config/metrics.py).
+    Va primero en MIDDLEWARE para medir el request completo.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        instrumentation.install()
+        metrics.install()
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        start = time.perf_counter()
+        with instrumentation.measure('metrics') as request_metrics:
+            response = self.get_response(request)
+        self.record(request, response, request_metrics, time.perf_counter() - start)
+        return response
+
+    async def __acall__(self, request):
+        start = time.perf_counter()
+        with instrumentation.measure('metrics') as request_metrics:
+            response = await self.get_response(request)
+        self.record(request, response, request_metrics, time.perf_counter() - start)
+        return response
+
+    def record(self, request, response, request_metrics, elapsed):
+        match = request.resolver_match
+        # Solo rutas resueltas: las URLs arbitrarias no crean series nuevas
+        route = match.route if match else '<unmatched>'
+        metrics.observe('http_request_duration_seconds', elapsed, route=route, method=request.method)
+        metrics.inc('http_requests_total', route=route, method=request.method, status=str(response.status_code))
+        if request_metrics.queries:
+            metrics.inc('db_queries_total', request_metrics.queries, route=route)
+        metrics.maybe_flush()
+
+
+class ReplicaPinMiddleware:
+    """
+    Después de un request que escribe (método no seguro, respuesta sin error)
+    fija al usuario a la primaria por REPLICA_PIN_SECONDS (config/replicas.py).
+    El usuario de DRF se conoce recién después de la vista.
+    Sin caché compartida no se usa: @use_replica ya manda a la primaria a
+    todos los usuarios autenticados.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not replicas.replica_configured() or not replicas.can_pin():
+            raise MiddlewareNotUsed()
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        response = self.get_response(request)
+        if self.wrote(request, response):
+            user = getattr(request, 'user', None)
+            if user is not None and user.is_authenticated:
+                replicas.pin_to_primary(user.pk)
+        return response
+
+    async def __acall__(self, request):
+        session_user = getattr(request, 'user', None)
+        response = await self.get_response(request)
+        if self.wrote(request, response):
+            user = getattr(request, 'user', None)
+            if user is not None and user is session_user:
+                # Usuario de sesión perezoso de AuthenticationMiddleware (la vista
+                # no lo cargó): leerlo acá consultaría la BD dentro del event loop
+                user = await request.auser()
+            if user is not None and user.is_authenticated:
+                await sync_to_async(replicas.pin_to_primary)(user.pk)
+        return response
+
+    def wrote(self, request, response):
+        return request.method not in ('GET', 'HEAD', 'OPTIONS') and response.status_code < 400
+
+
+class InstrumentationMiddleware:
+    """
+    Consultas, tiempo de BD, de serialización y de la vista por request
+    (config/instrumentation.py), en el header Server-Timing y en una línea de
+    log JSON. Va al final de MIDDLEWARE para que `view` mida casi solo la vista.
+    Con NPLUSONE_MODE activo además revisa cada request con config/nplusone.py.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        instrumentation.install()
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        sampled = instrumentation.should_sample()
+        if not sampled and not nplusone.ENABLED:
+            return self.get_response(request)
+        with instrumentation.measure('request') as metrics:
+            detector = nplusone.attach(metrics) if nplusone.ENABLED else None
+            response = self.get_response(request)
+        self.report(request, response, metrics, sampled, detector)
+        return response
+
+    async def __acall__(self, request):
+        sampled = instrumentation.should_sample()
+        if not sampled and not nplusone.ENABLED:
+            return await self.get_response(request)
+        with instrumentation.measure('request') as metrics:
+            detector = nplusone.attach(metrics) if nplusone.ENABLED else None
+            response = await self.get_response(request)
+        self.report(request, response, metrics, sampled, detector)
+        return response
+
+    def report(self, request, response, metrics, sampled, detector):
+        if sampled:
+            if instrumentation.SERVER_TIMING:
+                response['Server-Timing'] = metrics.server_timing()
+            match = request.resolver_match
+            instrumentation.log_metrics(
+                metrics,
+                method=request.method,
+                path=request.path,
+                route=match.route if match else None,
+                status=response.status_code,
+            )
+        if detector is not None:
+            # En modo 'raise' el request falla con NPlusOneError
+            detector.report(f'{request.method} {request.path}', nplusone.MODE)
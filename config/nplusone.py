@@ -0,0 +1,109 @@
+# config/nplusone.py
+
+import logging
+import os
+import re
+import sys
+from collections import Counter
+from contextlib import contextmanager
+from django.conf import settings
+from . import instrumentation
+
+# Detector de N+1: normaliza cada consulta del request a su "forma" (sin
+# literales ni parámetros) y cuenta repeticiones. Una forma que se repite
+# NPLUSONE_THRESHOLD veces o más casi siempre es un loop que consulta por fila;
+# se reporta con la línea del proyecto que la disparó.
+# NPLUSONE_MODE: 'off' (producción), 'warn' (log) o 'raise' (falla el request,
+# útil en tests con el Client de Django).
+MODE = getattr(settings, 'NPLUSONE_MODE', 'off')
+THRESHOLD = getattr(settings, 'NPLUSONE_THRESHOLD', 5)
+ENABLED = MODE in ('warn', 'raise')
+
+logger = logging.getLogger('config.nplusone')
+
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_NUMBER = re.compile(r'\b\d+(?:\.\d+)?\b')
+_IN_LIST = re.compile(r'\bIN\s*\((?:\s*(?:%s|\?|\d+(?:\.\d+)?|\'\')\s*,?)+\)', re.IGNORECASE)
+_SPACES = re.compile(r'\s+')
+
+_PROJECT_DIR = str(settings.BASE_DIR) + os.sep
+_IGNORED_FILES = {instrumentation.__file__, __file__}
+
+
+class NPlusOneError(Exception):
+    pass
+
+
+def normalize(sql):
+    """Forma de la consulta: literales como ?, listas IN colapsadas"""
+    shape = _STRING.sub('?', sql)
+    shape = _NUMBER.sub('?', shape)
+    shape = _IN_LIST.sub('IN (...)', shape)
+    return _SPACES.sub(' ', shape).strip()
+
+
+def call_site():
+    """Primera línea del proyecto en la pila (fuera de Django/DRF y de este módulo)"""
+    frame = sys._getframe(2)
+    while frame is not None:
+        filename = frame.f_code.co_filename
+        if (filename.startswith(_PROJECT_DIR) and filename not in _IGNORED_FILES
+                and 'site-packages' not in filename):
+            return f'{os.path.relpath(filename, _PROJECT_DIR)}:{frame.f_lineno} in {frame.f_code.co_name}'
+        frame = frame.f_back
+    return '<desconocido>'
+
+
+class Detector:
+    """Se registra como listener de RequestMetrics y cuenta formas y sitios"""
+
+    def __init__(self, threshold):
+        self.threshold = threshold
+        self.shapes = Counter()
+        self.sites = {}
+
+    def __call__(self, sql, duration):
+        shape = normalize(sql)
+        self.shapes[shape] += 1
+        self.sites.setdefault(shape, Counter())[call_site()] += 1
+
+    def offenders(self):
+        """[(forma, repeticiones, sitio más frecuente)] sobre el umbral"""
+        return [
+            (shape, count, self.sites[shape].most_common(1)[0][0])
+            for shape, count in self.shapes.most_common()
+            if count >= self.threshold
+        ]
+
+    def report(self, label, mode):
+        offenders = self.offenders()
+        if not offenders:
+            return
+        lines = [f'Posible N+1 en {label}:']
+        for shape, count, site in offenders:
+            lines.append(f'  {count}x {site}\n     {shape[:300]}')
+        message = '\n'.join(lines)
+        if mode == 'raise':
+            raise NPlusOneError(message)
+        logger.warning(message)
+
+
+def attach(metrics, threshold=None):
+    detector = Detector(threshold or THRESHOLD)
+    metrics.listeners.append(detector)
+    return detector
+
+
+@contextmanager
+def detect(threshold=None, mode='raise', label='bloque'):
+    """
+    Para tests y scripts:
+        with detect(threshold=3):
+            client.get('/api/appointments/appointments/')
+    Falla con NPlusOneError si alguna forma se repite `threshold` veces o más.
+    """
+    instrumentation.install()
+    with instrumentation.measure('nplusone') as metrics:
+        detector = attach(metrics, threshold)
+        yield detector
+    detector.report(label, mode)
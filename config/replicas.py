@@ -0,0 +1,120 @@
+# config/replicas.py
+
+import functools
+from contextlib import contextmanager
+from contextvars import ContextVar
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.http import HttpRequest
+from rest_framework.request import Request
+from .caches import shared_cache
+
+# Lecturas en la réplica (DATABASE_REPLICA_URL) solo para las vistas marcadas
+# con @use_replica; todo lo demás, y cualquier escritura, va a la primaria.
+# Dentro de una vista marcada vuelven a la primaria:
+# - las lecturas dentro de una transacción (incluye select_for_update, que
+#   además Django enruta como escritura);
+# - las lecturas después de una escritura en el mismo request;
+# - los requests de un usuario que escribió hace menos de REPLICA_PIN_SECONDS
+#   (read-your-writes, ver ReplicaPinMiddleware).
+# La marca de pin vive en la caché por defecto: si es local al proceso
+# (LocMemCache) no llega a los demás workers, así que sin caché compartida los
+# usuarios autenticados leen siempre de la primaria y solo los anónimos usan la réplica.
+# Las vistas con cache_by_tags no llevan @use_replica: sus misses leen de la
+# primaria (config/cache_tags.py) y los aciertos no consultan la BD.
+REPLICA = 'replica'
+PIN_SECONDS = getattr(settings, 'REPLICA_PIN_SECONDS', 5)
+PIN_KEY = 'db:pin:{}'
+
+_route = ContextVar('db_route', default=None)
+
+
+def replica_configured():
+    return REPLICA in settings.DATABASES
+
+
+def can_pin():
+    """El pin solo sirve si lo ven todos los workers"""
+    return shared_cache()
+
+
+def pin_to_primary(user_id):
+    cache.set(PIN_KEY.format(user_id), 1, PIN_SECONDS)
+
+
+def is_pinned(user_id):
+    return cache.get(PIN_KEY.format(user_id)) is not None
+
+
+@contextmanager
+def replica_reads():
+    token = _route.set(REPLICA)
+    try:
+        yield
+    finally:
+        _route.reset(token)
+
+
+@contextmanager
+def primary_reads():
+    """
+    Para lo que llena cachés compartidas (plantillas de horario, perfiles
+    públicos): con lecturas atrasadas de la réplica quedaría guardado un dato
+    viejo bajo la versión nueva.
+    """
+    token = _route.set(DEFAULT_DB_ALIAS)
+    try:
+        yield
+    finally:
+        _route.reset(token)
+
+
+def _request_from(args):
+    for arg in args:
+        if isinstance(arg, (Request, HttpRequest)):
+            return arg
+    return None
+
+
+def use_replica(view):
+    """
+    Marca una vista (función o método de ViewSet) como de solo lectura.
+    Va debajo de @api_view / @action para ver al usuario ya autenticado.
+    """
+    @functools.wraps(view)
+    def wrapper(*args, **kwargs):
+        if not replica_configured():
+            return view(*args, **kwargs)
+        request = _request_from(args)
+        user = getattr(request, 'user', None)
+        if user is not None and user.is_authenticated and (not can_pin() or is_pinned(user.pk)):
+            return view(*args, **kwargs)
+        with replica_reads():
+            return view(*args, **kwargs)
+    return wrapper
+
+
+class ReplicaRouter:
+    """Router de DATABASE_ROUTERS: la réplica solo se usa dentro de replica_reads()"""
+
+    def db_for_read(self, model, **hints):
+        instance = hints.get('instance')
+        if instance is not None and instance._state.db:
+            return instance._state.db
+        if _route.get() != REPLICA or connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return DEFAULT_DB_ALIAS
+        return REPLICA
+
+    def db_for_write(self, model, **hints):
+        if _route.get() == REPLICA:
+            # Lo que se lea después en este request tiene que ver la escritura
+            _route.set(DEFAULT_DB_ALIAS)
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return {obj1._state.db, obj2._state.db} <= {DEFAULT_DB_ALIAS, REPLICA}
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # La réplica recibe el esquema por replicación (o sync_replica en local)
+        return db != REPLICA
@@ -14,6 +14,7 @@ from pathlib import Path
 import dj_database_url
 from decouple import config, Csv  
 import os
+from corsheaders.defaults import default_headers
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 
@@ -49,10 +50,14 @@ INSTALLED_APPS = [
     'apps.users',
     'apps.professionals',
     'apps.appointments',
+    'apps.notifications',
+    'apps.profiling',
+    'config',  # Comandos de infraestructura (sync_replica junto al router de réplica)
 ]
 
 MIDDLEWARE = [
-     'whitenoise.middleware.WhiteNoiseMiddleware',
+    'config.middleware.MetricsMiddleware',  # Métricas de Prometheus (/metrics), mide el request completo
+    'config.middleware.AsyncWhiteNoiseMiddleware',  # WhiteNoise async (ver config/middleware.py)
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'corsheaders.middleware.CorsMiddleware',  
@@ -61,6 +66,9 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'config.middleware.ReplicaPinMiddleware',  # read-your-writes con réplica (solo si hay réplica)
+    'apps.profiling.middleware.ProfilingMiddleware',  # cProfile a pedido de usuarios staff
+    'config.middleware.InstrumentationMiddleware',  # Server-Timing y log por request (al final)
 ]
 
 ROOT_URLCONF = 'config.urls'
@@ -90,6 +98,114 @@ DATABASES = {
     "default": dj_database_url.config(default=config("DATABASE_URL"))
 }
 
+# Réplica de solo lectura para las vistas marcadas con @use_replica (config/replicas.py)
+DATABASE_REPLICA_URL = config("DATABASE_REPLICA_URL", default="")
+if DATABASE_REPLICA_URL:
+    DATABASES["replica"] = dj_database_url.parse(DATABASE_REPLICA_URL)
+    DATABASES["replica"]["TEST"] = {"MIRROR": "default"}  # Los tests leen de la primaria
+
+DATABASE_ROUTERS = ['config.replicas.ReplicaRouter']
+# Segundos que un usuario lee de la primaria después de escribir (read-your-writes).
+# El pin va en la caché: sin REDIS_CACHE_URL los usuarios autenticados leen
+# siempre de la primaria y solo los anónimos usan la réplica
+REPLICA_PIN_SECONDS = config("REPLICA_PIN_SECONDS", default=5, cast=int)
+
+# Caché
+# Redis compartido entre workers en producción; memoria local en desarrollo.
+REDIS_CACHE_URL = config("REDIS_CACHE_URL", default="")
+
+if REDIS_CACHE_URL:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.redis.RedisCache",
+            "LOCATION": REDIS_CACHE_URL,
+        }
+    }
+else:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        }
+    }
+
+# Catálogos en memoria por worker (apps/professionals/catalog.py)
+CATALOG_VERSION_CHECK_SECONDS = config("CATALOG_VERSION_CHECK_SECONDS", default=5, cast=int)
+SPECIALIZATIONS_CACHE_MAX_AGE = 60 * 60 * 24  # Cache-Control de /specializations/
+
+# Perfiles públicos pre-renderizados (apps/professionals/public_profiles.py): la
+# copia vigente está en la BD; cada worker la cachea como mucho estos segundos.
+PUBLIC_PROFILE_CACHE_SECONDS = config("PUBLIC_PROFILE_CACHE_SECONDS", default=60, cast=int)
+
+# Respuestas cacheadas por etiquetas (config/cache_tags.py). Con LocMemCache las
+# versiones son por proceso: con varios workers hace falta REDIS_CACHE_URL.
+CACHE_TAGS_DEFAULT_TIMEOUT = config("CACHE_TAGS_DEFAULT_TIMEOUT", default=300, cast=int)
+CACHE_TAGS_ENABLED = config("CACHE_TAGS_ENABLED", default=True, cast=bool)
+
+# Caché de tokens por worker (apps/authentication/authentication.py). Con
+# REDIS_CACHE_URL las invalidaciones llegan a los demás workers en el request
+# siguiente; sin Redis, por la tabla token_invalidations, que cada worker revisa
+# cada AUTH_TOKEN_CACHE_CHECK_SECONDS (demora máxima de un logout en otro worker)
+AUTH_TOKEN_CACHE_TTL = config("AUTH_TOKEN_CACHE_TTL", default=60, cast=int)
+AUTH_TOKEN_CACHE_SIZE = config("AUTH_TOKEN_CACHE_SIZE", default=10000, cast=int)
+AUTH_TOKEN_CACHE_CHECK_SECONDS = config("AUTH_TOKEN_CACHE_CHECK_SECONDS", default=5, cast=int)
+AUTH_TOKEN_TTL = config("AUTH_TOKEN_TTL", default=60 * 60 * 24 * 7, cast=int)  # segundos sin uso
+AUTH_ACCESS_TOKEN_TTL = config("AUTH_ACCESS_TOKEN_TTL", default=60 * 15, cast=int)  # tokens firmados
+# Revocar tokens firmados al instante (logout, cambio de contraseña, desactivación).
+# Cuesta una lectura de caché por request (una consulta a la BD sin Redis); sin
+# esto un token revocado vale hasta AUTH_ACCESS_TOKEN_TTL
+AUTH_ACCESS_TOKEN_CHECK_REVOCATION = config("AUTH_ACCESS_TOKEN_CHECK_REVOCATION", default=False, cast=bool)
+
+# Hashing de contraseñas en pool de procesos (apps/authentication/hashing.py)
+PASSWORD_HASHING_WORKERS = config("PASSWORD_HASHING_WORKERS", default=2, cast=int)
+PASSWORD_HASHING_MAX_PENDING = config("PASSWORD_HASHING_MAX_PENDING", default=32, cast=int)
+
+# Índice de matching en memoria por worker (apps/professionals/matching.py)
+MATCHING_REFRESH_SECONDS = config("MATCHING_REFRESH_SECONDS", default=2, cast=int)
+MATCHING_SLOT_TTL_SECONDS = config("MATCHING_SLOT_TTL_SECONDS", default=60, cast=int)
+
+# Métricas por request: consultas, tiempo de BD/serialización/vista (config/instrumentation.py)
+INSTRUMENTATION_SAMPLE_RATE = config(
+    "INSTRUMENTATION_SAMPLE_RATE", default=1.0 if DEBUG else 0.05, cast=float
+)  # fracción de requests medidos
+# El header expone consultas y tiempos de BD/vista a cualquier cliente: solo en desarrollo
+INSTRUMENTATION_SERVER_TIMING = config("INSTRUMENTATION_SERVER_TIMING", default=DEBUG, cast=bool)
+INSTRUMENTATION_LOG = config("INSTRUMENTATION_LOG", default=True, cast=bool)
+
+# Detector de N+1 (config/nplusone.py): 'off', 'warn' o 'raise'
+NPLUSONE_MODE = config("NPLUSONE_MODE", default='warn' if DEBUG else 'off')
+NPLUSONE_THRESHOLD = config("NPLUSONE_THRESHOLD", default=5, cast=int)  # repeticiones de una misma consulta
+
+# Perfilado a pedido (header X-Profile o ?_profile=1, solo staff; apps/profiling)
+PROFILING_ENABLED = config("PROFILING_ENABLED", default=True, cast=bool)
+PROFILING_KEEP = config("PROFILING_KEEP", default=100, cast=int)  # perfiles guardados
+
+# Métricas de Prometheus (config/metrics.py). Con varios workers, METRICS_DIR
+# es un directorio compartido donde cada proceso vuelca sus contadores.
+METRICS_DIR = config("METRICS_DIR", default='')
+METRICS_FLUSH_SECONDS = config("METRICS_FLUSH_SECONDS", default=5, cast=int)
+METRICS_TOKEN = config("METRICS_TOKEN", default='')  # Bearer exigido por /metrics (vacío: solo con DEBUG)
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler'},
+    },
+    'loggers': {
+        # Una línea JSON por request muestreado
+        'config.instrumentation': {
+            'handlers': ['console'],
+            'level': 'INFO',
+            'propagate': False,
+        },
+        'config.nplusone': {
+            'handlers': ['console'],
+            'level': 'WARNING',
+            'propagate': False,
+        },
+    },
+}
+
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
 
@@ -126,11 +242,29 @@ USE_TZ = True
 
 STATIC_URL = 'static/'
 STATIC_ROOT = BASE_DIR / 'staticfiles'
+MEDIA_URL = 'media/'
+MEDIA_ROOT = config('MEDIA_ROOT', default='') or str(BASE_DIR / 'media')
 STORAGES = {
+    "default": {
+        "BACKEND": "django.core.files.storage.FileSystemStorage",
+    },
     "staticfiles": {
         "BACKEND": "whitenoise.storage.CompressedManifestStaticFilesStorage",
     },
 }
+
+# Subidas: el primer handler corta archivos de más de FILE_UPLOAD_MAX_SIZE mientras se reciben
+FILE_UPLOAD_MAX_SIZE = config('FILE_UPLOAD_MAX_SIZE', default=5 * 1024 * 1024, cast=int)
+FILE_UPLOAD_HANDLERS = [
+    'apps.users.pictures.SizeLimitedUploadHandler',
+    'django.core.files.uploadhandler.MemoryFileUploadHandler',
+    'django.core.files.uploadhandler.TemporaryFileUploadHandler',
+]
+
+# Fotos de perfil (apps/users/pictures.py)
+PROFILE_PICTURE_THUMBNAIL_SIZES = (64, 256)
+PROFILE_PICTURE_FORMAT = config('PROFILE_PICTURE_FORMAT', default='WEBP')
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
 
@@ -142,17 +276,30 @@ AUTH_USER_MODEL = 'users.CustomUser'
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
         'rest_framework.authentication.SessionAuthentication',
-        'rest_framework.authentication.TokenAuthentication',
+        'apps.authentication.authentication.SignedAccessTokenAuthentication',
+        'apps.authentication.authentication.CachedTokenAuthentication',
     ],
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.IsAuthenticated',
     ],
     'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
     'PAGE_SIZE': 20,
+    # Proxies delante de la app (X-Forwarded-For) para identificar la IP del cliente
+    'NUM_PROXIES': config('NUM_PROXIES', default='', cast=lambda v: int(v) if v else None),
+    # Ventana deslizante por scope (apps/authentication/throttles.py)
+    'DEFAULT_THROTTLE_RATES': {
+        'login': config('THROTTLE_LOGIN', default='20/min'),
+        'login_email': config('THROTTLE_LOGIN_EMAIL', default='5/min'),
+        'register': config('THROTTLE_REGISTER', default='10/hour'),
+        'password_reset': config('THROTTLE_PASSWORD_RESET', default='10/hour'),
+        'password_reset_email': config('THROTTLE_PASSWORD_RESET_EMAIL', default='3/hour'),
+        'password_reset_confirm': config('THROTTLE_PASSWORD_RESET_CONFIRM', default='10/hour'),
+        'professionals': config('THROTTLE_PROFESSIONALS', default='120/min'),
+    },
+    # API navegable solo en desarrollo (config/renderers.py: JSON con encoder reutilizado)
     'DEFAULT_RENDERER_CLASSES': [
-        'rest_framework.renderers.JSONRenderer',
-        'rest_framework.renderers.BrowsableAPIRenderer',
-    ]
+        'config.renderers.FastJSONRenderer',
+    ] + (['rest_framework.renderers.BrowsableAPIRenderer'] if DEBUG else []),
 }
 
 CORS_ALLOWED_ORIGINS = [
@@ -163,6 +310,9 @@ CORS_ALLOWED_ORIGINS = [
     "http://localhost:8080",      
     "http://127.0.0.1:8080",
 ]
+# Perfilado a pedido desde el frontend (apps/profiling)
+CORS_ALLOW_HEADERS = (*default_headers, 'x-profile')
+CORS_EXPOSE_HEADERS = ['X-Profile-Id']
 # config/settings.py (al final del archivo)
 
 # Configuración de ASGI para que Django Channels sea el punto de entrada
@@ -182,7 +332,8 @@ FRONTEND_URL_LOCAL = 'http://localhost:5173'
 # ---------------------------------------------------------------
 # CONFIGURACIÓN DE CORREO (SMTP DE GMAIL) PARA PSICO SAS
 # ---------------------------------------------------------------
-EMAIL_BACKEND = 'django.core.mail.backends.smtp.EmailBackend' # <-- ¡LÍNEA CORREGIDA! (Sin el #)
+# Lo usa el worker del outbox (python manage.py send_outbox); los tests usan locmem
+EMAIL_BACKEND = config("EMAIL_BACKEND", default='django.core.mail.backends.smtp.EmailBackend')
 EMAIL_HOST = 'smtp.gmail.com'
 EMAIL_PORT = 587
 EMAIL_USE_TLS = True
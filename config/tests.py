@@ -0,0 +1,440 @@
+# config/tests.py
+
+import io
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+from unittest import mock
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.management import CommandError, call_command
+from django.db import DEFAULT_DB_ALIAS, transaction
+from asgiref.sync import async_to_sync
+from django.contrib.auth.middleware import AuthenticationMiddleware
+from django.contrib.auth.models import AnonymousUser
+from django.core.exceptions import MiddlewareNotUsed
+from django.test import AsyncRequestFactory, Client, RequestFactory
+from django.test import TestCase, TransactionTestCase, override_settings
+from rest_framework import serializers
+from rest_framework.test import APIClient
+from datetime import date, time, timedelta
+from decimal import Decimal
+from apps.appointments.models import Appointment
+from apps.professionals.models import ProfessionalProfile
+from . import cache_tags, instrumentation, metrics, nplusone, replicas
+from .middleware import ReplicaPinMiddleware
+
+User = get_user_model()
+
+
+def create_user(email='ana@example.com', **fields):
+    return User.objects.create_user(email=email, first_name='Ana', last_name='Paz', **fields)
+
+
+class InstrumentationTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        instrumentation.install()
+        self.user = create_user()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def sampled(self, rate=1.0):
+        return mock.patch.object(instrumentation, 'SAMPLE_RATE', rate)
+
+    def test_server_timing_header_counts_queries(self):
+        with self.sampled(), mock.patch.object(instrumentation, 'SERVER_TIMING', True):
+            response = self.client.get('/api/users/me/', {'include': 'counts'})
+        timing = response['Server-Timing']
+        self.assertIn('db;dur=', timing)
+        self.assertIn('desc="1 queries"', timing)
+        self.assertIn('serializer;dur=', timing)
+        self.assertIn('view;dur=', timing)
+
+    def test_unsampled_request_has_no_header(self):
+        with self.sampled(0.0), mock.patch.object(nplusone, 'ENABLED', False):
+            response = self.client.get('/api/users/me/', {'include': 'counts'})
+        self.assertNotIn('Server-Timing', response)
+
+    def test_server_timing_can_be_disabled(self):
+        with self.sampled(), mock.patch.object(instrumentation, 'SERVER_TIMING', False), \
+                mock.patch.object(instrumentation, 'LOG_ENABLED', True), \
+                self.assertLogs('config.instrumentation', 'INFO'):
+            response = self.client.get('/api/users/me/', {'include': 'counts'})
+        self.assertNotIn('Server-Timing', response)
+
+    def test_log_line_is_json(self):
+        with self.sampled(), mock.patch.object(instrumentation, 'LOG_ENABLED', True), \
+                self.assertLogs('config.instrumentation', 'INFO') as logs:
+            self.client.get('/api/users/me/', {'include': 'counts'})
+        line = json.loads(logs.records[-1].getMessage())
+        self.assertEqual((line['event'], line['route'], line['status']), ('request', 'api/users/me/', 200))
+        self.assertEqual(line['queries'], 1)
+
+    def test_nested_measure_reports_queries_to_parent(self):
+        with instrumentation.measure('outer') as outer:
+            User.objects.count()
+            with instrumentation.measure('inner') as inner:
+                User.objects.count()
+                self.assertIs(instrumentation.current_metrics(), inner)
+        self.assertEqual((outer.queries, inner.queries), (2, 1))
+        self.assertIsNone(instrumentation.current_metrics())
+
+    def test_serializer_time_counts_top_level_data(self):
+        class UserSerializer(serializers.Serializer):
+            email = serializers.EmailField()
+
+        with instrumentation.measure('serializer') as metrics:
+            serializer = UserSerializer(self.user)
+            serializer.data
+            spent = metrics.serializer_time
+            serializer.data  # ya evaluado: no suma
+        self.assertGreater(spent, 0)
+        self.assertEqual(metrics.serializer_time, spent)
+
+
+class NPlusOneTests(TestCase):
+    def setUp(self):
+        self.users = [create_user(f'u{i}@example.com') for i in range(4)]
+
+    def test_normalize_collapses_literals_and_in_lists(self):
+        self.assertEqual(
+            nplusone.normalize("SELECT * FROM users WHERE id = 12 AND email = 'a''b'"),
+            'SELECT * FROM users WHERE id = ? AND email = ?'
+        )
+        self.assertEqual(
+            nplusone.normalize('SELECT * FROM users WHERE id IN (1, 2, 3)'),
+            nplusone.normalize('SELECT * FROM users WHERE id IN (4)')
+        )
+
+    def test_query_per_row_raises_with_call_site(self):
+        with self.assertRaises(nplusone.NPlusOneError) as raised:
+            with nplusone.detect(threshold=3):
+                for user in self.users:
+                    User.objects.get(pk=user.pk)
+        self.assertIn('4x config/tests.py', str(raised.exception))
+
+    def test_batched_query_passes(self):
+        with nplusone.detect(threshold=3) as detector:
+            list(User.objects.filter(pk__in=[user.pk for user in self.users]))
+            User.objects.count()
+        self.assertEqual(detector.offenders(), [])
+
+    def test_warn_mode_logs(self):
+        with self.assertLogs('config.nplusone', 'WARNING'):
+            with nplusone.detect(threshold=2, mode='warn', label='prueba'):
+                for user in self.users:
+                    User.objects.get(pk=user.pk)
+
+    def test_me_endpoint_passes_middleware_in_raise_mode(self):
+        client = APIClient()
+        client.force_authenticate(self.users[0])
+        with mock.patch.object(nplusone, 'ENABLED', True), mock.patch.object(nplusone, 'MODE', 'raise'):
+            response = client.get('/api/users/me/')
+        self.assertEqual(response.status_code, 200)
+
+
+def dead_pid():
+    process = subprocess.Popen([sys.executable, '-c', 'pass'])
+    process.wait()
+    return process.pid
+
+
+def counter(counters, name, **labels):
+    return counters.get(metrics._key(name, labels), 0)
+
+
+class MetricsViewTests(TestCase):
+    def test_denied_without_token_outside_debug(self):
+        with mock.patch.object(metrics, 'METRICS_TOKEN', ''):
+            self.assertEqual(self.client.get('/metrics').status_code, 403)
+            with override_settings(DEBUG=True):
+                response = self.client.get('/metrics')
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('# TYPE http_requests_total counter', response.content.decode())
+
+    def test_token_required_when_configured(self):
+        with mock.patch.object(metrics, 'METRICS_TOKEN', 'secreto'), override_settings(DEBUG=True):
+            self.assertEqual(self.client.get('/metrics').status_code, 403)
+            response = self.client.get('/metrics', HTTP_AUTHORIZATION='Bearer secreto')
+        self.assertEqual(response.status_code, 200)
+
+    def test_render_histogram_and_counters(self):
+        metrics.observe('http_request_duration_seconds', 0.03, route='test/', method='GET')
+        metrics.inc('appointment_bookings_total', result='created')
+        text = metrics.render()
+        self.assertIn('http_request_duration_seconds_bucket{method="GET",route="test/",le="0.05"}', text)
+        self.assertIn('appointment_bookings_total{result="created"}', text)
+
+
+class MetricsWorkerFilesTests(TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory, ignore_errors=True)
+        for name, value in (('METRICS_DIR', self.directory), ('_own_file_checked', False)):
+            patcher = mock.patch.object(metrics, name, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def write_worker(self, pid, requests, started=1, gauge=0):
+        key = [['method', 'GET'], ['route', 'x/'], ['status', '200']]
+        metrics._write(os.path.join(self.directory, f'{pid}.json'), {
+            'pid': pid,
+            'started': started,
+            'counters': [['http_requests_total', key, requests]],
+            'gauges': [['chat_websocket_connections', [], gauge]],
+            'histograms': [],
+        })
+
+    def requests_total(self):
+        counters, gauges, _ = metrics.collect()
+        return (
+            counter(counters, 'http_requests_total', method='GET', route='x/', status='200'),
+            counter(gauges, 'chat_websocket_connections'),
+        )
+
+    def test_dead_worker_is_folded_into_retired_total(self):
+        pid = dead_pid()
+        self.write_worker(pid, 7, gauge=3)
+
+        self.assertEqual(self.requests_total(), (7, 0))
+        self.assertFalse(os.path.exists(os.path.join(self.directory, f'{pid}.json')))
+        self.assertTrue(os.path.exists(os.path.join(self.directory, metrics.RETIRED_FILE)))
+        # Se cuenta una sola vez
+        self.assertEqual(self.requests_total(), (7, 0))
+
+        self.write_worker(dead_pid(), 5)
+        self.assertEqual(self.requests_total(), (12, 0))
+
+    def test_live_worker_is_summed_with_gauges(self):
+        self.write_worker(os.getppid(), 4, gauge=2)
+        self.assertEqual(self.requests_total(), (4, 2))
+
+    def test_reused_pid_keeps_previous_process_counters(self):
+        # Archivo de un proceso anterior que tuvo nuestro pid
+        self.write_worker(os.getpid(), 9, started=metrics._STARTED - 1)
+        metrics.flush()
+
+        retired = metrics._read(os.path.join(self.directory, metrics.RETIRED_FILE))
+        self.assertEqual(retired['counters'][0][2], 9)
+        own = metrics._read(os.path.join(self.directory, f'{os.getpid()}.json'))
+        self.assertEqual(own['started'], metrics._STARTED)
+        self.assertGreaterEqual(self.requests_total()[0], 9)
+
+
+class CacheMetricsTests(TestCase):
+    def reads(self):
+        counters = metrics.snapshot()[0]
+        return (
+            counter(counters, 'cache_requests_total', result='hit'),
+            counter(counters, 'cache_requests_total', result='miss'),
+        )
+
+    def test_counts_default_cache_reads_only(self):
+        metrics.install()
+        cache.set('metrics:test', 1)
+        hits, misses = self.reads()
+        cache.get('metrics:test')
+        cache.get('metrics:ausente')
+        cache.get_many(['metrics:test', 'metrics:ausente'])
+        self.assertEqual(self.reads(), (hits + 2, misses + 2))
+
+        other = LocMemCache('metrics-other', {})
+        other.set('metrics:test', 1)
+        other.get('metrics:test')
+        self.assertEqual(self.reads(), (hits + 2, misses + 2))
+        # La clase del backend queda intacta
+        self.assertFalse(hasattr(LocMemCache.get, '__wrapped__'))
+
+
+class ReplicaRouterTests(TransactionTestCase):
+    """Decisiones del router; la réplica no existe en los tests, solo se mira el alias elegido"""
+
+    def setUp(self):
+        cache.clear()
+        self.user = create_user()
+        for name in ('replica_configured', 'shared_cache'):
+            patcher = mock.patch.object(replicas, name, return_value=True)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def test_reads_outside_marked_views_use_primary(self):
+        self.assertEqual(User.objects.all().db, DEFAULT_DB_ALIAS)
+
+    def test_reads_go_to_replica(self):
+        with replicas.replica_reads():
+            self.assertEqual(User.objects.all().db, replicas.REPLICA)
+            # Una instancia leída de la primaria sigue en la primaria
+            self.assertEqual(replicas.ReplicaRouter().db_for_read(User, instance=self.user), DEFAULT_DB_ALIAS)
+
+    def test_write_pins_rest_of_request_to_primary(self):
+        with replicas.replica_reads():
+            self.assertEqual(User.objects.all().db, replicas.REPLICA)
+            self.assertEqual(User.objects.filter(pk=self.user.pk).update(first_name='Eva'), 1)
+            self.assertEqual(User.objects.all().db, DEFAULT_DB_ALIAS)
+        with replicas.replica_reads():
+            self.assertEqual(User.objects.all().db, replicas.REPLICA)
+
+    def test_select_for_update_and_atomic_blocks_stay_on_primary(self):
+        with replicas.replica_reads():
+            self.assertEqual(User.objects.select_for_update().all().db, DEFAULT_DB_ALIAS)
+        with replicas.replica_reads():
+            with transaction.atomic():
+                self.assertEqual(User.objects.all().db, DEFAULT_DB_ALIAS)
+            self.assertEqual(User.objects.all().db, replicas.REPLICA)
+
+    def test_use_replica_skips_pinned_user(self):
+        seen = []
+
+        @replicas.use_replica
+        def view(request):
+            seen.append(User.objects.all().db)
+
+        request = RequestFactory().get('/')
+        request.user = self.user
+        view(request)
+        replicas.pin_to_primary(self.user.pk)
+        view(request)
+        self.assertEqual(seen, [replicas.REPLICA, DEFAULT_DB_ALIAS])
+
+    def test_without_shared_cache_only_anonymous_reads_use_replica(self):
+        seen = []
+
+        @replicas.use_replica
+        def view(request):
+            seen.append(User.objects.all().db)
+
+        request = RequestFactory().get('/')
+        with mock.patch.object(replicas, 'shared_cache', return_value=False):
+            request.user = self.user
+            view(request)
+            request.user = AnonymousUser()
+            view(request)
+            with self.assertRaises(MiddlewareNotUsed):
+                ReplicaPinMiddleware(lambda request: None)
+        self.assertEqual(seen, [DEFAULT_DB_ALIAS, replicas.REPLICA])
+
+    def test_primary_reads_inside_replica_view(self):
+        with replicas.replica_reads(), replicas.primary_reads():
+            self.assertEqual(User.objects.all().db, DEFAULT_DB_ALIAS)
+
+    def test_middleware_pins_after_successful_write(self):
+        factory = RequestFactory()
+        for method, status, pinned in (('get', 200, False), ('post', 400, False), ('post', 201, True)):
+            cache.clear()
+            request = getattr(factory, method)('/')
+            request.user = self.user
+            ReplicaPinMiddleware(lambda request: mock.Mock(status_code=status))(request)
+            self.assertEqual(replicas.is_pinned(self.user.pk), pinned, (method, status))
+
+    def test_async_middleware_resolves_lazy_session_user(self):
+        # Vista async que no tocó request.user (ej. login_user): sigue siendo el
+        # SimpleLazyObject de AuthenticationMiddleware
+        client = Client()
+        client.force_login(self.user)
+        request = AsyncRequestFactory().post('/api/auth/login/')
+        request.session = client.session
+        AuthenticationMiddleware(lambda request: None).process_request(request)
+
+        async def view(request):
+            return mock.Mock(status_code=200)
+
+        async_to_sync(ReplicaPinMiddleware(view))(request)
+        self.assertTrue(replicas.is_pinned(self.user.pk))
+
+    def test_migrations_skip_replica(self):
+        router = replicas.ReplicaRouter()
+        self.assertTrue(router.allow_migrate(DEFAULT_DB_ALIAS, 'users'))
+        self.assertFalse(router.allow_migrate(replicas.REPLICA, 'users'))
+
+
+class SyncReplicaTests(TestCase):
+    def test_requires_configured_replica(self):
+        with self.assertRaisesMessage(CommandError, 'No hay réplica configurada'):
+            call_command('sync_replica', stdout=io.StringIO())
+
+
+class CacheTagsTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.psychologist = create_user('psico@example.com', user_type='professional')
+        self.profile = ProfessionalProfile.objects.create(
+            user=self.psychologist,
+            license_number='LIC-1',
+            bio='Bio',
+            education='Psicología',
+            experience_years=5,
+            consultation_fee=Decimal('150.00'),
+            profile_completed=True,
+        )
+        self.patient = create_user('paciente@example.com')
+
+    def directory(self):
+        response = APIClient().get('/api/professionals/')
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def test_bump_changes_tag_version(self):
+        first = cache_tags.tag_versions(['a', 'b'])
+        self.assertEqual(cache_tags.tag_versions(['a', 'b']), first)
+        cache_tags.bump_tags('a')
+        versions = cache_tags.tag_versions(['a', 'b'])
+        self.assertNotEqual(versions['a'], first['a'])
+        self.assertEqual(versions['b'], first['b'])
+
+    def test_bump_on_commit_waits_for_commit(self):
+        before = cache_tags.tag_versions(['a'])
+        with self.captureOnCommitCallbacks() as callbacks:
+            cache_tags.bump_tags_on_commit('a')
+            self.assertEqual(cache_tags.tag_versions(['a']), before)
+        for callback in callbacks:
+            callback()
+        self.assertNotEqual(cache_tags.tag_versions(['a']), before)
+
+    def test_cached_response_served_without_queries_until_tag_changes(self):
+        self.assertEqual(self.directory()['professionals'][0]['bio'], 'Bio')
+        with self.assertNumQueries(0):
+            self.assertEqual(self.directory()['count'], 1)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.profile.bio = 'Nueva bio'
+            self.profile.save()
+        self.assertEqual(self.directory()['professionals'][0]['bio'], 'Nueva bio')
+
+    def test_query_string_is_part_of_the_key(self):
+        self.assertEqual(self.directory()['count'], 1)
+        response = APIClient().get('/api/professionals/', {'city': 'Sucre'})
+        self.assertEqual(response.json()['count'], 0)
+
+    def test_per_user_history_is_bumped_by_appointments(self):
+        client = APIClient()
+        client.force_authenticate(self.patient)
+        url = '/api/appointments/appointments/history/'
+        self.assertEqual(client.get(url).json(), [])
+
+        other = APIClient()
+        other.force_authenticate(self.psychologist)
+        self.assertEqual(other.get(url).json(), [])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Appointment.objects.create(
+                patient=self.patient,
+                psychologist=self.psychologist,
+                appointment_date=date.today() - timedelta(days=3),
+                start_time=time(10, 0),
+                end_time=time(11, 0),
+                status='completed',
+            )
+        self.assertEqual(len(client.get(url).json()), 1)
+        self.assertEqual(len(other.get(url).json()), 1)
+
+    def test_error_responses_are_not_cached(self):
+        url = '/api/appointments/psychologist/999999/schedule/'
+        client = APIClient()
+        client.force_authenticate(self.patient)
+        self.assertEqual(client.get(url).status_code, 404)
+        self.assertFalse([key for key in cache._cache if ':view:' in key])
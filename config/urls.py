@@ -4,10 +4,14 @@ from django.contrib import admin
 from django.urls import path, include
 from django.conf import settings
 from django.conf.urls.static import static
+from config.metrics import metrics_view
 
 urlpatterns = [
     # Admin
     path('admin/', admin.site.urls),
+
+    # Métricas para Prometheus
+    path('metrics', metrics_view),
     
     # API endpoints
     path('api/auth/', include('apps.authentication.urls')),      # CU-01, CU-02, CU-03, CU-04